@@ -1,28 +1,229 @@
 import argparse
-import yaml
+import hashlib
+import json
 import os
+import sys
+import shutil
+import threading
+import time
+import yaml
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from src.agents.financial_auditor import FinancialAuditorAgent
-from src.core.parser import PDFParser
 
 load_dotenv()
 
+class AnswerPrinter:
+    """
+    Streams answer tokens to the terminal. Text the agent discards (the model thinking aloud
+    before a tool call) is erased again on a TTY; when output is piped, only the answer is printed.
+    """
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.live = self.stream.isatty()
+        self.turn_text = ""
+
+    def token(self, text: str):
+        self.turn_text += text
+        if self.live:
+            self.stream.write(text)
+            self.stream.flush()
+
+    def discard(self):
+        if self.live and self.turn_text:
+            # Rows the discarded text occupies: each line wraps at the terminal width
+            width = max(shutil.get_terminal_size().columns, 1)
+            rows = sum(max(1, -(-len(line) // width)) for line in self.turn_text.split("\n"))
+            up = f"\x1b[{rows - 1}A" if rows > 1 else ""
+            # Back to the first discarded row, then clear to the end of the screen
+            self.stream.write(f"\r{up}\x1b[J")
+            self.stream.flush()
+        self.turn_text = ""
+
+    def finish(self, answer: str):
+        if not self.live:
+            self.stream.write(answer)
+        self.stream.write("\n")
+        self.stream.flush()
+
 class AgenticSystem:
-    def __init__(self, config_path="config/config.yaml"):
+    # Subsystems are imported inside run() so `--query` never pays for the
+    # ingestion stack (LlamaParse/llama_index) and `--ingest` never loads the agent.
+    def __init__(self, config_path="config/config.yaml", chart_format=None):
+        self.config_path = config_path
         with open(config_path, 'r') as f:
             self.config = yaml.safe_load(f)
-        self.agent = FinancialAuditorAgent(self.config)
-        self.parser = PDFParser(config_path)
+        # Charts arrive as specs; they are written to files only in this format (None = keep specs only)
+        self.chart_format = chart_format or self.config.get('charts', {}).get('format')
+        if self.chart_format == "none":
+            self.chart_format = None
+
+    def _build_agent(self):
+        from src.agents.financial_auditor import FinancialAuditorAgent
+        from src.core.registry import ResourceRegistry
+        return FinancialAuditorAgent(self.config, registry=ResourceRegistry.get(self.config_path))
+
+    def _render_charts(self, specs):
+        """Files for the answer's chart specs (identical charts are reused, not rebuilt)."""
+        if not specs or not self.chart_format:
+            return []
+        from src.core.registry import ResourceRegistry
+        return ResourceRegistry.get(self.config_path).chart_renderer().render_many(specs, self.chart_format)
+
+    @staticmethod
+    def load_questions(query_file):
+        """[(id, question)] from a JSONL file ({"id", "question"}) or one question per line."""
+        questions, seen = [], set()
+        with open(query_file, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if query_file.endswith(".jsonl"):
+                    record = json.loads(line)
+                    question = record.get("question") or record.get("query")
+                    qid = str(record.get("id") or hashlib.sha256(question.encode("utf-8")).hexdigest()[:12])
+                else:
+                    # Content-derived IDs stay stable when the question file is edited or reordered
+                    question, qid = line, hashlib.sha256(line.encode("utf-8")).hexdigest()[:12]
+                if qid not in seen:  # a repeated question is answered once
+                    seen.add(qid)
+                    questions.append((qid, question))
+        return questions
+
+    @staticmethod
+    def resume_output(output_path, retry_ids):
+        """
+        IDs already answered in `output_path`. The file is compacted first: one record per ID (the
+        last successful one), and failed records of `retry_ids` are dropped because this run appends
+        their new outcome. So a resumed file never holds the same ID twice.
+        """
+        if not os.path.exists(output_path):
+            return set()
+        records, lines = {}, 0
+        with open(output_path, 'r') as f:
+            for line in f:
+                lines += 1
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn last line from an interrupted run
+                previous = records.get(record["id"])
+                if previous is None or "error" in previous or "error" not in record:
+                    records[record["id"]] = record
+        done = {qid for qid, record in records.items() if "error" not in record}
+        kept = [record for qid, record in records.items() if qid in done or qid not in retry_ids]
+        if len(kept) != lines:
+            tmp_path = f"{output_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.writelines(json.dumps(record) + "\n" for record in kept)
+            os.replace(tmp_path, output_path)
+        return done
+
+    def run_batch(self, query_file, output_path=None, workers=None):
+        """Answers every question in `query_file` with one shared agent, appending JSONL records to `output_path`."""
+        output_path = output_path or f"{os.path.splitext(query_file)[0]}.answers.jsonl"
+        workers = workers or self.config.get('agent', {}).get('batch_workers', 4)
+        questions = self.load_questions(query_file)
+        done = self.resume_output(output_path, {qid for qid, _ in questions})
+        pending = [(qid, q) for qid, q in questions if qid not in done]
+        print(f"📋 Batch: {len(questions)} questions | {len(questions) - len(pending)} already answered | {len(pending)} to run ({workers} workers)")
+        if not pending:
+            return
+
+        agent = self._build_agent()
+        write_lock = threading.Lock()
+        batch_started = time.perf_counter()
+
+        def answer_one(qid, question):
+            started = time.perf_counter()
+            record = {"id": qid, "question": question}
+            try:
+                result = agent.answer(question)
+                record.update({
+                    "answer": result["answer"],
+                    "citations": result["citations"],
+                    "latency_s": round(time.perf_counter() - started, 3),
+                    "ttft_s": result.get("ttft_s"),
+                    "prompt_tokens": result["prompt_tokens"],
+                    "completion_tokens": result["completion_tokens"],
+                    "total_tokens": result["total_tokens"],
+                    "cost_usd": result["cost_usd"],
+                    "cost_inr": result["cost_inr"],
+                    "cached": result.get("cached", False),
+                })
+                if result.get("charts"):
+                    record["charts"] = result["charts"]
+                    record["chart_files"] = self._render_charts(result["charts"])
+            except Exception as e:
+                record.update({"error": str(e), "latency_s": round(time.perf_counter() - started, 3)})
+            with write_lock, open(output_path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+            return record
+
+        total_cost, failed, cached = 0.0, 0, 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(answer_one, qid, q) for qid, q in pending]
+            for n, future in enumerate(as_completed(futures), start=1):
+                record = future.result()
+                if "error" in record:
+                    failed += 1
+                    print(f"❌ [{n}/{len(pending)}] {record['id']}: {record['error']}")
+                elif record["cached"]:
+                    # A cached answer's cost_usd is what the original run paid; this run paid nothing
+                    cached += 1
+                    print(f"⚡ [{n}/{len(pending)}] {record['id']} from cache")
+                else:
+                    total_cost += record["cost_usd"]
+                    print(f"✅ [{n}/{len(pending)}] {record['id']} in {record['latency_s']:.2f}s")
+        print(
+            f"🏁 Batch done in {time.perf_counter() - batch_started:.1f}s | {len(pending) - failed} answered "
+            f"({cached} from cache), {failed} failed | ${total_cost:.5f} | Output: {output_path}"
+        )
 
-    def run(self, query=None, ingest=False):
+    def run(self, query=None, ingest=False, force=False, filing=None):
         if ingest:
-            self.parser.run_smart_ingestion()
+            from src.core.parser import PDFParser
+            PDFParser(self.config_path, filing=filing).run_smart_ingestion(force=force)
         elif query:
-            print(self.agent.run(query))
+            agent = self._build_agent()
+            # Stream progress and answer tokens as they arrive instead of waiting for the full answer
+            result, printer = None, AnswerPrinter()
+            for event in agent.run_stream(query):
+                if event["type"] == "status":
+                    print(f"   {event['message']}", flush=True)
+                elif event["type"] == "token":
+                    printer.token(event["text"])
+                elif event["type"] == "discard":
+                    printer.discard()
+                elif event["type"] == "done":
+                    result = event["result"]
+            printer.finish(result["answer"] if result else printer.turn_text)
+            for path in self._render_charts(result.get("charts") if result else None):
+                print(f"📊 Chart saved: {path}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--ingest", action="store_true")
     parser.add_argument("--query", type=str)
+    parser.add_argument("--force", action="store_true", help="Re-parse the PDF even if it is unchanged")
+    parser.add_argument("--filing", type=str, help="With --ingest: add the PDF to the corpus as TICKER:FISCAL_YEAR (e.g. AAPL:2025)")
+    parser.add_argument("--pdf", type=str, help="With --filing: the filing's PDF (default: data.pdf_path)")
+    parser.add_argument("--company", type=str, help="With --filing: company name used for routing (default: the ticker)")
+    parser.add_argument("--query-file", type=str, help="Batch mode: JSONL ({id, question}) or one question per line")
+    parser.add_argument("--output", type=str, help="Batch JSONL output (default: <query-file>.answers.jsonl); resumes if it exists")
+    parser.add_argument("--workers", type=int, help="Questions answered concurrently in batch mode")
+    parser.add_argument("--chart-format", choices=["html", "svg", "png", "none"],
+                        help="Export charts in this format (default: charts.format in config.yaml); 'none' keeps specs only")
     args = parser.parse_args()
-    AgenticSystem().run(query=args.query, ingest=args.ingest)
\ No newline at end of file
+    system = AgenticSystem(chart_format=args.chart_format)
+    filing = None
+    if args.filing:
+        ticker, _, fiscal_year = args.filing.partition(":")
+        if not ticker or not fiscal_year.isdigit():
+            parser.error("--filing expects TICKER:FISCAL_YEAR, e.g. AAPL:2025")
+        filing = {"ticker": ticker, "fiscal_year": int(fiscal_year), "company": args.company,
+                  "pdf_path": args.pdf or system.config['data']['pdf_path']}
+    if args.query_file:
+        system.run_batch(args.query_file, output_path=args.output, workers=args.workers)
+    else:
+        system.run(query=args.query, ingest=args.ingest, force=args.force, filing=filing)
\ No newline at end of file
@@ -0,0 +1,327 @@
+# benchmarks/retrieval_benchmark.py
+"""
+Offline retrieval benchmark for `RetrievalTool.search_10k`.
+
+Builds a throwaway Chroma collection (plus BM25 index and table store) from the
+fixture 10-K in benchmarks/fixtures, using a deterministic hashing embedding instead
+of Gemini, a stubbed query-expansion LLM and, by default, a lexical stand-in for the
+cross-encoder. It then runs the eval_pipeline.py questions through search_10k and reports:
+
+  * p50 / p95 / p99 latency per stage (dense, lexical, expansion, parent fetch, rerank, pack, total)
+  * recall@k of the pages each question's answer lives on (benchmarks/fixtures/retrieval_cases.json)
+
+Each percentile is the median over --runs independent runs (fresh index each), for both the
+baseline and the check, so one noisy run neither sets nor trips the gate.
+Fails (exit 1) if recall drops or latency regresses past the stored baseline. No network needed.
+
+    python benchmarks/retrieval_benchmark.py                   # check against baseline
+    python benchmarks/retrieval_benchmark.py --update-baseline # record a new baseline
+    python benchmarks/retrieval_benchmark.py --flashrank       # real cross-encoder (model must be cached locally)
+    python benchmarks/retrieval_benchmark.py --backend numpy   # same questions on the memory-mapped NumPy store
+"""
+import os
+import re
+import io
+import sys
+import ast
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import statistics
+import contextlib
+import numpy as np
+import yaml
+from chromadb.api.types import EmbeddingFunction
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from src.core.bm25_index import tokenize
+from src.core.database import DatabaseManager
+from src.core.parser import PDFParser
+from src.core.registry import ResourceRegistry
+from src.tools.retriever import RetrievalTool
+
+FIXTURE_PATH = os.path.join(REPO_ROOT, "benchmarks", "fixtures", "fixture_10k.md")
+CASES_PATH = os.path.join(REPO_ROOT, "benchmarks", "fixtures", "retrieval_cases.json")
+BASELINE_PATH = os.path.join(REPO_ROOT, "benchmarks", "retrieval_baseline.json")
+STAGES = ["dense", "lexical", "expansion", "parent_fetch", "rerank", "pack", "total"]
+RECALL_AT = (1, 3, 6)
+
+class HashEmbeddingFunction(EmbeddingFunction):
+    """Deterministic stand-in for Gemini embeddings: signed feature hashing of unigrams + bigrams."""
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            tokens = tokenize(text)
+            vec = np.zeros(self.dim, dtype=np.float32)
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                digest = hashlib.md5(feature.encode("utf-8")).digest()
+                vec[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] & 1 else -1.0
+            norm = np.linalg.norm(vec)
+            vectors.append((vec / norm if norm else vec).tolist())
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "benchmark-hash"
+
+    def get_config(self) -> dict:
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "HashEmbeddingFunction":
+        return HashEmbeddingFunction(config.get("dim", 256))
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+class StubGenaiClient:
+    """Answers the query-expansion prompt with fixed rewrites, optionally after a simulated delay."""
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.models = self
+
+    def generate_content_stream(self, model, contents, **kwargs):
+        query = re.search(r"'(.*)'", contents).group(1)
+        time.sleep(self.latency_s)
+        yield _Chunk(f"{query} table\n")
+        yield _Chunk(f"{query} consolidated statements in millions\n")
+
+class StubRanker:
+    """Cross-encoder stand-in: share of query terms present in the passage."""
+    def rerank(self, request):
+        terms = set(tokenize(request.query))
+        results = [
+            {**p, "score": len(terms & set(tokenize(p["text"]))) / (len(terms) or 1)}
+            for p in request.passages
+        ]
+        return sorted(results, key=lambda r: r["score"], reverse=True)
+
+class FixtureNode:
+    """The two attributes PDFParser.build_records reads from a llama_index node."""
+    def __init__(self, text: str, page_label: str):
+        self.text = text
+        self.metadata = {"page_label": page_label}
+
+def load_fixture_nodes(path: str = FIXTURE_PATH) -> list:
+    """Splits the fixture like MarkdownNodeParser: one node per heading section, per page."""
+    with open(path, "r") as f:
+        raw = re.sub(r"<!--(?!\s*page:).*?-->", "", f.read(), flags=re.DOTALL)
+    nodes = []
+    for page_label, body in re.findall(r"<!--\s*page:\s*(\S+)\s*-->(.*?)(?=<!--\s*page:|\Z)", raw, re.DOTALL):
+        section = []
+        for line in body.strip().splitlines():
+            if line.startswith("#"):
+                if any(not l.startswith("#") and l.strip() for l in section):
+                    nodes.append(FixtureNode("\n".join(section).strip(), page_label))
+                    section = []
+            section.append(line)
+        if section:
+            nodes.append(FixtureNode("\n".join(section).strip(), page_label))
+    return nodes
+
+def load_cases(limit: int = None) -> list:
+    """eval_pipeline.py questions (read without importing deepeval), joined with their expected pages."""
+    with open(os.path.join(REPO_ROOT, "eval_pipeline.py"), "r") as f:
+        tree = ast.parse(f.read())
+    raw_test_data = next(
+        ast.literal_eval(node.value) for node in tree.body
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "raw_test_data"
+    )
+    with open(CASES_PATH, "r") as f:
+        expected = {case["input"]: case["pages"] for case in json.load(f)}
+    cases = [{"input": entry["input"], "pages": expected.get(entry["input"])} for entry in raw_test_data]
+    return cases[:limit] if limit else cases
+
+def build_index(work_dir: str, expansion_latency_s: float, use_flashrank: bool, backend: str = "chroma") -> ResourceRegistry:
+    with open(os.path.join(REPO_ROOT, "config", "config.yaml"), "r") as f:
+        config = yaml.safe_load(f)
+    config["embedding"]["chroma_path"] = os.path.join(work_dir, "chroma")
+    config["embedding"]["collection_name"] = "retrieval_benchmark"
+    config["embedding"]["backend"] = backend
+    config["embedding"]["numpy_path"] = os.path.join(work_dir, "vector_store")
+    config.setdefault("ingestion", {})["index_dir"] = os.path.join(work_dir, "index")
+    config.setdefault("cache", {})["dir"] = os.path.join(work_dir, "cache")
+    config.setdefault("tracing", {})["jsonl_path"] = None
+    config_path = os.path.join(work_dir, "config.yaml")
+    with open(config_path, "w") as f:
+        yaml.safe_dump(config, f)
+
+    registry = ResourceRegistry.get(config_path)
+    registry.get_or_create("db_manager", lambda: DatabaseManager(config_path, embedding_function=HashEmbeddingFunction()))
+    registry.get_or_create("genai_client", lambda: StubGenaiClient(expansion_latency_s))
+    if not use_flashrank:
+        registry.get_or_create("ranker", StubRanker)
+
+    parser = PDFParser(config_path, db_manager=registry.db_manager())
+    ids, documents, metadatas = parser.build_records(load_fixture_nodes())
+    with open(FIXTURE_PATH, "rb") as f:
+        fixture_sha = hashlib.sha256(f.read()).hexdigest()
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser.ingest_records(ids, documents, metadatas)
+        parser.build_side_indexes(ids, documents, metadatas)
+        parser._save_manifest(fixture_sha, ids)
+    return registry
+
+def _timed(fn, samples: list):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - started)
+    return wrapper
+
+class TimedCollection:
+    """Chroma collection proxy that times `get` and forwards everything else."""
+    def __init__(self, collection, samples: list):
+        self.collection = collection
+        self.get = _timed(collection.get, samples)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+def instrument(tool: RetrievalTool) -> dict:
+    """Wraps each search_10k stage on this instance; returns stage -> list of durations (s)."""
+    timings = {stage: [] for stage in STAGES}
+    for attr, stage in [("_search_children", "dense"), ("_search_lexical", "lexical"),
+                        ("_expand_query", "expansion"), ("_rerank", "rerank"), ("search_10k", "total")]:
+        setattr(tool, attr, _timed(getattr(tool, attr), timings[stage]))
+    if tool.packer is not None:
+        tool.packer.pack = _timed(tool.packer.pack, timings["pack"])
+    # Parent fetch is the only collection.get on the search path
+    tool.db.collection = TimedCollection(tool.db.collection, timings["parent_fetch"])
+    return timings
+
+def recall_at(pages_ranked: list, expected: list, k: int) -> float:
+    return len(set(expected) & set(pages_ranked[:k])) / len(expected)
+
+def run_once(args) -> dict:
+    work_dir = tempfile.mkdtemp(prefix="retrieval_benchmark_")
+    try:
+        started = time.perf_counter()
+        registry = build_index(work_dir, args.expansion_latency_ms / 1000, args.flashrank, args.backend)
+        ingest_s = time.perf_counter() - started
+
+        tool = RetrievalTool(registry.config_path, registry=registry)
+        timings = instrument(tool)
+        cases = load_cases(args.cases)
+
+        recalls = {k: [] for k in RECALL_AT}
+        misses = []
+        for repeat in range(args.repeats):
+            for case in cases:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    output = tool.search_10k(case["input"])
+                if repeat or not case["pages"]:
+                    continue  # deterministic: recall from the first (cold-cache) pass only
+                pages = list(dict.fromkeys(re.findall(r"SOURCE: Page (\S+)", output)))
+                for k in RECALL_AT:
+                    recalls[k].append(recall_at(pages, case["pages"], k))
+                if recall_at(pages, case["pages"], max(RECALL_AT)) < 1.0:
+                    misses.append((case["input"], case["pages"], pages))
+        tool.db.collection = tool.db.collection.collection
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    latency = {
+        stage: {
+            f"p{q}_ms": round(float(np.percentile(samples, q)) * 1000, 3) for q in (50, 95, 99)
+        } | {"n": len(samples)}
+        for stage, samples in timings.items() if samples
+    }
+    report = {
+        "cases": len(cases),
+        "repeats": args.repeats,
+        "ingest_s": round(ingest_s, 3),
+        "latency": latency,
+        "recall": {f"@{k}": round(sum(v) / len(v), 4) for k, v in recalls.items() if v},
+    }
+    if args.verbose:
+        for question, expected, got in misses:
+            print(f"   ✗ {question[:70]} | expected {expected} | got {got}")
+    return report
+
+def run(args) -> dict:
+    """`run_once` --runs times; latency percentiles are the per-stage medians across runs."""
+    reports = [run_once(args) for _ in range(args.runs)]
+    report = {**reports[0], "runs": args.runs}
+    report["ingest_s"] = round(statistics.median(r["ingest_s"] for r in reports), 3)
+    report["latency"] = {
+        stage: {
+            pct: round(statistics.median(r["latency"][stage][pct] for r in reports), 3)
+            for pct in ("p50_ms", "p95_ms", "p99_ms")
+        } | {"n": stats["n"]}
+        for stage, stats in reports[0]["latency"].items()
+        if all(stage in r["latency"] for r in reports)
+    }
+    return report
+
+def compare(report: dict, baseline: dict, args) -> list:
+    failures = []
+    for metric, value in report["recall"].items():
+        floor = baseline["recall"].get(metric, 0.0) - args.recall_tolerance
+        if value < floor:
+            failures.append(f"recall{metric} dropped: {value:.3f} < {floor:.3f}")
+    for stage, stats in report["latency"].items():
+        base = baseline["latency"].get(stage)
+        if not base:
+            continue
+        # p99 over a few hundred samples is too noisy to gate on
+        for pct in ("p50_ms", "p95_ms"):
+            limit = max(base[pct] * (1 + args.tolerance), base[pct] + args.min_delta_ms)
+            if stats[pct] > limit:
+                failures.append(f"{stage} {pct} regressed: {stats[pct]:.1f} ms > {limit:.1f} ms (baseline {base[pct]:.1f} ms)")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the question set (later passes hit warm caches)")
+    parser.add_argument("--runs", type=int, default=5, help="Independent runs; each percentile is the median across them")
+    parser.add_argument("--cases", type=int, help="Only the first N questions")
+    parser.add_argument("--expansion-latency-ms", type=float, default=0.0, help="Simulated LLM expansion delay")
+    parser.add_argument("--flashrank", action="store_true", help="Use the real FlashRank model instead of the lexical stand-in")
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default="chroma", help="Vector store backend under test")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed latency slowdown vs baseline (0.5 = +50%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Ignore slowdowns smaller than this")
+    parser.add_argument("--recall-tolerance", type=float, default=0.0, help="Allowed recall drop vs baseline")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="List questions whose pages were not all retrieved")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(f"📚 {report['cases']} questions x {report['repeats']} passes x {report['runs']} runs | fixture ingested in {report['ingest_s']:.2f}s")
+    print(f"{'stage':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'n':>7}")
+    for stage in STAGES:
+        stats = report["latency"].get(stage)
+        if stats:
+            print(f"{stage:<14}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['n']:>7}")
+    print("🎯 Recall " + " | ".join(f"{k}: {v:.3f}" for k, v in report["recall"].items()))
+
+    failures = []
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Baseline written to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r") as f:
+            failures = compare(report, json.load(f), args)
+    else:
+        print("ℹ️ No baseline yet; run with --update-baseline to record one.")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Retrieval within baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# benchmarks/startup_benchmark.py
+"""
+Startup benchmark for the CLI entry point.
+
+Measures, in fresh interpreters, the wall time of `import app` and
+`python app.py --help`, plus the modules a bare import pulls in. Fails (exit 1)
+if a heavy subsystem leaks into the import path or timings regress past the
+stored baseline by more than the allowed tolerance.
+
+    python benchmarks/startup_benchmark.py                   # check against baseline
+    python benchmarks/startup_benchmark.py --update-baseline # record a new baseline
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(REPO_ROOT, "benchmarks", "startup_baseline.json")
+
+# Must never be imported just to parse CLI arguments
+HEAVY_MODULES = ["llama_parse", "llama_index", "nest_asyncio", "streamlit", "pandas", "plotly", "flashrank", "onnxruntime", "chromadb"]
+
+def _run(code: str) -> str:
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    return result.stdout.strip()
+
+def time_import(repeats: int) -> list:
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    return [float(_run(code)) for _ in range(repeats)]
+
+def time_help(repeats: int) -> list:
+    code = (
+        "import time, sys, runpy; t = time.perf_counter(); sys.argv = ['app.py', '--help']\n"
+        "try:\n    runpy.run_path('app.py', run_name='__main__')\nexcept SystemExit:\n    pass\n"
+        "print(time.perf_counter() - t, file=sys.stderr)"
+    )
+    timings = []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+        timings.append(float(result.stderr.strip().splitlines()[-1]))
+    return timings
+
+def leaked_modules() -> list:
+    code = f"import sys, json, app; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    return json.loads(_run(code))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown vs baseline (0.5 = +50%%)")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Ignore slowdowns smaller than this many seconds")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    report = {
+        "import_app_median_s": statistics.median(time_import(args.repeats)),
+        "cli_help_median_s": statistics.median(time_help(args.repeats)),
+    }
+    leaked = leaked_modules()
+    print(f"⏱️ import app: {report['import_app_median_s'] * 1000:.1f} ms | app.py --help: {report['cli_help_median_s'] * 1000:.1f} ms")
+
+    failures = []
+    if leaked:
+        failures.append(f"heavy modules imported at startup: {', '.join(leaked)}")
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Baseline written to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r") as f:
+            baseline = json.load(f)
+        for metric, value in report.items():
+            limit = max(baseline[metric] * (1 + args.tolerance), baseline[metric] + args.min_delta)
+            if value > limit:
+                failures.append(f"{metric} regressed: {value:.3f}s > {limit:.3f}s (baseline {baseline[metric]:.3f}s)")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Startup within budget.")
+
+if __name__ == "__main__":
+    main()
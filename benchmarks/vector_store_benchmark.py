@@ -0,0 +1,167 @@
+# benchmarks/vector_store_benchmark.py
+"""
+Vector-store backend benchmark: Chroma vs the memory-mapped NumPy store (float16 / int8).
+
+Builds one synthetic filing-sized collection per backend (clustered unit vectors with the
+metadata the retriever filters on), then, in a fresh interpreter per backend, measures:
+
+  * cold open + first query (what a new process pays before its first search)
+  * peak RSS added by opening and querying the store
+  * p50 / p95 latency of filtered top-k queries (where={"type": "child"}, as in search_10k)
+  * fidelity: recall@k against exact float32 cosine top-k, and run-to-run determinism
+  * build time (upserts in batches of ingestion.batch_size, as PDFParser writes) and size on disk
+
+No network needed.
+
+    python benchmarks/vector_store_benchmark.py                     # 5,000 x 768, 200 queries
+    python benchmarks/vector_store_benchmark.py --rows 20000 --dim 768
+    python benchmarks/vector_store_benchmark.py --backends numpy-float16 numpy-int8
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+import yaml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+BACKENDS = ["chroma", "numpy-float16", "numpy-int8"]
+WHERE = {"type": "child"}
+
+def synthetic_corpus(rows: int, dim: int, queries: int, seed: int) -> tuple:
+    """Clustered unit vectors (so neighbourhoods are meaningful), their metadata, and noisy query vectors."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(rows // 50, 1), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), rows)] + 0.6 * rng.normal(size=(rows, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    metadatas = [
+        {"type": "parent" if i % 4 == 0 else "child", "parent_dense": bool(i % 3), "page_number": str(i // 40 + 1)}
+        for i in range(rows)
+    ]
+    documents = [f"passage {i} " + "revenue " * 40 for i in range(rows)]
+    picks = rng.integers(0, rows, queries)
+    query_vectors = vectors[picks] + 0.6 * rng.normal(size=(queries, dim)).astype(np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    return vectors, metadatas, documents, query_vectors
+
+def open_store(backend: str, path: str):
+    if backend == "chroma":
+        import chromadb
+        from src.core.vector_store import ChromaVectorStore
+        return ChromaVectorStore(chromadb.PersistentClient(path=path), "bench", lambda texts: [])
+    from src.core.vector_store import NumpyVectorStore
+    return NumpyVectorStore(path, "bench", quantization=backend.split("-", 1)[1])
+
+def ingestion_batch_size() -> int:
+    """Rows per upsert during a real ingest (ingestion.batch_size), so build time reflects PDFParser."""
+    with open(os.path.join(REPO_ROOT, "config", "config.yaml"), "r") as f:
+        return yaml.safe_load(f).get("ingestion", {}).get("batch_size", 100)
+
+def build(backend: str, path: str, vectors, metadatas, documents, batch: int) -> float:
+    store = open_store(backend, path)
+    ids = [f"row-{i}" for i in range(len(vectors))]
+    started = time.perf_counter()
+    for start in range(0, len(ids), batch):
+        end = start + batch
+        store.upsert(ids[start:end], documents[start:end], metadatas[start:end], vectors[start:end].tolist())
+    return time.perf_counter() - started
+
+def disk_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def exact_topk(vectors, metadatas, query_vectors, k: int) -> list:
+    """Ground truth: float32 cosine top-k over the rows the WHERE filter keeps."""
+    rows = np.array([i for i, m in enumerate(metadatas) if m["type"] == WHERE["type"]])
+    scores = query_vectors @ vectors[rows].T
+    return [[f"row-{rows[j]}" for j in np.argsort(-s, kind="stable")[:k]] for s in scores]
+
+def _memory_mb(field: str) -> float:
+    """VmRSS / VmHWM of this process. (ru_maxrss would carry over the parent's peak across fork+exec.)"""
+    with open("/proc/self/status", "r") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith(field + ":")) / 1024
+
+def worker(args):
+    """Runs in a fresh interpreter: opens the built store and reports timings, RSS and result IDs."""
+    rss_start = _memory_mb("VmRSS")
+    query_vectors = np.load(args.queries_path)
+    started = time.perf_counter()
+    store = open_store(args.backend, args.path)
+    store.query(query_embeddings=[query_vectors[0].tolist()], n_results=args.k, where=WHERE, include=[])
+    cold_s = time.perf_counter() - started
+
+    runs, latencies = [], []
+    for _ in range(2):
+        ids = []
+        for q in query_vectors:
+            t = time.perf_counter()
+            result = store.query(query_embeddings=[q.tolist()], n_results=args.k, where=WHERE,
+                                 include=["metadatas", "documents", "distances"])
+            latencies.append(time.perf_counter() - t)
+            ids.append(result["ids"][0])
+        runs.append(ids)
+    print(json.dumps({
+        "cold_open_first_query_s": cold_s,
+        "rss_mb": _memory_mb("VmHWM") - rss_start,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "deterministic": runs[0] == runs[1],
+        "ids": runs[0],
+    }))
+
+def measure(backend: str, path: str, queries_path: str, k: int) -> dict:
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", "--backend", backend,
+         "--path", path, "--queries-path", queries_path, "--k", str(k)],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000, help="Vectors in the collection (a filing is a few thousand)")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding width (text-embedding-004 is 768)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--batch-size", type=int, help="Rows per upsert (default: ingestion.batch_size in config.yaml)")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    # Internal: one measurement in a fresh interpreter
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--queries-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        return worker(args)
+
+    vectors, metadatas, documents, query_vectors = synthetic_corpus(args.rows, args.dim, args.queries, args.seed)
+    truth = exact_topk(vectors, metadatas, query_vectors, args.k)
+    work_dir = tempfile.mkdtemp(prefix="vector_store_bench_")
+    queries_path = os.path.join(work_dir, "queries.npy")
+    np.save(queries_path, query_vectors)
+    batch = args.batch_size or ingestion_batch_size()
+    print(f"📚 {args.rows} x {args.dim} vectors in upserts of {batch} | {args.queries} filtered queries | top-{args.k}")
+
+    try:
+        print(f"{'backend':<15}{'build s':>9}{'disk MB':>9}{'cold ms':>9}{'RSS MB':>8}{'p50 ms':>8}{'p95 ms':>8}{'recall':>8}  det")
+        for backend in args.backends:
+            path = os.path.join(work_dir, backend)
+            build_s = build(backend, path, vectors, metadatas, documents, batch)
+            report = measure(backend, path, queries_path, args.k)
+            recall = np.mean([len(set(got) & set(want)) / len(want) for got, want in zip(report["ids"], truth)])
+            print(
+                f"{backend:<15}{build_s:>9.2f}{disk_bytes(path) / 2**20:>9.1f}{report['cold_open_first_query_s'] * 1000:>9.1f}"
+                f"{report['rss_mb']:>8.1f}{report['p50_ms']:>8.2f}{report['p95_ms']:>8.2f}{recall:>8.3f}  "
+                f"{'✅' if report['deterministic'] else '❌'}"
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 import os
 import json
+import time
+import asyncio
+import hashlib
+import argparse
+import yaml
 from typing import List
 from deepeval import evaluate
 from deepeval.metrics import FaithfulnessMetric, AnswerRelevancyMetric, ContextualPrecisionMetric
@@ -303,7 +308,7 @@ def prepare_test_cases(data: List[dict]) -> List[LLMTestCase]:
         test_cases.append(test_case)
     return test_cases
 
-# 3. Execution Pipeline
+# 3. Execution Pipeline (hand-written contexts, no agent)
 def run_arjun_evaluation():
     if not os.getenv("GOOGLE_API_KEY"):
         print("❌ Error: GOOGLE_API_KEY environment variable not set.")
@@ -328,5 +333,184 @@ def run_arjun_evaluation():
         metrics=metrics
     )
 
+# 4. Real-Agent Runner: concurrent, cached on disk, resumable
+def build_metrics(judge_model, threshold: float) -> list:
+    # Metric objects keep per-case state (score/reason), so every case gets fresh ones
+    return [
+        FaithfulnessMetric(threshold=threshold, model=judge_model),
+        AnswerRelevancyMetric(threshold=threshold, model=judge_model),
+        ContextualPrecisionMetric(threshold=threshold, model=judge_model)
+    ]
+
+def config_fingerprint(config: dict, index_version: str) -> str:
+    """Changes whenever the pipeline config or the indexed filing changes, invalidating cached outputs."""
+    pipeline_config = {section: values for section, values in config.items() if section != 'eval'}
+    payload = json.dumps(pipeline_config, sort_keys=True, default=str) + index_version
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+class AgentEvalRunner:
+    """
+    Runs FinancialAuditorAgent over `raw_test_data` and judges what it actually answered
+    and retrieved. Agent calls and judge calls are bounded by separate semaphores; every
+    agent output and metric verdict is written to a DiskCache keyed by (question, config
+    fingerprint) as soon as it exists, so an interrupted run resumes where it stopped.
+    """
+    def __init__(self, config_path: str = "config/config.yaml", concurrency: int = None, use_cache: bool = True):
+        from src.agents.financial_auditor import FinancialAuditorAgent
+        from src.core.registry import ResourceRegistry
+
+        with open(config_path, 'r') as f:
+            config = yaml.safe_load(f)
+        eval_cfg = config.get('eval', {})
+        self.concurrency = concurrency or eval_cfg.get('concurrency', 4)
+        self.judge_concurrency = eval_cfg.get('judge_concurrency', 8)
+        self.threshold = eval_cfg.get('threshold', 0.7)
+        self.judge_model_name = eval_cfg.get('judge_model', 'gemini-2.0-flash')
+
+        registry = ResourceRegistry.get(config_path)
+        # The answer cache would hide regressions: every case must exercise the live pipeline
+        agent_config = {**config, "cache": {**config.get('cache', {}), "answers": False}}
+        self.agent = FinancialAuditorAgent(agent_config, registry=registry)
+        self.fingerprint = config_fingerprint(config, registry.db_manager().corpus_version())
+        self.cache = registry.disk_cache('eval.sqlite', max_entries=eval_cfg.get('cache_max_entries', 20000)) if use_cache else None
+        self.judge_model = None
+
+    def _key(self, kind: str, *parts: str) -> str:
+        content_hash = hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+        return f"{kind}|{self.fingerprint}|{content_hash}"
+
+    async def _agent_output(self, entry: dict, agent_slots: asyncio.Semaphore) -> dict:
+        key = self._key("agent", entry["input"])
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            return {**cached, "from_cache": True}
+        async with agent_slots:
+            started = time.perf_counter()
+            try:
+                # The agent is synchronous (streaming generator); run it off the event loop
+                result = await asyncio.to_thread(self.agent.answer, entry["input"])
+            except Exception as e:
+                # Not cached: a failed case (429, timeout, ...) is retried on the next run
+                return {"answer": "", "contexts": [], "citations": [], "error": str(e),
+                        "latency_s": time.perf_counter() - started, "cost_usd": 0.0}
+        output = {
+            "answer": result["answer"],
+            "contexts": result.get("contexts", []),
+            "citations": result["citations"],
+            "latency_s": time.perf_counter() - started,
+            "cost_usd": result["cost_usd"],
+        }
+        if self.cache is not None and output["answer"]:
+            self.cache.set(key, output)
+        return output
+
+    async def _verdict(self, metric, test_case: LLMTestCase, judge_slots: asyncio.Semaphore) -> dict:
+        name = metric.__class__.__name__
+        # Keyed on every test-case field the metrics read: a regenerated answer, different retrieved
+        # contexts or an edited expected_output each get a fresh verdict
+        key = self._key(
+            "judge", test_case.input, test_case.actual_output, test_case.expected_output or "",
+            json.dumps(test_case.retrieval_context or []), name, self.judge_model_name, str(self.threshold)
+        )
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            return cached
+        async with judge_slots:
+            try:
+                await metric.a_measure(test_case)
+            except Exception as e:
+                # Not cached: a failed judgement is retried on the next run
+                return {"metric": name, "error": str(e)}
+        verdict = {"metric": name, "score": metric.score, "success": metric.is_successful(), "reason": metric.reason}
+        if self.cache is not None:
+            self.cache.set(key, verdict)
+        return verdict
+
+    async def _run_case(self, n: int, entry: dict, agent_slots, judge_slots) -> dict:
+        output = await self._agent_output(entry, agent_slots)
+        if "error" in output:
+            # Nothing to judge; every metric records the failure so the summary counts it
+            print(f"❌ [{n}] {entry['input'][:60]} | agent failed: {output['error']}")
+            verdicts = [{"metric": metric.__class__.__name__, "error": f"agent failed: {output['error']}"}
+                        for metric in build_metrics(self.judge_model, self.threshold)]
+            return {"input": entry["input"], "expected_output": entry["expected_output"], **output, "verdicts": verdicts}
+        test_case = LLMTestCase(
+            input=entry["input"],
+            actual_output=output["answer"],
+            retrieval_context=output["contexts"] or ["NO_CONTEXT_RETRIEVED"],
+            expected_output=entry["expected_output"]
+        )
+        verdicts = await asyncio.gather(*(
+            self._verdict(metric, test_case, judge_slots)
+            for metric in build_metrics(self.judge_model, self.threshold)
+        ))
+        status = "♻️" if output.get("from_cache") else "✅"
+        print(f"{status} [{n}] {entry['input'][:60]} | {', '.join(_format_verdict(v) for v in verdicts)}")
+        return {"input": entry["input"], "expected_output": entry["expected_output"], **output, "verdicts": verdicts}
+
+    async def run(self, data: List[dict]) -> List[dict]:
+        self.judge_model = ArjunEvalJudge(model_name=self.judge_model_name)
+        agent_slots = asyncio.Semaphore(self.concurrency)
+        judge_slots = asyncio.Semaphore(self.judge_concurrency)
+        return await asyncio.gather(*(
+            self._run_case(n, entry, agent_slots, judge_slots) for n, entry in enumerate(data, start=1)
+        ))
+
+def _format_verdict(verdict: dict) -> str:
+    if "error" in verdict:
+        return f"{verdict['metric']}=ERROR"
+    return f"{verdict['metric'].replace('Metric', '')}={verdict['score']:.2f}"
+
+def summarize(results: List[dict]) -> dict:
+    summary = {}
+    for result in results:
+        for verdict in result["verdicts"]:
+            stats = summary.setdefault(verdict["metric"], {"scores": [], "passed": 0, "errors": 0})
+            if "error" in verdict:
+                stats["errors"] += 1
+                continue
+            stats["scores"].append(verdict["score"])
+            stats["passed"] += bool(verdict["success"])
+    return {
+        metric: {
+            "mean_score": round(sum(s["scores"]) / len(s["scores"]), 4) if s["scores"] else None,
+            "pass_rate": round(s["passed"] / len(s["scores"]), 4) if s["scores"] else None,
+            "errors": s["errors"],
+        }
+        for metric, s in summary.items()
+    }
+
+def run_agent_evaluation(config_path: str = "config/config.yaml", limit: int = None, concurrency: int = None,
+                         use_cache: bool = True, output_path: str = "eval_results.json"):
+    if not os.getenv("GOOGLE_API_KEY"):
+        print("❌ Error: GOOGLE_API_KEY environment variable not set.")
+        return
+
+    data = raw_test_data[:limit] if limit else raw_test_data
+    runner = AgentEvalRunner(config_path, concurrency=concurrency, use_cache=use_cache)
+    print(f"🚀 Evaluating the live agent on {len(data)} cases ({runner.concurrency} concurrent, fingerprint {runner.fingerprint})...")
+    started = time.perf_counter()
+    results = asyncio.run(runner.run(data))
+    summary = summarize(results)
+
+    with open(output_path, 'w') as f:
+        json.dump({"fingerprint": runner.fingerprint, "summary": summary, "results": results}, f, indent=2)
+    agent_cost = sum(r["cost_usd"] for r in results if not r.get("from_cache"))
+    failed = sum("error" in r for r in results)
+    print(f"🏁 Done in {time.perf_counter() - started:.1f}s | {failed} agent failures | agent spend ${agent_cost:.4f} | Report: {output_path}")
+    for metric, stats in summary.items():
+        print(f"   {metric}: mean {stats['mean_score']} | pass rate {stats['pass_rate']} | errors {stats['errors']}")
+    return summary
+
 if __name__ == "__main__":
-    run_arjun_evaluation()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--static", action="store_true", help="Judge the hand-written contexts instead of the live agent")
+    parser.add_argument("--limit", type=int, help="Only the first N cases")
+    parser.add_argument("--concurrency", type=int, help="Agent calls in flight")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached agent outputs and verdicts")
+    parser.add_argument("--output", type=str, default="eval_results.json")
+    args = parser.parse_args()
+    if args.static:
+        run_arjun_evaluation()
+    else:
+        run_agent_evaluation(limit=args.limit, concurrency=args.concurrency, use_cache=not args.no_cache, output_path=args.output)
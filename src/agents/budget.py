@@ -0,0 +1,60 @@
+# src/agents/budget.py
+import time
+
+class QueryBudget:
+    """
+    Per-question limits on the agent loop: tool rounds, cumulative prompt tokens and
+    wall-clock time. The loop records every Gemini turn and asks `exhausted()` before
+    running more tools; once it returns a reason, the agent forces a final answer.
+    """
+    def __init__(self, max_tool_rounds: int = 6, max_prompt_tokens: int = 60_000,
+                 max_wall_clock_s: float = 60.0, started: float = None):
+        self.max_tool_rounds = max_tool_rounds
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_wall_clock_s = max_wall_clock_s
+        self.started = started if started is not None else time.perf_counter()
+        self.tool_rounds = 0
+        self.prompt_tokens = 0
+        self.last_prompt_tokens = 0
+        self.reason = None
+
+    @classmethod
+    def from_config(cls, agent_cfg: dict, started: float = None) -> "QueryBudget":
+        budget_cfg = agent_cfg.get('budget', {})
+        return cls(
+            max_tool_rounds=budget_cfg.get('max_tool_rounds', 6),
+            max_prompt_tokens=budget_cfg.get('max_prompt_tokens', 60_000),
+            max_wall_clock_s=budget_cfg.get('max_wall_clock_s', 60.0),
+            started=started
+        )
+
+    def record_turn(self, prompt_tokens: int):
+        self.prompt_tokens += prompt_tokens
+        self.last_prompt_tokens = prompt_tokens
+
+    def record_tool_round(self):
+        self.tool_rounds += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def exhausted(self) -> str:
+        """Why no further tool round may run (None while within budget). Sticky once hit."""
+        if self.reason:
+            return self.reason
+        if self.max_tool_rounds is not None and self.tool_rounds >= self.max_tool_rounds:
+            self.reason = f"{self.tool_rounds} tool rounds"
+        # The next turn re-sends the whole history, so it costs at least as much as the last one
+        elif self.max_prompt_tokens is not None and self.prompt_tokens + self.last_prompt_tokens > self.max_prompt_tokens:
+            self.reason = f"{self.prompt_tokens:,} of {self.max_prompt_tokens:,} prompt tokens"
+        elif self.max_wall_clock_s is not None and self.elapsed() >= self.max_wall_clock_s:
+            self.reason = f"{self.elapsed():.1f}s wall-clock"
+        return self.reason
+
+    def summary(self) -> dict:
+        return {
+            "tool_rounds": self.tool_rounds,
+            "prompt_tokens": self.prompt_tokens,
+            "elapsed_s": round(self.elapsed(), 3),
+            "exhausted": self.reason,
+        }
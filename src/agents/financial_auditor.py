@@ -1,31 +1,247 @@
 # src/agents/financial_auditor.py
-import os
-from google import genai
+import re
+import time
+import queue
+import contextvars
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
 from google.genai import types
+from src.agents.budget import QueryBudget
+from src.agents.session_store import AgentSession, SessionStore
+from src.core.registry import ResourceRegistry
 from src.tools.retriever import RetrievalTool
 from src.tools.calculator import MathTool
+from src.tools.table_lookup import FinancialTableTool
 from src.tools.visualizer import VisualizerTool 
 from src.utils.cost_tracker import CostTracker
+from src.utils.progress import progress_to
+from src.utils.semantic_cache import SemanticCache, normalize_query
+from src.utils.tracing import span
+
+# Progress label shown while each tool runs
+TOOL_STAGES = {
+    "lookup_financial_value": ("looking_up", "🧮 Looking up financial tables"),
+    "search_10k": ("searching", "🔎 Searching the 10-K"),
+    "calculate": ("calculating", "➗ Calculating"),
+    "calculate_many": ("calculating", "➗ Calculating"),
+    "create_dynamic_chart": ("charting", "📊 Building chart"),
+}
+# Tools that touch the Streamlit script context must run on the caller's thread
+# (none since charts became specs rendered by the caller)
+INLINE_TOOLS = set()
+# Tools whose output is a chart spec (reported as the answer's "charts")
+CHART_TOOLS = {"create_dynamic_chart"}
+# Tools whose output is evidence from the filing (reported as the answer's "contexts")
+EVIDENCE_TOOLS = {"search_10k", "lookup_financial_value"}
+_DATA_CHUNK_RE = re.compile(r"<DATA_CHUNK.*?</DATA_CHUNK>", re.DOTALL)
+_NO_EVIDENCE = ("NOT_FOUND", "NO_TABLE_STORE", "Error:")
 
 class FinancialAuditorAgent:
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, registry: ResourceRegistry = None):
         self.config = config
-        self.client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+        self.registry = registry or ResourceRegistry.get()
+        self.client = self.registry.genai_client()
         self.model_id = config.get('gemini', {}).get('model_name', 'gemini-2.0-flash')
         
-        # Tools initialization
-        self.retriever = RetrievalTool()
+        # Tools initialization (heavy resources come from the shared registry)
+        self.retriever = RetrievalTool(registry=self.registry)
+        self.table_tool = FinancialTableTool(registry=self.registry)
         self.math_tool = MathTool()
         self.visualizer = VisualizerTool() 
+        # Tool calls run here (not on the retrieval pool, which the tools themselves use)
+        self.tool_pool = self.registry.get_or_create(
+            "agent_tool_pool",
+            lambda: ThreadPoolExecutor(max_workers=config.get('agent', {}).get('tool_workers', 8))
+        )
+
+        # Per-user conversations (chat + retrieved evidence), bounded by LRU and TTL
+        agent_cfg = config.get('agent', {})
+        self.sessions = SessionStore(
+            max_sessions=agent_cfg.get('max_sessions', 256),
+            ttl_seconds=agent_cfg.get('session_ttl_s', 1800)
+        )
+        self.session_evidence_max = agent_cfg.get('session_evidence_max', 32)
+
+        # Answer cache (exact normalized match unless semantic reuse is enabled), scoped to the collection + indexed filing version
+        self.answer_cache = self._build_answer_cache()
+        self._cache_scope = None
+
+    def _build_answer_cache(self):
+        cache_cfg = self.config.get('cache', {})
+        if not cache_cfg.get('answers', True):
+            return None
+        store = self.registry.disk_cache('answers.sqlite', max_entries=cache_cfg.get('answer_max_entries', 2000))
+        return SemanticCache(
+            store,
+            embedding_function=self.retriever.db.gemini_ef,
+            similarity_threshold=cache_cfg.get('answer_similarity_threshold')
+        )
+
+    def _current_scope(self) -> str:
+        db = self.retriever.db
+        scope = f"{db.collection.name}@{db.corpus_version()}"
+        if scope != self._cache_scope:
+            # Collection was (re-)ingested since we last looked: answers from older versions are stale
+            dropped = self.answer_cache.drop_other_scopes(scope)
+            if dropped:
+                print(f"♻️ Answer cache: dropped {dropped} answers from a previous index version.")
+            self._cache_scope = scope
+        return scope
+
+    @staticmethod
+    def extract_citations(text: str) -> list:
+        """Unique page references ('Page 42') cited in an answer, in order of appearance."""
+        pages = re.findall(r"\b[Pp]age\s+([A-Za-z0-9\-]+)", text or "")
+        return [f"Page {p}" for p in dict.fromkeys(pages)]
+
+    def run(self, user_query: str, session_id: str = None):
+        return self.answer(user_query, session_id=session_id)["answer"]
+
+    def answer(self, user_query: str, session_id: str = None) -> dict:
+        """Answers a question and returns the text with its citations, token usage and cost."""
+        result = None
+        for event in self.run_stream(user_query, session_id=session_id):
+            if event["type"] == "done":
+                result = event["result"]
+        return result
+
+    def run_stream(self, user_query: str, session_id: str = None):
+        """
+        Streaming variant of answer(). With `session_id`, the turn continues that user's
+        conversation (same chat, reused evidence). Yields events as they happen:
+          {"type": "status", "stage": ..., "message": ...}  tool progress (searching, reranking, ...)
+          {"type": "token", "text": ...}                     answer text as it is generated
+          {"type": "discard"}                                the tokens since the last discard were the model
+                                                             thinking aloud before a tool call, not the answer
+          {"type": "done", "result": {...}}                  same dict answer() returns
+        """
+        started = time.perf_counter()
+        session = None
+        if session_id is not None:
+            session = self.sessions.get_or_create(
+                session_id, lambda: AgentSession(session_id, self._new_chat(), max_evidence=self.session_evidence_max)
+            )
+        with session.lock if session else nullcontext(), span("agent.turn", query_chars=len(user_query), session=session_id is not None) as s:
+            for event in self._answer_turn(user_query, started, session):
+                if event["type"] == "done":
+                    result = event["result"]
+                    result["trace_id"] = s.trace_id
+                    s.set(cached=result.get("cached", False), prompt_tokens=result["prompt_tokens"],
+                          completion_tokens=result["completion_tokens"], cost_usd=result["cost_usd"],
+                          answer_chars=len(result["answer"]))
+                yield event
+            if session:
+                session.turns += 1
 
-    def run(self, user_query: str):
+    def _answer_turn(self, user_query: str, started: float, session: AgentSession = None):
+        # Follow-ups ("now compare that to 2024") depend on the conversation, so only
+        # a conversation's opening question may be served from the answer cache
+        use_cache = self.answer_cache is not None and (session is None or session.turns == 0)
+        scope = None
+        if use_cache:
+            scope = self._current_scope()
+            cached = self.answer_cache.get(user_query, scope=scope)
+            if cached is not None:
+                hit_rate = self.answer_cache.stats()["hit_rate"]
+                print(f"⚡ Answer cache hit (hit rate {hit_rate:.0%}) - no LLM call made.")
+                if session:
+                    # Keep the conversation coherent for follow-ups even though no LLM call was made
+                    session.chat.record_history(
+                        user_input=types.Content(role="user", parts=[types.Part(text=user_query)]),
+                        model_output=[types.Content(role="model", parts=[types.Part(text=cached["answer"])])],
+                        is_valid=True
+                    )
+                yield {"type": "status", "stage": "cache_hit", "message": "⚡ Answered from cache"}
+                yield {"type": "token", "text": cached["answer"]}
+                latency = time.perf_counter() - started
+                yield {"type": "done", "result": {**cached, "cached": True, "latency_s": latency, "ttft_s": latency}}
+                return
+
+        result = None
+        chat = session.chat if session else self._new_chat()
+        for event in self._run_agent(user_query, started, chat, session):
+            if event["type"] == "done":
+                result = event["result"]
+            else:
+                yield event
+        result["latency_s"] = time.perf_counter() - started
+        if use_cache and result["answer"]:
+            self.answer_cache.put(user_query, {k: v for k, v in result.items() if k not in ("latency_s", "ttft_s")}, scope=scope)
+        yield {"type": "done", "result": result}
+
+    def _call_tool(self, tools: dict, call, session: AgentSession = None):
+        """Runs one requested tool, yielding its progress events; the last event carries the result."""
+        name, args = call.name, dict(call.args or {})
+        stage, label = TOOL_STAGES.get(name, ("tool", f"🛠️ {name}"))
+        detail = args.get("query") or args.get("line_item") or args.get("expression") or args.get("title") or ""
+        if name == "calculate_many":
+            detail = "; ".join(args.get("expressions") or [])
+
+        # Follow-ups in a session reuse evidence this conversation already retrieved
+        evidence_key = None
+        if name == "search_10k" and session:
+            filters = " ".join(f"{k}={args[k]}" for k in ("ticker", "fiscal_year") if args.get(k))
+            evidence_key = normalize_query(args.get("query", "")) + (f" [{filters}]" if filters else "")
+        if evidence_key and evidence_key in session.evidence:
+            yield {"type": "status", "stage": "reusing", "message": f"♻️ Reusing earlier evidence: {detail}"}
+            yield {"type": "tool_result", "result": session.evidence[evidence_key]}
+            return
+        yield {"type": "status", "stage": stage, "message": f"{label}: {detail}" if detail else label}
+
+        if name not in tools:
+            yield {"type": "tool_result", "result": f"Error: unknown tool '{name}'"}
+            return
+        if name in INLINE_TOOLS:
+            try:
+                output = tools[name](**args)
+            except Exception as e:
+                output = f"Error: {str(e)}"
+            yield {"type": "tool_result", "result": output}
+            return
+
+        # Other tools run on the tool pool so their internal progress can stream meanwhile
+        events = queue.Queue()
+        def invoke():
+            with progress_to(lambda stage, message: events.put({"type": "status", "stage": stage, "message": message})):
+                return tools[name](**args)
+        future = self.tool_pool.submit(contextvars.copy_context().run, invoke)
+        while not future.done() or not events.empty():
+            try:
+                yield events.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        try:
+            output = future.result()
+        except Exception as e:
+            output = f"Error: {str(e)}"
+        else:
+            if evidence_key:
+                session.remember(evidence_key, output)
+        yield {"type": "tool_result", "result": output}
+
+    @staticmethod
+    def _split_chunk(chunk):
+        """Text and function calls of a streamed chunk (first candidate only)."""
+        text, calls = "", []
+        candidate = chunk.candidates[0] if chunk.candidates else None
+        for part in (candidate.content.parts or []) if candidate and candidate.content else []:
+            if part.text:
+                text += part.text
+            if part.function_call:
+                calls.append(part.function_call)
+        return text, calls
+
+    def _tools(self) -> list:
         # Tools include Search, Math, and Dynamic Visuals
-        tools = [
+        return [
+            self.table_tool.lookup_financial_value,
             self.retriever.search_10k, 
             self.math_tool.calculate, 
+            self.math_tool.calculate_many,
             self.visualizer.create_dynamic_chart
         ]
 
+    def _chat_config(self, final_answer: bool = False):
         # FINAL COMBINED PROMPT: Original rules + Deep Dive Quarterly Protocol
         system_instruction = """
         You are a Lead Financial Auditor and Data Visualization Expert at a Big Four firm. 
@@ -43,29 +259,127 @@ class FinancialAuditorAgent:
            - If a specific table isn't found, check the 'MD&A' section for quarterly revenue discussions.
 
         AGENT PROTOCOL:
-        - Use 'search_10k' to find raw numbers and table data.
+        - Use 'lookup_financial_value' first for specific line items (Net income, Total net sales, CapEx, current assets/liabilities).
+        - Use 'search_10k' to find raw numbers and table data when the lookup returns NOT_FOUND or you need narrative context.
+        - MULTIPLE FILINGS: pass 'ticker' (and 'fiscal_year' for search_10k) when the question names a company or year;
+          each DATA_CHUNK's FILING tag says which 10-K it came from. Compare companies with one search per ticker.
         - Use 'calculate' for percentage or difference comparisons.
+        - Use 'calculate_many' when several figures are needed (margins, ratios, free cash flow): one call with
+          named expressions like 'fcf = 111482 - 11205', which may reference each other by name.
         - Use 'create_dynamic_chart' for any request to "Visualize", "Graph", or "Chart". 
           - Use 'line' for quarterly trends, 'pie' for revenue mix, and 'bar' for segment comparisons.
         - Cite the page and section found in the retrieval metadata.
+        - FOLLOW-UPS: Reuse DATA_CHUNKs already retrieved earlier in this conversation; only call 'search_10k' for data you do not have yet.
         """
 
-        # Creating the chat session with automatic tool calling enabled
-        chat = self.client.chats.create(
-            model=self.model_id,
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                tools=tools,
-                automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=False),
-                temperature=0.0
-            )
+        # Out of budget: tools stay declared (the history holds their calls) but may no longer be called
+        tool_config = None
+        if final_answer:
+            tool_config = types.ToolConfig(function_calling_config=types.FunctionCallingConfig(mode="NONE"))
+        return types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            tools=self._tools(),
+            tool_config=tool_config,
+            automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
+            temperature=0.0
         )
 
-        response = chat.send_message(user_query)
-        
+    def _new_chat(self):
+        # Creating the chat session. Tool calls are executed by the loop below (not the SDK)
+        # so progress and answer tokens can be streamed while the model works.
+        return self.client.chats.create(model=self.model_id, config=self._chat_config())
+
+    def _run_agent(self, user_query: str, started: float, chat, session: AgentSession = None):
+        tool_map = {tool.__name__: tool for tool in self._tools()}
+
+        # ttft: first answer token of the turn that produced the answer (discarded turns don't count)
+        answer_parts, contexts, charts, ttft = [], [], [], None
+        prompt_tokens = completion_tokens = total_tokens = 0
+        # Hard bound on rounds, prompt tokens and wall-clock for this question
+        budget = QueryBudget.from_config(self.config.get('agent', {}), started=started)
+        message, turn_config = user_query, None
+        turn = 0
+        while True:
+            turn += 1
+            calls, usage = [], None
+            with span("gemini.turn", turn=turn, model=self.model_id, forced_final=turn_config is not None) as turn_span:
+                for chunk in chat.send_message_stream(message, config=turn_config):
+                    text, chunk_calls = self._split_chunk(chunk)
+                    calls.extend(chunk_calls)
+                    usage = chunk.usage_metadata or usage
+                    if text:
+                        if ttft is None:
+                            ttft = time.perf_counter() - started
+                        answer_parts.append(text)
+                        yield {"type": "token", "text": text}
+
+                # Every turn is billed, not just the final one
+                if usage:
+                    prompt_tokens += usage.prompt_token_count or 0
+                    completion_tokens += usage.candidates_token_count or 0
+                    total_tokens += usage.total_token_count or 0
+                    turn_span.set(prompt_tokens=usage.prompt_token_count or 0,
+                                  completion_tokens=usage.candidates_token_count or 0)
+                    budget.record_turn(usage.prompt_token_count or 0)
+                turn_span.set(function_calls=[call.name for call in calls])
+            if not calls or turn_config is not None:
+                break
+            # Text streamed before a tool call is the model thinking aloud, not part of the answer
+            if answer_parts:
+                answer_parts, ttft = [], None
+                yield {"type": "discard"}
+
+            responses = []
+            for call in calls:
+                reason = budget.exhausted()
+                if reason:
+                    # Every call still needs a response; this one tells the model to stop searching
+                    responses.append(types.Part.from_function_response(name=call.name, response={"result": (
+                        f"BUDGET_EXHAUSTED ({reason}): no further tool calls are possible. Answer now from "
+                        "the evidence already gathered and state what could not be verified."
+                    )}))
+                    continue
+                with span(f"tool.{call.name}", args_chars=len(str(dict(call.args or {})))) as tool_span:
+                    for event in self._call_tool(tool_map, call, session):
+                        if event["type"] == "tool_result":
+                            output = event["result"]
+                            tool_span.set(output_chars=len(str(output)), failed=str(output).startswith("Error:"))
+                            if call.name in EVIDENCE_TOOLS and isinstance(output, str) and not output.startswith(_NO_EVIDENCE):
+                                contexts.extend(_DATA_CHUNK_RE.findall(output) or [output])
+                            spec = VisualizerTool.parse_spec(output) if call.name in CHART_TOOLS else None
+                            if spec:
+                                charts.append(spec)
+                            responses.append(types.Part.from_function_response(name=call.name, response={"result": output}))
+                        else:
+                            if event.get("stage") == "reusing":
+                                tool_span.set(reused=True)
+                            yield event
+            budget.record_tool_round()
+            message = responses
+
+            reason = budget.exhausted()
+            if reason:
+                # The next turn must answer: function calling is switched off for it
+                turn_config = self._chat_config(final_answer=True)
+                print(f"⏳ Budget reached ({reason}); forcing a final answer.")
+                yield {"type": "status", "stage": "budget", "message": f"⏳ Budget reached ({reason}); answering from the evidence gathered so far"}
+
+        answer = "".join(answer_parts)
         # Track and log cost
-        if response.usage_metadata:
-            usd, inr = CostTracker.calculate(self.model_id, response.usage_metadata)
-            print(f"📊 Transaction Log: ${usd:.5f} | Tokens: {response.usage_metadata.total_token_count}")
+        usd, inr = CostTracker.calculate_tokens(self.model_id, prompt_tokens, completion_tokens)
+        print(f"📊 Transaction Log: ${usd:.5f} | Tokens: {total_tokens} | TTFT: {ttft or 0:.2f}s")
             
-        return response.text
\ No newline at end of file
+        yield {"type": "done", "result": {
+            "answer": answer,
+            "citations": self.extract_citations(answer),
+            "contexts": contexts,
+            "charts": charts,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": total_tokens,
+            "cost_usd": usd,
+            "cost_inr": inr,
+            "ttft_s": ttft,
+            "budget": budget.summary(),
+            "cached": False
+        }}
\ No newline at end of file
@@ -0,0 +1,57 @@
+# src/agents/session_store.py
+import time
+import threading
+from collections import OrderedDict
+
+class AgentSession:
+    """One user's conversation: the live Gemini chat plus the search evidence it has already pulled."""
+    def __init__(self, session_id: str, chat, max_evidence: int = 32):
+        self.session_id = session_id
+        self.chat = chat
+        self.turns = 0
+        self.max_evidence = max_evidence
+        self.evidence = OrderedDict()  # normalized search query -> DATA_CHUNK block
+        self.last_used = time.time()
+        self.lock = threading.Lock()   # one turn at a time per conversation
+
+    def remember(self, query_key: str, chunks: str):
+        self.evidence[query_key] = chunks
+        self.evidence.move_to_end(query_key)
+        while len(self.evidence) > self.max_evidence:
+            self.evidence.popitem(last=False)
+
+class SessionStore:
+    """Thread-safe LRU + TTL map of session_id -> AgentSession, so memory stays flat under many users."""
+    def __init__(self, max_sessions: int = 256, ttl_seconds: float = 1800):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        stale = [sid for sid, session in self._sessions.items() if now - session.last_used > self.ttl_seconds]
+        for sid in stale:
+            del self._sessions[sid]
+
+    def get_or_create(self, session_id: str, factory) -> AgentSession:
+        """The live session for `session_id`, or a new one built by `factory()` (evicting the LRU one if full)."""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = factory()
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            session.last_used = now
+            return session
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
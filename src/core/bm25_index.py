@@ -0,0 +1,98 @@
+# src/core/bm25_index.py
+import re
+import json
+import math
+import os
+
+# Words, and numbers with their thousands separators folded in ("112,010" -> "112010")
+_TOKEN_RE = re.compile(r"[a-z]+|\d[\d,]*(?:\.\d+)?")
+
+# Exact-token signals: quoted phrases, note/item references, full dates, grouped figures.
+# A bare fiscal year ("in 2025") is deliberately not enough.
+_LEXICAL_RE = re.compile(
+    r"[\"“”]|'[^']+'|\bnote\s+\d+|\bitem\s+\d|\b(?:january|february|march|april|may|june|july|august|"
+    r"september|october|november|december)\s+\d{1,2},|\d{1,3}(?:,\d{3})+",
+    re.IGNORECASE
+)
+
+def tokenize(text: str) -> list:
+    return [tok.replace(",", "") for tok in _TOKEN_RE.findall(text.lower())]
+
+def looks_lexical(query: str) -> bool:
+    """True when a query hinges on exact tokens that BM25 matches better than an LLM rewrite."""
+    return bool(_LEXICAL_RE.search(query))
+
+class BM25Index:
+    """
+    Okapi BM25 over an inverted index of child chunks. Built at ingestion,
+    persisted as JSON next to the manifest, and searched fully in memory.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []          # chunk IDs, by internal doc number
+        self.parent_ids = []   # parent of each chunk
+        self.dense = []        # parent passed the table-density check (see parser.passage_features)
+        self.doc_lens = []
+        self.postings = {}     # term -> [[doc, tf], ...]
+        self.idf = {}
+        self.avgdl = 0.0
+
+    def build(self, ids: list, texts: list, parent_ids: list, dense: list = None):
+        self.ids, self.parent_ids, self.doc_lens, self.postings = list(ids), list(parent_ids), [], {}
+        self.dense = list(dense) if dense is not None else [True] * len(self.ids)
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text)
+            self.doc_lens.append(len(tokens))
+            counts = {}
+            for tok in tokens:
+                counts[tok] = counts.get(tok, 0) + 1
+            for tok, tf in counts.items():
+                self.postings.setdefault(tok, []).append([doc, tf])
+        self._finalize()
+        return self
+
+    def _finalize(self):
+        n = len(self.ids)
+        self.avgdl = sum(self.doc_lens) / n if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = 40, dense_only: bool = False) -> list:
+        """Top-k [(chunk_id, parent_id, score)] best-first; `dense_only` keeps children of dense parents."""
+        scores = {}
+        k1, b, avgdl = self.k1, self.b, self.avgdl or 1.0
+        for term in set(tokenize(query)):
+            plist = self.postings.get(term)
+            if not plist:
+                continue
+            idf = self.idf[term]
+            for doc, tf in plist:
+                norm = k1 * (1 - b + b * self.doc_lens[doc] / avgdl)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        if dense_only:
+            scores = {doc: score for doc, score in scores.items() if self.dense[doc]}
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.ids[doc], self.parent_ids[doc], score) for doc, score in best]
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "k1": self.k1, "b": self.b, "ids": self.ids, "parent_ids": self.parent_ids, "dense": self.dense,
+                "doc_lens": self.doc_lens, "postings": self.postings
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, 'r') as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.ids, index.parent_ids = data["ids"], data["parent_ids"]
+        index.dense = data.get("dense", [True] * len(index.ids))
+        index.doc_lens, index.postings = data["doc_lens"], data["postings"]
+        index._finalize()
+        return index
@@ -1,24 +1,70 @@
 import os
+import json
 import yaml
-import chromadb
+import hashlib
+import threading
+from array import array
 from google import genai
-from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from src.core.bm25_index import BM25Index
+from src.core.filings import FilingRegistry
+from src.core.table_store import FinancialTableStore
+from src.core.vector_store import ChromaVectorStore, NumpyVectorStore, VectorStore
+from src.utils.disk_cache import DiskCache
 
-class GeminiEmbeddingFunction(EmbeddingFunction):
-    def __init__(self, api_key: str):
-        self.client = genai.Client(api_key=api_key)
+class GeminiEmbeddingFunction:
+    # Plain callable (texts -> vectors); ChromaVectorStore adapts it, so chromadb is only imported for that backend
+    def __init__(self, api_key: str, task_type: str = "RETRIEVAL_DOCUMENT", cache: DiskCache = None,
+                 client: genai.Client = None):
+        self.client = client or genai.Client(api_key=api_key)
         self.model = "text-embedding-004" 
+        self.task_type = task_type
+        # Optional content-addressed cache: (model, task_type, sha256(text)) -> vector
+        self.cache = cache
 
-    def __call__(self, input: Documents) -> Embeddings:
+    def _cache_key(self, text: str) -> str:
+        return f"{self.model}|{self.task_type}|{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def _embed(self, texts: list) -> list:
         response = self.client.models.embed_content(
             model=self.model,
-            contents=input,
-            config={"task_type": "RETRIEVAL_DOCUMENT"}
+            contents=texts,
+            config={"task_type": self.task_type}
         )
         return [item.values for item in response.embeddings]
 
+    def __call__(self, input: list) -> list:
+        if self.cache is None:
+            return self._embed(list(input))
+
+        # Bulk lookup: only texts that were never embedded before go to Gemini
+        keys = [self._cache_key(text) for text in input]
+        cached = self.cache.get_many(keys)
+        missing = {key: text for key, text in zip(keys, input) if key not in cached}
+
+        if missing:
+            vectors = self._embed(list(missing.values()))
+            fresh = {key: array('f', vec) for key, vec in zip(missing, vectors)}
+            self.cache.set_many(fresh)
+            cached.update(fresh)
+
+        return [list(cached[key]) for key in keys]
+
 class DatabaseManager:
-    def __init__(self, config_path: str = "config/config.yaml"):
+    """
+    One collection (in the configured vector store backend) plus its side indexes. The configured
+    collection is the default; with a filings corpus, `shard(name)` gives the manager of each
+    filing's own collection.
+    """
+    def __init__(self, config_path: str = "config/config.yaml", embedding_function=None,
+                 genai_client: genai.Client = None, shard_of: "DatabaseManager" = None, collection_name: str = None):
+        if shard_of is not None:
+            # Another filing's collection: shares the default manager's config, Chroma client, embeddings and registry
+            self.config, self.client, self.gemini_ef, self.filings = (
+                shard_of.config, shard_of.client, shard_of.gemini_ef, shard_of.filings
+            )
+            self._bind(collection_name)
+            return
+
         with open(config_path, 'r') as f:
             self.config = yaml.safe_load(f)
         
@@ -26,12 +72,125 @@ class DatabaseManager:
         env_var_name = self.config.get('gemini', {}).get('api_key_env', 'GOOGLE_API_KEY')
         api_key = os.getenv(env_var_name)
         
-        self.client = chromadb.PersistentClient(path=self.config['embedding']['chroma_path'])
-        self.gemini_ef = GeminiEmbeddingFunction(api_key=api_key)
+        self.client = None  # Chroma client, opened by the first Chroma-backed collection
+        # Any Chroma-compatible embedding function can stand in for Gemini (e.g. a local one for tests)
+        self.gemini_ef = embedding_function or GeminiEmbeddingFunction(
+            api_key=api_key,
+            cache=self._build_embedding_cache(),
+            client=genai_client
+        )
         
-        self.collection = self.client.get_or_create_collection(
-            name=self.config['embedding']['collection_name'],
-            embedding_function=self.gemini_ef
+        self._bind(collection_name or self.config['embedding']['collection_name'])
+        self.filings = FilingRegistry(self.config.get('filings', {}).get(
+            'registry_path', os.path.join(self.config.get('ingestion', {}).get('index_dir', 'data/index'), 'filings.json')
+        ))
+
+    def _bind(self, collection_name: str):
+        self.collection_name = collection_name
+        # Chroma-compatible store (query/get/upsert/delete) holding this collection's parents and children
+        self.collection = self._open_store(collection_name)
+        self._shards = {}
+        self._shards_lock = threading.Lock()
+
+    def _open_store(self, collection_name: str) -> VectorStore:
+        embedding_cfg = self.config['embedding']
+        if embedding_cfg.get('backend', 'chroma') == 'numpy':
+            return NumpyVectorStore(
+                os.path.join(embedding_cfg.get('numpy_path', 'data/vector_store'), collection_name),
+                collection_name,
+                embedding_function=self.gemini_ef,
+                quantization=embedding_cfg.get('quantization', 'float16')
+            )
+        if self.client is None:
+            import chromadb
+            self.client = chromadb.PersistentClient(path=embedding_cfg['chroma_path'])
+        return ChromaVectorStore(self.client, collection_name, self.gemini_ef)
+
+    def shard(self, collection_name: str) -> "DatabaseManager":
+        """Manager of another filing's collection, sharing this one's Chroma client, embeddings and registry."""
+        if collection_name == self.collection_name:
+            return self
+        with self._shards_lock:
+            if collection_name not in self._shards:
+                self._shards[collection_name] = DatabaseManager(shard_of=self, collection_name=collection_name)
+            return self._shards[collection_name]
+
+    def corpus_version(self) -> str:
+        """Version of everything searchable: the default collection and every registered filing."""
+        filings = self.filings.all()
+        if not filings:
+            return self.index_version()
+        versions = [f"{f['collection']}@{self.shard(f['collection']).index_version()}" for f in filings]
+        if self.has_default_index():
+            versions.append(f"{self.collection_name}@{self.index_version()}")
+        return hashlib.sha256("|".join(versions).encode("utf-8")).hexdigest()[:16]
+
+    def has_default_index(self) -> bool:
+        """Whether a filing was ingested into this collection itself (i.e. `--ingest` without `--filing`)."""
+        return os.path.exists(self.index_path("manifest.json"))
+
+    def route(self, query: str, ticker: str = "", fiscal_year: int = None, max_shards: int = 4) -> list:
+        """
+        [(filing label, DatabaseManager)] a question should search: the filings `FilingRegistry.route`
+        picks, plus this (default) collection, labelled None, unless the question is pinned to a
+        registered company. Without a corpus, just this collection.
+        """
+        if not len(self.filings):
+            return [(None, self)]
+        filings = self.filings.route(query, ticker=ticker, fiscal_year=fiscal_year, max_shards=max_shards)
+        targets = [(self.filings.label(f), self.shard(f["collection"])) for f in filings]
+        pinned = bool(filings) if ticker else bool(self.filings.mentioned_tickers(query))
+        if not pinned and self.has_default_index() and all(db is not self for _, db in targets):
+            targets.append((None, self))
+        return targets
+
+    def index_path(self, filename: str) -> str:
+        """Path for a side artifact (manifest, lexical index, ...) that belongs to this collection."""
+        index_dir = os.path.join(
+            self.config.get('ingestion', {}).get('index_dir', 'data/index'),
+            self.collection_name
+        )
+        os.makedirs(index_dir, exist_ok=True)
+        return os.path.join(index_dir, filename)
+
+    def index_version(self) -> str:
+        """Content version of the indexed filing (from the ingest manifest); changes on every re-ingest that alters it."""
+        path = self.index_path("manifest.json")
+        if not os.path.exists(path):
+            return "unversioned"
+        mtime = os.path.getmtime(path)
+        if getattr(self, '_version_mtime', None) != mtime:
+            with open(path, 'r') as f:
+                self._version = json.load(f).get("version", "unversioned")
+            self._version_mtime = mtime
+        return self._version
+
+    def _load_side_index(self, filename: str, loader):
+        """Loads a side index file once and reloads it when re-ingestion rewrites it; None if absent."""
+        path = self.index_path(filename)
+        if not os.path.exists(path):
+            return None
+        mtime = os.path.getmtime(path)
+        cache = self.__dict__.setdefault('_side_indexes', {})
+        if filename not in cache or cache[filename][0] != mtime:
+            cache[filename] = (mtime, loader(path))
+        return cache[filename][1]
+
+    def lexical_index(self):
+        """The BM25 index over this collection's children."""
+        return self._load_side_index("bm25.json", BM25Index.load)
+
+    def table_store(self):
+        """The structured store of every numeric table cell in this collection's parents."""
+        return self._load_side_index("tables.npz", FinancialTableStore.load)
+
+    def _build_embedding_cache(self):
+        cache_cfg = self.config.get('cache', {})
+        if not cache_cfg.get('embeddings', True):
+            return None
+        return DiskCache(
+            path=os.path.join(cache_cfg.get('dir', 'data/cache'), 'embeddings.sqlite'),
+            max_entries=cache_cfg.get('embedding_max_entries', 200_000)
         )
 
     def query(self, query_text: str, n_results: int = 30):
@@ -0,0 +1,103 @@
+# src/core/filings.py
+import os
+import re
+import json
+import time
+import threading
+
+_YEAR_RE = re.compile(r"\b(?:FY\s?)?((?:19|20)\d{2})\b", re.IGNORECASE)
+_COMPANY_SUFFIX_RE = re.compile(r"\b(inc|incorporated|corp|corporation|co|company|ltd|limited|plc|holdings|group)\b\.?", re.IGNORECASE)
+
+def collection_name(ticker: str, fiscal_year: int, form: str = "10-K") -> str:
+    """Chroma collection (shard) holding one filing, e.g. 'aapl_10k_fy2025'."""
+    slug = lambda s: re.sub(r"[^a-z0-9]+", "-", str(s).lower()).strip("-")
+    return f"{slug(ticker)}_{slug(form).replace('-', '')}_fy{int(fiscal_year)}"
+
+def _company_key(company: str) -> str:
+    return re.sub(r"[^a-z0-9 ]+", " ", _COMPANY_SUFFIX_RE.sub("", company or "").lower()).strip()
+
+class FilingRegistry:
+    """
+    The corpus: one record per ingested filing (ticker, company, fiscal year, form, source PDF)
+    and the Chroma collection that holds it. Persisted as one JSON file next to the side
+    indexes and re-read whenever another process (e.g. an ingest) rewrites it.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._filings = []
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def all(self) -> list:
+        """Every registered filing, newest fiscal year first."""
+        mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime is None:
+                    self._filings = []
+                else:
+                    with open(self.path, 'r') as f:
+                        self._filings = json.load(f).get("filings", [])
+                self._mtime = mtime
+        return sorted(self._filings, key=lambda f: (-f["fiscal_year"], f["ticker"]))
+
+    def __len__(self):
+        return len(self.all())
+
+    def get(self, collection: str) -> dict:
+        return next((f for f in self.all() if f["collection"] == collection), None)
+
+    def register(self, ticker: str, fiscal_year: int, pdf_path: str, company: str = None, form: str = "10-K") -> dict:
+        """Adds (or updates) a filing and returns its record; ingestion then fills its collection."""
+        filing = {
+            "ticker": ticker.upper(),
+            "company": company or ticker.upper(),
+            "fiscal_year": int(fiscal_year),
+            "form": form,
+            "pdf_path": pdf_path,
+            "collection": collection_name(ticker, fiscal_year, form),
+            "registered_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        others = [f for f in self.all() if f["collection"] != filing["collection"]]
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"filings": others + [filing]}, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self._mtime = None  # re-read on next access
+        return filing
+
+    @staticmethod
+    def label(filing: dict) -> str:
+        return f"{filing['ticker']} FY{filing['fiscal_year']}"
+
+    def mentioned_tickers(self, query: str) -> set:
+        """Registered tickers whose symbol or company name the query mentions."""
+        query_lower = query.lower()
+        return {
+            f["ticker"] for f in self.all()
+            if (len(f["ticker"]) > 1 and re.search(rf"\b{re.escape(f['ticker'])}\b", query))
+            or (_company_key(f["company"]) and re.search(rf"\b{re.escape(_company_key(f['company']))}\b", query_lower))
+        }
+
+    def route(self, query: str, ticker: str = "", fiscal_year: int = None, max_shards: int = 4) -> list:
+        """
+        Filings a question should search. Explicit `ticker` / `fiscal_year` win; otherwise tickers,
+        company names and years mentioned in the query narrow the corpus. At most `max_shards`
+        filings are returned, newest first.
+        """
+        filings = self.all()
+        if ticker:
+            candidates = [f for f in filings if f["ticker"] == ticker.upper()]
+        else:
+            mentioned = self.mentioned_tickers(query)
+            candidates = [f for f in filings if f["ticker"] in mentioned] or filings
+
+        years = {int(fiscal_year)} if fiscal_year else {int(y) for y in _YEAR_RE.findall(query)}
+        if years:
+            exact = [f for f in candidates if f["fiscal_year"] in years]
+            # A 10-K also reports the two prior years as comparatives
+            comparative = [f for f in candidates if any(0 < f["fiscal_year"] - y <= 2 for y in years)]
+            candidates = exact or comparative or candidates
+        return candidates[:max_shards]
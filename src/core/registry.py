@@ -0,0 +1,101 @@
+# src/core/registry.py
+import os
+import threading
+import yaml
+from google import genai
+from src.core.database import DatabaseManager
+from src.utils import tracing
+from src.utils.disk_cache import DiskCache
+
+class ResourceRegistry:
+    """
+    Process-wide owner of the expensive, shareable resources: the Chroma client and
+    collection (via DatabaseManager), the FlashRank model, the Gemini client and the
+    on-disk caches. Each resource is built once on first use and then reused by the
+    agent, retriever, parser and UI. All accessors are thread-safe.
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, config_path: str = "config/config.yaml"):
+        self.config_path = config_path
+        with open(config_path, 'r') as f:
+            self.config = yaml.safe_load(f)
+        self._resources = {}
+        self._lock = threading.RLock()
+        # Spans from every component go to the exporters named in `tracing`
+        tracing.configure(self.config.get('tracing', {}))
+
+    @classmethod
+    def get(cls, config_path: str = "config/config.yaml") -> "ResourceRegistry":
+        """The shared registry for `config_path`, created on first call."""
+        key = os.path.abspath(config_path)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(config_path)
+            return cls._instances[key]
+
+    def get_or_create(self, name: str, factory):
+        """Returns the resource registered under `name`, building it with `factory()` exactly once."""
+        resource = self._resources.get(name)
+        if resource is None:
+            with self._lock:
+                resource = self._resources.get(name)
+                if resource is None:
+                    resource = factory()
+                    self._resources[name] = resource
+        return resource
+
+    def genai_client(self) -> genai.Client:
+        env_var_name = self.config.get('gemini', {}).get('api_key_env', 'GOOGLE_API_KEY')
+        return self.get_or_create("genai_client", lambda: genai.Client(api_key=os.getenv(env_var_name)))
+
+    def db_manager(self) -> DatabaseManager:
+        return self.get_or_create(
+            "db_manager", lambda: DatabaseManager(self.config_path, genai_client=self.genai_client())
+        )
+
+    def ranker(self):
+        def build():
+            # ONNX runtime + model load happen on first rerank only
+            import onnxruntime as ort
+            from flashrank import Ranker
+            from flashrank.Config import model_file_map
+
+            rerank_cfg = self.config.get('rerank', {})
+            # Use a more robust reranker model if possible, but MiniLM is fine for local
+            model_name = rerank_cfg.get('model_name', 'ms-marco-MiniLM-L-12-v2')
+            ranker = Ranker(model_name=model_name)
+            threads = rerank_cfg.get('onnx_threads')
+            if threads:
+                # FlashRank builds its session with ORT defaults; rebuild it with a bounded thread pool
+                options = ort.SessionOptions()
+                options.intra_op_num_threads = threads
+                options.inter_op_num_threads = 1
+                ranker.session = ort.InferenceSession(str(ranker.model_dir / model_file_map[model_name]), sess_options=options)
+            return ranker
+        return self.get_or_create("ranker", build)
+
+    def disk_cache(self, filename: str, max_entries: int, ttl_seconds: float = None) -> DiskCache:
+        """One DiskCache (and SQLite connection) per cache file per process."""
+        cache_dir = self.config.get('cache', {}).get('dir', 'data/cache')
+        return self.get_or_create(
+            f"disk_cache:{filename}",
+            lambda: DiskCache(os.path.join(cache_dir, filename), max_entries=max_entries, ttl_seconds=ttl_seconds)
+        )
+
+    def trace_memory(self) -> tracing.InMemoryExporter:
+        """In-memory span sink (e.g. for the Streamlit latency panel), attached to the tracer on first use."""
+        max_spans = self.config.get('tracing', {}).get('memory_max_spans', 5000)
+        return self.get_or_create(
+            "trace_memory", lambda: tracing.get_tracer().add_exporter(tracing.InMemoryExporter(max_spans))
+        )
+
+    def chart_renderer(self):
+        """Chart spec -> Plotly figure / static file renderer with its spec-hash caches."""
+        from src.tools.visualizer import ChartRenderer
+        charts_cfg = self.config.get('charts', {})
+        return self.get_or_create(
+            "chart_renderer",
+            lambda: ChartRenderer(charts_cfg.get('output_dir', 'data/charts'), max_figures=charts_cfg.get('max_figures', 64))
+        )
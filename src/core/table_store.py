@@ -0,0 +1,144 @@
+# src/core/table_store.py
+import re
+import os
+import numpy as np
+
+_SCALE_RE = re.compile(r"in\s+(millions|thousands|billions)", re.IGNORECASE)
+_DASHES = {"—", "–", "-", "—-"}
+
+# Common analyst shorthand -> the line item as 10-K statements print it
+ALIASES = {
+    "capex": "payments for acquisitions of property plant and equipment",
+    "capital expenditures": "payments for acquisitions of property plant and equipment",
+    "revenue": "total net sales",
+    "total revenue": "total net sales",
+    "net sales": "total net sales",
+    "operating cash flow": "cash generated by operating activities",
+}
+
+def normalize_label(text: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9 ]", " ", text.lower())).strip()
+
+def parse_number(cell: str):
+    """'$ (5,000)' -> -5000.0, '—' -> 0.0, '12.5%' -> 12.5; None for non-numeric cells."""
+    cell = cell.strip().replace("$", "").replace("%", "").replace(" ", "")
+    if not cell:
+        return None
+    if cell in _DASHES:
+        return 0.0
+    negative = cell.startswith("(") and cell.endswith(")")
+    cell = cell.strip("()").replace(",", "")
+    try:
+        value = float(cell)
+    except ValueError:
+        return None
+    return -value if negative else value
+
+def format_value(value: float) -> str:
+    """Stored value exactly as parsed: 15116786.0 -> '15116786', -1234567.5 -> '-1234567.5'."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def parse_markdown_tables(text: str) -> list:
+    """Every pipe table in `text` as {'title', 'header', 'rows'}; title is the nearest heading above it."""
+    tables, current, title = [], None, ""
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("|"):
+            cells = [c.strip() for c in stripped.strip("|").split("|")]
+            if all(re.fullmatch(r":?-{2,}:?", c) for c in cells if c):
+                continue  # header separator row
+            if current is None:
+                current = {"title": title, "header": cells, "rows": []}
+                tables.append(current)
+            else:
+                current["rows"].append(cells)
+        else:
+            current = None
+            if stripped.startswith("#"):
+                title = stripped.lstrip("#").strip()
+    return tables
+
+class FinancialTableStore:
+    """
+    Columnar store of every numeric table cell extracted at ingestion:
+    (table_name, line_item, period) -> value, with scale and page provenance.
+    Persisted as a NumPy .npz; an in-memory line-item index makes lookups O(1).
+    """
+    COLUMNS = ("table_name", "title", "line_item", "period", "scale", "page")
+
+    def __init__(self, columns: dict = None):
+        columns = columns or {}
+        for name in self.COLUMNS:
+            setattr(self, name, np.asarray(columns.get(name, []), dtype=str))
+        self.value = np.asarray(columns.get("value", []), dtype=np.float64)
+        self._index = {}
+        for row, label in enumerate(self.line_item):
+            self._index.setdefault(normalize_label(label), []).append(row)
+
+    @classmethod
+    def from_parents(cls, documents: list, metadatas: list) -> "FinancialTableStore":
+        columns = {name: [] for name in cls.COLUMNS + ("value",)}
+        for doc, meta in zip(documents, metadatas):
+            for table in parse_markdown_tables(doc):
+                header = table["header"]
+                scale_match = _SCALE_RE.search(" ".join(header)) or _SCALE_RE.search(table["title"])
+                scale = scale_match.group(0).title() if scale_match else ""
+                for cells in table["rows"]:
+                    if not cells or not cells[0]:
+                        continue
+                    for col in range(1, min(len(cells), len(header))):
+                        value = parse_number(cells[col])
+                        if value is None:
+                            continue
+                        columns["table_name"].append(meta.get("table_name", meta.get("section_type", "table")))
+                        columns["title"].append(table["title"])
+                        columns["line_item"].append(cells[0])
+                        columns["period"].append(_SCALE_RE.sub("", header[col]).strip(" ()") or f"col_{col}")
+                        columns["scale"].append(scale)
+                        columns["page"].append(str(meta.get("page_label", "unknown")))
+                        columns["value"].append(value)
+        return cls(columns)
+
+    def __len__(self):
+        return len(self.value)
+
+    def _rows_for(self, line_item: str) -> list:
+        key = normalize_label(line_item)
+        key = ALIASES.get(key, key)
+        if not key:  # Empty / punctuation-only line item matches nothing
+            return []
+        if key in self._index:
+            return self._index[key]
+        # Fallback: every query token appears in the stored label
+        tokens = set(key.split())
+        return [row for label, rows in self._index.items() if tokens <= set(label.split()) for row in rows]
+
+    def lookup(self, line_item: str, period: str = None, table_name: str = None) -> list:
+        rows = self._rows_for(line_item)
+        period_key = normalize_label(period) if period else None
+        matches = []
+        for row in rows:
+            if period_key and period_key not in normalize_label(self.period[row]):
+                continue
+            if table_name and self.table_name[row] != table_name:
+                continue
+            matches.append({
+                "table_name": str(self.table_name[row]),
+                "title": str(self.title[row]),
+                "line_item": str(self.line_item[row]),
+                "period": str(self.period[row]),
+                "value": float(self.value[row]),
+                "scale": str(self.scale[row]),
+                "page": str(self.page[row]),
+            })
+        return matches
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, value=self.value, **{name: getattr(self, name) for name in self.COLUMNS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FinancialTableStore":
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
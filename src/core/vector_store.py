@@ -0,0 +1,431 @@
+# src/core/vector_store.py
+import os
+import glob
+import json
+import threading
+import numpy as np
+from abc import ABC, abstractmethod
+
+_DEFAULT_QUERY_INCLUDE = ("metadatas", "documents", "distances")
+_DEFAULT_GET_INCLUDE = ("metadatas", "documents")
+
+class VectorStore(ABC):
+    """
+    What DatabaseManager needs from a vector database: the subset of the Chroma collection API
+    the pipeline uses, with Chroma-shaped results (`query` returns one list per query text).
+    """
+    name = None
+
+    @abstractmethod
+    def upsert(self, ids: list, documents: list = None, metadatas: list = None, embeddings: list = None):
+        ...
+
+    @abstractmethod
+    def get(self, ids: list = None, where: dict = None, include=_DEFAULT_GET_INCLUDE) -> dict:
+        ...
+
+    @abstractmethod
+    def query(self, query_texts: list = None, query_embeddings: list = None, n_results: int = 10,
+              where: dict = None, include=_DEFAULT_QUERY_INCLUDE) -> dict:
+        ...
+
+    @abstractmethod
+    def delete(self, ids: list = None, where: dict = None):
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+class ChromaVectorStore(VectorStore):
+    """A Chroma collection (HNSW index, SQLite metadata) behind the VectorStore interface."""
+    def __init__(self, client, name: str, embedding_function):
+        from chromadb.api.types import EmbeddingFunction
+
+        class _ChromaEmbeddingFunction(EmbeddingFunction):
+            # Chroma only accepts its own EmbeddingFunction subclasses
+            def __init__(self, embed):
+                self.embed = embed
+            def __call__(self, input):
+                return self.embed(input)
+
+        if not isinstance(embedding_function, EmbeddingFunction):
+            embedding_function = _ChromaEmbeddingFunction(embedding_function)
+        self.name = name
+        self.collection = client.get_or_create_collection(name=name, embedding_function=embedding_function)
+
+    def upsert(self, ids, documents=None, metadatas=None, embeddings=None):
+        self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+    def get(self, ids=None, where=None, include=_DEFAULT_GET_INCLUDE):
+        return self.collection.get(ids=ids, where=where, include=list(include))
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10, where=None, include=_DEFAULT_QUERY_INCLUDE):
+        return self.collection.query(
+            query_texts=query_texts, query_embeddings=query_embeddings,
+            n_results=n_results, where=where, include=list(include)
+        )
+
+    def delete(self, ids=None, where=None):
+        self.collection.delete(ids=ids, where=where)
+
+    def count(self):
+        return self.collection.count()
+
+class _Snapshot:
+    """One committed state of a NumpyVectorStore: memory-mapped arrays plus the replayed record log."""
+    def __init__(self, generation=0, ids=None, metadatas=None, live=None, vectors=None, scales=None,
+                 ends=None, blob=None, records_bytes=0):
+        self.generation = generation
+        # Every physical row, including ones deleted or replaced since the generation was written
+        self.ids = ids or []
+        self.metadatas = metadatas or []
+        self.live = live if live is not None else np.ones(len(self.ids), dtype=bool)
+        self.rows = {self.ids[row]: row for row in np.flatnonzero(self.live).tolist()}
+        self.vectors = vectors
+        self.scales = scales
+        self.ends = ends
+        self.blob = blob
+        self.records_bytes = records_bytes
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def document(self, row: int) -> str:
+        start = int(self.ends[row - 1]) if row else 0
+        return bytes(self.blob[start:int(self.ends[row])]).decode("utf-8")
+
+    def embedding(self, row: int) -> np.ndarray:
+        vector = np.asarray(self.vectors[row], dtype=np.float32)
+        return vector * self.scales[row] if self.scales is not None else vector
+
+    def column(self, key: str) -> np.ndarray:
+        """One metadata field across all rows (None where missing), built on first filter use."""
+        if key not in self._columns:
+            column = np.empty(len(self.ids), dtype=object)
+            column[:] = [meta.get(key) for meta in self.metadatas]
+            self._columns[key] = column
+        return self._columns[key]
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact, brute-force vector search over L2-normalised embeddings stored as memory-mapped
+    float16 (or per-row scaled int8) NumPy arrays. IDs and metadata live in a compact JSON-lines
+    log, documents in one UTF-8 blob with an end-offsets array. Opening maps the files without
+    reading them, and results are deterministic (ties broken by insertion order). Meant for
+    per-filing collections of a few thousand vectors, where a full scan costs less than an HNSW load.
+
+    Writes are appends: an upsert adds rows to the end of every file and a tombstone line for the
+    rows it replaces, then commits by swapping index.json, so a write costs O(batch), not O(store).
+    Once dead rows outnumber live ones (or the quantization changes) the live rows are compacted
+    into a new generation. Files under `path`, per generation N:
+        index.json            {"generation", "dim", "quantization", "rows", "doc_bytes", "records_bytes"}
+        vectors.N.bin         (rows, dim) float16 / int8 / float32, raw
+        scales.N.bin          (rows,) float32, int8 only
+        ends.N.bin            (rows,) int64 end offset of each row's document in docs.N.bin
+        docs.N.bin            UTF-8 documents, back to back
+        records.N.jsonl       [id, metadata] per row, {"delete": [rows]} per tombstone
+    Readers only see what index.json has committed and keep their mapped state until they reload.
+    Distances are cosine distances (1 - cosine similarity).
+    """
+    QUANTIZATIONS = ("float16", "int8", "float32")
+    BLOCK_ROWS = 4096  # rows dequantised per matmul, bounds the float32 scratch memory
+    COMPACT_MIN_DEAD = 1024  # dead rows tolerated before compaction, whatever the live count
+
+    def __init__(self, path: str, name: str, embedding_function=None, quantization: str = "float16"):
+        if quantization not in self.QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization '{quantization}' (expected one of {', '.join(self.QUANTIZATIONS)})")
+        self.path = path
+        self.name = name
+        self.embedding_function = embedding_function
+        self.quantization = quantization
+        self._snapshot = None
+        self._stamp = None
+        self._index = None
+        self._lock = threading.RLock()
+
+    # --- reading ---------------------------------------------------------------
+
+    def _index_path(self) -> str:
+        return os.path.join(self.path, "index.json")
+
+    def _file(self, kind: str, generation: int, ext: str = "bin") -> str:
+        return os.path.join(self.path, f"{kind}.{generation}.{ext}")
+
+    def _current(self) -> _Snapshot:
+        """The latest committed state; reloaded (incrementally within a generation) when index.json changes."""
+        try:
+            stat = os.stat(self._index_path())
+            stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except FileNotFoundError:
+            stamp = None
+        if self._snapshot is None or stamp != self._stamp:
+            with self._lock:
+                if self._snapshot is None or stamp != self._stamp:
+                    if stamp:
+                        self._snapshot, self._index = self._load(self._snapshot)
+                    else:
+                        self._snapshot, self._index = _Snapshot(), None
+                    self._stamp = stamp
+        return self._snapshot
+
+    def _load(self, previous: _Snapshot) -> tuple:
+        with open(self._index_path(), 'r') as f:
+            index = json.load(f)
+        generation, rows = index["generation"], index["rows"]
+
+        # Same generation: only the records appended since `previous` need parsing
+        if previous is not None and previous.generation == generation and previous.records_bytes <= index["records_bytes"]:
+            ids, metadatas, live, start = previous.ids, previous.metadatas, previous.live, previous.records_bytes
+        else:
+            ids, metadatas, live, start = [], [], np.zeros(0, dtype=bool), 0
+        new_ids, new_metadatas, deleted = [], [], []
+        if index["records_bytes"] > start:
+            with open(self._file("records", generation, "jsonl"), 'rb') as f:
+                f.seek(start)
+                tail = f.read(index["records_bytes"] - start)
+            # One JSON array parse is several times faster than a json.loads per line
+            for record in json.loads(b"[" + b",".join(tail.splitlines()) + b"]"):
+                if isinstance(record, dict):
+                    deleted.extend(record["delete"])
+                else:
+                    new_ids.append(record[0])
+                    new_metadatas.append(record[1])
+        live = np.concatenate([live, np.ones(len(new_ids), dtype=bool)])
+        live[deleted] = False
+
+        if not rows:
+            return _Snapshot(generation, records_bytes=index["records_bytes"]), index
+        dtype = np.dtype(index["quantization"])
+        scales = None
+        if index["quantization"] == "int8":
+            scales = np.memmap(self._file("scales", generation), dtype=np.float32, mode="r", shape=(rows,))
+        blob = np.memmap(self._file("docs", generation), dtype=np.uint8, mode="r", shape=(index["doc_bytes"],)) \
+            if index["doc_bytes"] else np.zeros(0, np.uint8)
+        snapshot = _Snapshot(
+            generation, ids + new_ids, metadatas + new_metadatas, live,
+            vectors=np.memmap(self._file("vectors", generation), dtype=dtype, mode="r", shape=(rows, index["dim"])),
+            scales=scales,
+            ends=np.memmap(self._file("ends", generation), dtype=np.int64, mode="r", shape=(rows,)),
+            blob=blob,
+            records_bytes=index["records_bytes"],
+        )
+        return snapshot, index
+
+    def _mask(self, snapshot: _Snapshot, where: dict) -> np.ndarray:
+        """Chroma `where` semantics over live rows: {"k": v}, {"k": {"$gt": v}}, $eq/$ne/$gt/$gte/$lt/$lte/$in/$nin, $and/$or."""
+        return snapshot.live & self._match(snapshot, where)
+
+    def _match(self, snapshot: _Snapshot, where: dict) -> np.ndarray:
+        n = len(snapshot)
+        if not where:
+            return np.ones(n, dtype=bool)
+        if "$and" in where:
+            return np.logical_and.reduce([self._match(snapshot, clause) for clause in where["$and"]] + [np.ones(n, dtype=bool)])
+        if "$or" in where:
+            return np.logical_or.reduce([self._match(snapshot, clause) for clause in where["$or"]] + [np.zeros(n, dtype=bool)])
+
+        mask = np.ones(n, dtype=bool)
+        for key, condition in where.items():
+            column = snapshot.column(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                if op in ("$eq", "$ne"):
+                    # Type-strict like Chroma: True does not match 1
+                    hit = np.fromiter((type(v) is type(value) and v == value for v in column), dtype=bool, count=n)
+                    mask &= hit if op == "$eq" else ~hit
+                elif op in ("$in", "$nin"):
+                    values = list(value)
+                    hit = np.fromiter((any(type(v) is type(x) and v == x for x in values) for v in column), dtype=bool, count=n)
+                    mask &= hit if op == "$in" else ~hit
+                elif op in ("$gt", "$gte", "$lt", "$lte"):
+                    numeric = np.array([v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan for v in column], dtype=np.float64)
+                    with np.errstate(invalid="ignore"):
+                        mask &= {"$gt": np.greater, "$gte": np.greater_equal, "$lt": np.less, "$lte": np.less_equal}[op](numeric, value)
+                else:
+                    raise ValueError(f"Unsupported where operator '{op}'")
+        return mask
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+    def _scores(self, snapshot: _Snapshot, rows: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every selected row to every query, shape (len(rows), len(queries))."""
+        scores = np.empty((len(rows), len(queries)), dtype=np.float32)
+        contiguous = len(rows) == len(snapshot)
+        for start in range(0, len(rows), self.BLOCK_ROWS):
+            block_rows = slice(start, start + self.BLOCK_ROWS) if contiguous else rows[start:start + self.BLOCK_ROWS]
+            block = np.asarray(snapshot.vectors[block_rows], dtype=np.float32)
+            scores[start:start + len(block)] = block @ queries.T
+            if snapshot.scales is not None:
+                scores[start:start + len(block)] *= np.asarray(snapshot.scales[block_rows], dtype=np.float32)[:, None]
+        return scores
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10, where=None, include=_DEFAULT_QUERY_INCLUDE):
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(list(query_texts))
+        queries = self._normalize(query_embeddings)
+        snapshot = self._current()
+        rows = np.flatnonzero(self._mask(snapshot, where)) if len(snapshot) else np.zeros(0, dtype=np.int64)
+        k = min(n_results, len(rows))
+
+        result = {"ids": [], "metadatas": [], "documents": [], "distances": [], "embeddings": None}
+        scores = self._scores(snapshot, rows, queries) if k else None
+        for j in range(len(queries)):
+            if k:
+                column = scores[:, j]
+                top = np.argpartition(-column, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+                # Best first; equal scores keep insertion order so results never depend on timing
+                top = top[np.lexsort((rows[top], -column[top]))]
+                hits, similarities = rows[top], column[top]
+            else:
+                hits, similarities = [], []
+            result["ids"].append([snapshot.ids[row] for row in hits])
+            result["metadatas"].append([snapshot.metadatas[row] for row in hits])
+            result["documents"].append([snapshot.document(row) for row in hits] if "documents" in include else None)
+            result["distances"].append([float(1.0 - s) for s in similarities])
+        for key in ("metadatas", "documents", "distances"):
+            if key not in include:
+                result[key] = None
+        return result
+
+    def get(self, ids=None, where=None, include=_DEFAULT_GET_INCLUDE):
+        snapshot = self._current()
+        if ids is not None:
+            rows = [snapshot.rows[record_id] for record_id in dict.fromkeys(ids) if record_id in snapshot.rows]
+            if where:
+                mask = self._mask(snapshot, where)
+                rows = [row for row in rows if mask[row]]
+        else:
+            rows = np.flatnonzero(self._mask(snapshot, where)).tolist() if len(snapshot) else []
+        return {
+            "ids": [snapshot.ids[row] for row in rows],
+            "metadatas": [snapshot.metadatas[row] for row in rows] if "metadatas" in include else None,
+            "documents": [snapshot.document(row) for row in rows] if "documents" in include else None,
+            "embeddings": [snapshot.embedding(row).tolist() for row in rows] if "embeddings" in include else None,
+        }
+
+    def count(self):
+        return len(self._current().rows)
+
+    # --- writing ---------------------------------------------------------------
+
+    def _quantize(self, vectors: np.ndarray) -> tuple:
+        if self.quantization == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales
+        return vectors.astype(self.quantization), None
+
+    def _append(self, generation: int, committed: dict, ids=(), documents=(), metadatas=(),
+                vectors=None, scales=None, deleted=()) -> dict:
+        """Appends rows (and a tombstone for `deleted`) to `generation`, then commits them in index.json."""
+        committed = committed or {"generation": generation, "dim": None, "quantization": self.quantization,
+                                  "rows": 0, "doc_bytes": 0, "records_bytes": 0}
+        dim = committed["dim"] if committed["dim"] is not None else (int(vectors.shape[1]) if vectors is not None and len(vectors) else None)
+        encoded = [(doc or "").encode("utf-8") for doc in documents]
+        records = b""
+        if deleted:
+            records += json.dumps({"delete": sorted(int(row) for row in deleted)}).encode("utf-8") + b"\n"
+        records += b"".join(json.dumps([record_id, meta or {}], separators=(",", ":")).encode("utf-8") + b"\n"
+                            for record_id, meta in zip(ids, metadatas))
+        ends = committed["doc_bytes"] + np.cumsum([len(doc) for doc in encoded], dtype=np.int64)
+
+        os.makedirs(self.path, exist_ok=True)
+        itemsize = np.dtype(self.quantization).itemsize
+        appends = [
+            ("vectors", "bin", committed["rows"] * (dim or 0) * itemsize, vectors.tobytes() if len(ids) else b""),
+            ("ends", "bin", committed["rows"] * 8, ends.tobytes()),
+            ("docs", "bin", committed["doc_bytes"], b"".join(encoded)),
+            ("records", "jsonl", committed["records_bytes"], records),
+        ]
+        if self.quantization == "int8":
+            appends.append(("scales", "bin", committed["rows"] * 4, scales.tobytes() if len(ids) else b""))
+        for kind, ext, size, data in appends:
+            with open(self._file(kind, generation, ext), 'ab') as f:
+                f.truncate(size)  # drops anything a crashed writer appended but never committed
+                f.write(data)
+
+        index = {
+            "generation": generation,
+            "dim": dim,
+            "quantization": self.quantization,
+            "rows": committed["rows"] + len(ids),
+            "doc_bytes": committed["doc_bytes"] + sum(len(doc) for doc in encoded),
+            "records_bytes": committed["records_bytes"] + len(records),
+        }
+        tmp_path = f"{self._index_path()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self._index_path())
+        return index
+
+    def _compact(self):
+        """Rewrites the live rows into generation N+1 (re-quantizing if the setting changed) and drops the old files."""
+        snapshot = self._current()
+        rows = np.flatnonzero(snapshot.live)
+        generation = snapshot.generation + 1
+        vectors = scales = None
+        if len(rows):
+            vectors = np.asarray(snapshot.vectors[rows])
+            scales = np.asarray(snapshot.scales[rows]) if snapshot.scales is not None else None
+            if vectors.dtype != np.dtype(self.quantization):
+                dequantized = vectors.astype(np.float32) * (scales[:, None] if scales is not None else 1.0)
+                vectors, scales = self._quantize(dequantized)
+        for path in glob.glob(os.path.join(self.path, f"*.{generation}.*")):
+            os.remove(path)  # leftovers of an interrupted compaction
+        self._append(
+            generation, None, [snapshot.ids[row] for row in rows], [snapshot.document(row) for row in rows],
+            [snapshot.metadatas[row] for row in rows], vectors, scales
+        )
+        # Older generations are unreachable now (open maps stay valid until their readers reload)
+        for path in glob.glob(os.path.join(self.path, "*.*.*")):
+            if os.path.basename(path).split(".")[1] != str(generation):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _maybe_compact(self):
+        snapshot = self._current()
+        dead = len(snapshot) - len(snapshot.rows)
+        if dead > max(self.COMPACT_MIN_DEAD, len(snapshot.rows)) or \
+                (self._index is not None and self._index["quantization"] != self.quantization):
+            self._compact()
+
+    def upsert(self, ids, documents=None, metadatas=None, embeddings=None):
+        documents = documents if documents is not None else [None] * len(ids)
+        metadatas = metadatas if metadatas is not None else [{} for _ in ids]
+        if embeddings is None:
+            embeddings = self.embedding_function(list(documents))
+        # Last occurrence wins when the same ID appears twice in one call
+        latest = {record_id: k for k, record_id in enumerate(ids)}
+        order = sorted(latest.values())
+        vectors, scales = self._quantize(self._normalize([embeddings[k] for k in order]))
+        with self._lock:
+            snapshot = self._current()
+            if self._index is not None and self._index["quantization"] != self.quantization:
+                self._compact()  # rows of one generation share a dtype
+                snapshot = self._current()
+            replaced = [snapshot.rows[record_id] for record_id in latest if record_id in snapshot.rows]
+            self._append(
+                snapshot.generation or 1, self._index,
+                [ids[k] for k in order], [documents[k] for k in order], [metadatas[k] for k in order],
+                vectors, scales, replaced
+            )
+            self._maybe_compact()
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            snapshot = self._current()
+            doomed = set(self.get(ids=ids, where=where, include=())["ids"]) if (ids is not None or where) else set()
+            if doomed:
+                self._append(snapshot.generation, self._index, deleted=[snapshot.rows[record_id] for record_id in doomed])
+                self._maybe_compact()
@@ -1,7 +1,175 @@
+import ast
+import re
+import operator
+from decimal import Decimal, InvalidOperation, ROUND_FLOOR, ROUND_HALF_EVEN, localcontext
+from functools import lru_cache
+
+def _floordiv(left: Decimal, right: Decimal) -> Decimal:
+    # Decimal's // truncates toward zero; Python (and the model) expect floor: -7 // 2 == -4
+    if right == 0:
+        raise ZeroDivisionError
+    return (left / right).to_integral_value(rounding=ROUND_FLOOR)
+
+def _mod(left: Decimal, right: Decimal) -> Decimal:
+    # Sign follows the divisor as in Python: -7 % 2 == 1 (Decimal's % gives -1)
+    return left - right * _floordiv(left, right)
+
+# Arithmetic the model may use; anything else (attributes, subscripts, lambdas, ...) is rejected at parse time
+_BIN_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: _floordiv, ast.Mod: _mod, ast.Pow: operator.pow,
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_FUNCTIONS = {
+    "abs": abs, "min": min, "max": max,
+    "round": lambda value, places=Decimal(0): value.quantize(Decimal(1).scaleb(-int(places)), rounding=ROUND_HALF_EVEN),
+}
+_MAX_EXPONENT = 100
+_PRECISION = 34
+# "112,010" and "$1,602" as copied from a filing table
+_THOUSANDS_RE = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
+_NAMED_RE = re.compile(r"^\s*([A-Za-z_]\w*)\s*=(?!=)\s*(.+)$", re.DOTALL)
+
+def _strip_thousands(expression: str) -> str:
+    """
+    Drops thousands separators outside function calls. Inside a call's argument list
+    '1,234' could be one number or two arguments, so it is rejected instead of guessed.
+    """
+    separators = {match.start() for match in _THOUSANDS_RE.finditer(expression)}
+    out, in_call = [], []
+    for i, ch in enumerate(expression):
+        if ch == "(":
+            before = expression[:i].rstrip()
+            in_call.append(bool(before) and (before[-1].isalnum() or before[-1] == "_"))
+        elif ch == ")" and in_call:
+            in_call.pop()
+        elif i in separators:
+            if in_call and in_call[-1]:
+                raise ValueError(
+                    f"ambiguous ',' in '{expression.strip()}': inside function calls write numbers "
+                    "without thousands separators and separate arguments with ', '"
+                )
+            continue
+        out.append(ch)
+    return "".join(out)
+
+@lru_cache(maxsize=1024)
+def _compile(expression: str):
+    """Parses and validates an expression once; returns the AST body and the names it references."""
+    cleaned = _strip_thousands(expression.replace("$", "")).strip()
+    tree = ast.parse(cleaned, mode="eval").body
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in _FUNCTIONS or node.keywords:
+                raise ValueError(f"unsupported function call: {ast.unparse(node.func)}")
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise ValueError(f"unsupported literal: {node.value!r}")
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in _BIN_OPS:
+                raise ValueError(f"unsupported operator: {type(node.op).__name__}")
+        elif isinstance(node, ast.UnaryOp):
+            if type(node.op) not in _UNARY_OPS:
+                raise ValueError(f"unsupported operator: {type(node.op).__name__}")
+        elif not isinstance(node, (ast.Load, ast.operator, ast.unaryop)):
+            raise ValueError(f"unsupported syntax: {type(node).__name__}")
+    names -= set(_FUNCTIONS)
+    return tree, frozenset(names)
+
+def _evaluate(node, values: dict) -> Decimal:
+    if isinstance(node, ast.Constant):
+        # str() keeps 0.1 as exactly 0.1 instead of its binary float expansion
+        return Decimal(str(node.value))
+    if isinstance(node, ast.Name):
+        return values[node.id]
+    if isinstance(node, ast.UnaryOp):
+        return _UNARY_OPS[type(node.op)](_evaluate(node.operand, values))
+    if isinstance(node, ast.BinOp):
+        left, right = _evaluate(node.left, values), _evaluate(node.right, values)
+        if isinstance(node.op, ast.Pow) and abs(right) > _MAX_EXPONENT:
+            raise ValueError(f"exponent {right} is too large")
+        return _BIN_OPS[type(node.op)](left, right)
+    if isinstance(node, ast.Call):
+        return _FUNCTIONS[node.func.id](*(_evaluate(arg, values) for arg in node.args))
+    raise ValueError(f"unsupported syntax: {type(node).__name__}")
+
+def _format(value: Decimal) -> str:
+    """Plain notation, at most 10 decimal places, no trailing zeros."""
+    if value == value.to_integral_value():
+        return f"{value.to_integral_value():f}"
+    rounded = value.quantize(Decimal("1e-10"), rounding=ROUND_HALF_EVEN)
+    return f"{rounded:f}".rstrip("0").rstrip(".")
+
+def _error(e: Exception) -> str:
+    if isinstance(e, ZeroDivisionError):
+        return "Error: division by zero"
+    if isinstance(e, InvalidOperation):
+        return "Error: result is undefined"
+    if isinstance(e, SyntaxError):
+        return f"Error: invalid syntax: {e.msg}"
+    return f"Error: {str(e)}"
+
 class MathTool:
     def calculate(self, expression: str) -> str:
         """Evaluates mathematical expressions (e.g., '(109158 / 96169) - 1')."""
         try:
-            return str(eval(expression, {"__builtins__": None}, {}))
+            tree, names = _compile(expression)
+            if names:
+                raise ValueError(f"unknown name(s): {', '.join(sorted(names))}")
+            with localcontext() as ctx:
+                ctx.prec = _PRECISION
+                return _format(_evaluate(tree, {}))
         except Exception as e:
-            return f"Error: {str(e)}"
\ No newline at end of file
+            return _error(e)
+
+    def calculate_many(self, expressions: list[str]) -> str:
+        """
+        Evaluates several named expressions in one call, e.g.
+        ['net_2025 = 112010', 'net_2024 = 93736', 'growth_pct = (net_2025 / net_2024 - 1) * 100'].
+        Expressions may reference each other's names in any order; returns one 'name = value' line each.
+        """
+        parsed, results, order = {}, {}, []
+        for index, line in enumerate(expressions, start=1):
+            match = _NAMED_RE.match(line)
+            name, expression = (match.group(1), match.group(2)) if match else (f"result_{index}", line)
+            if name in order:
+                parsed.pop(name, None)
+                results[name] = f"Error: '{name}' is defined more than once"
+                continue
+            order.append(name)
+            try:
+                parsed[name] = _compile(expression)
+            except Exception as e:
+                results[name] = _error(e)
+
+        values = {}
+        def resolve(name: str, chain: tuple):
+            # Depth-first in dependency order; each name is evaluated once and None marks a failure
+            if name in results:
+                return values.get(name)
+            tree, names = parsed[name]
+            chain = chain + (name,)
+            try:
+                for dependency in sorted(names):
+                    if dependency in chain:
+                        cycle = chain[chain.index(dependency):] + (dependency,)
+                        raise ValueError(f"circular reference: {' -> '.join(cycle)}")
+                    if dependency not in parsed:
+                        missing = "failed" if dependency in results else "is not defined"
+                        raise ValueError(f"'{dependency}' {missing}")
+                    if resolve(dependency, chain) is None:
+                        raise ValueError(f"depends on '{dependency}', which failed")
+                values[name] = _evaluate(tree, values)
+                results[name] = _format(values[name])
+            except Exception as e:
+                results[name] = _error(e)
+            return values.get(name)
+
+        with localcontext() as ctx:
+            ctx.prec = _PRECISION
+            for name in order:
+                resolve(name, ())
+        return "\n".join(f"{name} = {results[name]}" for name in order)
@@ -0,0 +1,148 @@
+# src/tools/context_packer.py
+import re
+from src.core.bm25_index import tokenize
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+(?=[A-Z(\[])")
+_STOPWORDS = {
+    "the", "a", "an", "of", "for", "and", "or", "in", "on", "to", "by", "what", "was", "were", "is",
+    "are", "did", "does", "how", "much", "many", "which", "apple", "s", "its", "from", "with", "as",
+}
+
+class ContextPacker:
+    """
+    Fits reranked passages into a prompt-token budget. Each passage is split into
+    units (headings, table rows, sentences); units are scored against the query, exact
+    duplicates across overlapping passages are dropped, and the best units are kept in
+    document order. Table header rows are kept alongside any selected row so values keep
+    their period/scale, and every chunk keeps its page + section citation.
+    """
+    def __init__(self, token_budget: int = 2500):
+        self.token_budget = token_budget
+        try:
+            import tiktoken
+            encoding = tiktoken.get_encoding("cl100k_base")
+            # Gemini's tokenizer differs; cl100k is a close enough proxy for budgeting
+            self.count_tokens = lambda text: len(encoding.encode(text))
+        except Exception:
+            # tiktoken missing, or its BPE file cannot be fetched (offline): ~4 chars per token
+            self.count_tokens = lambda text: max(1, len(text) // 4)
+
+    @staticmethod
+    def _units(text: str) -> list:
+        """[(kind, text, table_header)] in document order; kind is 'heading', 'header', 'row' or 'sentence'."""
+        units, header, in_table = [], None, False
+        for line in text.splitlines():
+            stripped = line.strip()
+            if not stripped:
+                in_table = False
+                continue
+            if stripped.startswith("|"):
+                if re.fullmatch(r"[|:\-\s]+", stripped):
+                    continue  # separator row
+                if not in_table:
+                    header, in_table = stripped, True
+                    units.append(("header", stripped, None))
+                else:
+                    units.append(("row", stripped, header))
+                continue
+            in_table = False
+            if stripped.startswith("#"):
+                units.append(("heading", stripped, None))
+                continue
+            units.extend(("sentence", sentence, None) for sentence in _SENTENCE_SPLIT.split(stripped) if sentence)
+        return units
+
+    @staticmethod
+    def _section(text: str, meta: dict) -> str:
+        heading = next((line.lstrip("#").strip() for line in text.splitlines() if line.strip().startswith("#")), "")
+        return heading or meta.get("table_name") or meta.get("section_type", "general_text")
+
+    def _format(self, rank: int, score: float, meta: dict, section: str, body: str) -> str:
+        filing = f" | FILING: {meta['filing']}" if meta.get('filing') else ""
+        return (
+            f"<DATA_CHUNK ID='{rank}' RERANK_SCORE='{round(score, 4)}'>\n"
+            f"SOURCE: Page {meta.get('page_label', 'NA')}{filing} | SECTION: {section}\n"
+            f"CONTENT: {body.strip()}\n"
+            f"</DATA_CHUNK>"
+        )
+
+    def _ranked_within_budget(self, passages: list) -> str:
+        """Whole passages in rank order until the budget is spent; a too-long top passage keeps its leading units."""
+        chunks, used = [], 0
+        for passage in passages:
+            meta = passage.get("meta", {})
+            section = self._section(passage["text"], meta)
+            chunk = self._format(len(chunks), passage["score"], meta, section, passage["text"])
+            cost = self.count_tokens(chunk)
+            if used + cost <= self.token_budget:
+                chunks.append(chunk)
+                used += cost
+                continue
+            if not chunks:
+                lines = []
+                for _, text, _ in self._units(passage["text"]):
+                    if self.count_tokens(self._format(0, passage["score"], meta, section, "\n".join(lines + [text]))) > self.token_budget:
+                        break
+                    lines.append(text)
+                if lines:
+                    chunks.append(self._format(0, passage["score"], meta, section, "\n".join(lines)))
+            break
+        return "\n\n".join(chunks)
+
+    def pack(self, query: str, passages: list) -> tuple:
+        """`passages` are reranked dicts (text, meta, score), best first. Returns (context, stats)."""
+        terms = {t for t in tokenize(query) if t not in _STOPWORDS}
+        verbatim = "\n\n".join(
+            self._format(i, p["score"], p.get("meta", {}), self._section(p["text"], p.get("meta", {})), p["text"])
+            for i, p in enumerate(passages)
+        )
+        original_tokens = self.count_tokens(verbatim)
+
+        # Score every unit; duplicates from overlapping passages keep only their first (best-ranked) copy
+        candidates, seen = [], set()
+        for rank, passage in enumerate(passages):
+            for position, (kind, text, header) in enumerate(self._units(passage["text"])):
+                key = re.sub(r"\s+", " ", text.lower())
+                if key in seen:
+                    continue
+                seen.add(key)
+                overlap = len(terms & set(tokenize(text)))
+                relevance = overlap + (0.5 if kind == "row" and overlap else 0.0)
+                # Earlier (better reranked) passages win ties
+                candidates.append((relevance - 0.1 * rank, rank, position, kind, text, header))
+
+        # Greedy fill of the budget; a kept row pulls in its table header once
+        budget = self.token_budget - 40 * len(passages)  # reserve for chunk tags + citations
+        kept, used = set(), 0
+        for relevance, rank, position, kind, text, header in sorted(candidates, key=lambda c: c[0], reverse=True):
+            if relevance <= 0:
+                break  # the rest share no terms with the query
+            extra = [(rank, text)]
+            if header is not None and (rank, header) not in kept:
+                extra.append((rank, header))
+            cost = sum(self.count_tokens(t) for _, t in extra)
+            if used + cost > budget:
+                continue
+            kept.update(extra)
+            used += cost
+
+        chunks = []
+        for rank, passage in enumerate(passages):
+            meta = passage.get("meta", {})
+            section = self._section(passage["text"], meta)
+            lines, emitted, has_body = [], set(), False
+            for kind, text, _ in self._units(passage["text"]):
+                if (rank, text) not in kept or text in emitted:
+                    continue
+                emitted.add(text)
+                has_body = has_body or kind in ("row", "sentence")
+                # The first heading already travels in the SECTION citation
+                if not (kind == "heading" and text.lstrip("#").strip() == section):
+                    lines.append(text)
+            if has_body:  # a bare heading or column header cites nothing
+                chunks.append(self._format(len(chunks), passage["score"], meta, section, "\n".join(lines)))
+        # Nothing matched the query terms: hand over the best-ranked passages that fit rather than nothing
+        packed = "\n\n".join(chunks) or self._ranked_within_budget(passages)
+        packed_tokens = self.count_tokens(packed)
+        return packed, {"original_tokens": original_tokens, "packed_tokens": packed_tokens,
+                        "tokens_saved": max(0, original_tokens - packed_tokens)}
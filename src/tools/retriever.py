@@ -1,70 +1,400 @@
 # src/tools/retriever.py
-import os
-from google import genai
-from flashrank import Ranker, RerankRequest
-from src.core.database import DatabaseManager
+import time
+import hashlib
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from src.core.bm25_index import looks_lexical
+from src.core.registry import ResourceRegistry
+from src.tools.context_packer import ContextPacker
+from src.utils.cost_tracker import CostTracker
+from src.utils.progress import report_progress
+from src.utils.semantic_cache import SemanticCache
+from src.utils.tracing import span
+from src.utils.ranking import reciprocal_rank_fusion
+
+class _ExpansionSearches:
+    """
+    Expansion lines of one search_10k call, searched on every shard while the stream is still running
+    (up to `limit` queries). Each shard has at most one search queued: it picks up every line that
+    arrived before it started, as ONE batched request. Lines arriving after `close()` are only kept
+    for the cache. `ready` is set once `limit` queries are in, or the stream has ended.
+    """
+    def __init__(self, tool, query: str, targets: list, dense_only: bool, limit: int):
+        self.tool, self.query, self.targets, self.dense_only, self.limit = tool, query, targets, dense_only, limit
+        self.lines = []
+        self._queries = []
+        self._pending = [[] for _ in targets]  # per shard: queries no search has picked up yet
+        self._queued = [False] * len(targets)
+        self._jobs = [[] for _ in targets]     # per shard: search futures, each -> one ranked list per query
+        self._closed = False
+        self._lock = threading.Lock()
+        self.ready = threading.Event()
+
+    def add(self, lines: list):
+        with self._lock:
+            self.lines.extend(lines)
+            if self._closed:
+                return
+            fresh = [q for q in dict.fromkeys(lines) if q != self.query and q not in self._queries]
+            fresh = fresh[: self.limit - len(self._queries)]
+            if not fresh:
+                return
+            self._queries.extend(fresh)
+            for t, (_, db) in enumerate(self.targets):
+                self._pending[t].extend(fresh)
+                if not self._queued[t]:
+                    self._queued[t] = True
+                    self._jobs[t].append(self.tool._submit(self._search, t, db))
+            if len(self._queries) >= self.limit:
+                self.ready.set()
+
+    def _search(self, t: int, db) -> list:
+        with self._lock:
+            queries, self._pending[t], self._queued[t] = self._pending[t], [], False
+        return self.tool._search_children(queries, self.dense_only, db)
+
+    def close(self) -> tuple:
+        """Stops searching new lines; returns (queries searched, per-shard lists of search futures)."""
+        with self._lock:
+            self._closed = True
+            return list(self._queries), [list(jobs) for jobs in self._jobs]
 
 class RetrievalTool:
-    def __init__(self, config_path: str = "config/config.yaml"):
-        self.db = DatabaseManager(config_path)
-        # Use a more robust reranker model if possible, but MiniLM is fine for local
-        self.ranker = Ranker(model_name="ms-marco-MiniLM-L-12-v2")
-        self.client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
-
-    def search_10k(self, query: str) -> str:
-        # 1. Multi-Query Expansion (Forces the DB to look for different terms)
+    def __init__(self, config_path: str = "config/config.yaml", registry: ResourceRegistry = None):
+        # Chroma, the reranker model and the Gemini client are shared process-wide
+        self.registry = registry or ResourceRegistry.get(config_path)
+        self.db = self.registry.db_manager()
+        self.client = self.registry.genai_client()
+
+        retrieval_cfg = self.db.config.get('retrieval', {})
+        self.n_results = retrieval_cfg.get('n_results', 40)
+        self.max_queries = retrieval_cfg.get('max_queries', 3)
+        self.rrf_k = retrieval_cfg.get('rrf_k', 60)
+        self.expansion_timeout = retrieval_cfg.get('expansion_timeout_s', 2.0)
+        self.lexical_search = retrieval_cfg.get('lexical_search', True)
+        self.lexical_top_k = retrieval_cfg.get('lexical_top_k', 40)
+        self.skip_expansion_for_lexical = retrieval_cfg.get('skip_expansion_for_lexical', True)
+        self.dense_parents_only = retrieval_cfg.get('dense_parents_only', True)
+        # Vector searches run on their own pool so they overlap with expansion instead of running back-to-back
+        self.pool = self.registry.get_or_create(
+            "retrieval_pool", lambda: ThreadPoolExecutor(max_workers=retrieval_cfg.get('max_workers', 4))
+        )
+        # Expansions outlive their deadline, so they get a separate pool and never hold up a search
+        self.expansion_pool = self.registry.get_or_create(
+            "expansion_pool", lambda: ThreadPoolExecutor(max_workers=retrieval_cfg.get('expansion_workers', 4))
+        )
+        self.expansion_cache = self._build_expansion_cache(retrieval_cfg)
+        # Multi-filing corpus: each question searches at most `max_shards` filings, in parallel
+        filings_cfg = self.db.config.get('filings', {})
+        self.max_shards = filings_cfg.get('max_shards_per_query', 4)
+        self.shard_pool = self.registry.get_or_create(
+            "shard_pool", lambda: ThreadPoolExecutor(max_workers=filings_cfg.get('fanout_workers', 4))
+        )
+        self.context_chunks = retrieval_cfg.get('context_chunks', 6)
+        self.packer = None
+        if retrieval_cfg.get('context_packing', True):
+            self.packer = ContextPacker(token_budget=retrieval_cfg.get('context_token_budget', 2500))
+
+        rerank_cfg = self.db.config.get('rerank', {})
+        self.rerank_top_n = rerank_cfg.get('top_n', 12)
+        self.rerank_model = rerank_cfg.get('model_name', 'ms-marco-MiniLM-L-12-v2')
+        self.score_cache = None
+        if rerank_cfg.get('score_cache', True):
+            self.score_cache = self.registry.disk_cache(
+                'rerank_scores.sqlite', max_entries=rerank_cfg.get('score_cache_max_entries', 100_000)
+            )
+
+    def _build_expansion_cache(self, retrieval_cfg: dict):
+        if not retrieval_cfg.get('expansion_cache', True):
+            return None
+        store = self.registry.disk_cache(
+            'expansions.sqlite',
+            max_entries=retrieval_cfg.get('expansion_cache_max_entries', 5000),
+            ttl_seconds=retrieval_cfg.get('expansion_cache_ttl_s', 7 * 24 * 3600)
+        )
+        return SemanticCache(
+            store,
+            embedding_function=self.db.gemini_ef,
+            similarity_threshold=retrieval_cfg.get('expansion_similarity_threshold')
+        )
+
+    def _cache_expansion(self, query: str, expansions: list, job):
+        # Runs when the expansion finishes, even if search_10k already moved on without it
+        if not job.cancelled() and job.exception() is None and job.result() == "live" and expansions:
+            self.expansion_cache.put(query, expansions)
+
+    @property
+    def ranker(self):
+        # Loaded lazily: the cross-encoder model is only needed once a search reaches reranking
+        return self.registry.ranker()
+
+    def _expand_query(self, query: str, on_lines) -> str:
+        """
+        Streams LLM query expansions, handing each batch of completed lines to `on_lines` as it arrives.
+        A cached paraphrase's expansions stand in when there is one. Returns "similar" or "live".
+        """
+        # Runs on the expansion pool, so embedding the query for the paraphrase lookup never delays search
+        if self.expansion_cache:
+            similar = self.expansion_cache.get_similar(query)
+            if similar is not None:
+                on_lines(similar)
+                return "similar"
         # We ask Gemini to generate search terms that specifically target TABLES
         prompt = f"Generate 3 search queries to find the numerical tables for: '{query}'. Return ONLY queries."
-        response = self.client.models.generate_content(model="gemini-2.0-flash", contents=prompt)
-        queries = [query] + response.text.strip().split("\n")
-
-        # 2. Broad Retrieval (Children)
-        all_child_metas = []
-        for q in queries[:3]:
-            results = self.db.collection.query(
-                query_texts=[q],
-                n_results=40, # High recall to capture more candidates
-                where={"type": "child"}
+        buffer, expansions = "", 0
+        with span("search.expansion", prompt_chars=len(prompt)) as s:
+            for chunk in self.client.models.generate_content_stream(model="gemini-2.0-flash", contents=prompt):
+                buffer += chunk.text or ""
+                *complete, buffer = buffer.split("\n")
+                lines = [line.strip() for line in complete if line.strip()]
+                if lines:
+                    expansions += len(lines)
+                    on_lines(lines)
+                usage = getattr(chunk, "usage_metadata", None)
+                if usage:
+                    s.set(prompt_tokens=usage.prompt_token_count, completion_tokens=usage.candidates_token_count)
+            if buffer.strip():
+                expansions += 1
+                on_lines([buffer.strip()])
+            s.set(expansions=expansions)
+        return "live"
+
+    def _search_children(self, queries: list, dense_only: bool = False, db=None) -> list:
+        """One batched Chroma request for all `queries`; returns each query's parent IDs best-first."""
+        # Table-density signals are precomputed at ingestion, so filtering happens in Chroma
+        where = {"$and": [{"type": "child"}, {"parent_dense": True}]} if dense_only else {"type": "child"}
+        with span("search.vector_query", queries=len(queries), dense_only=dense_only) as s:
+            results = (db or self.db).collection.query(
+                query_texts=queries,
+                n_results=self.n_results, # High recall to capture more candidates
+                where=where,
+                include=["metadatas"]
             )
-            all_child_metas.extend(results['metadatas'][0])
+            s.set(hits=sum(len(metas) for metas in results['metadatas']))
+        return [[m['parent_id'] for m in metas] for metas in results['metadatas']]
+
+    def _search_lexical(self, query: str, dense_only: bool = False, db=None) -> list:
+        """BM25 over the child chunks; returns parent IDs best-first (empty if no index was built)."""
+        index = (db or self.db).lexical_index() if self.lexical_search else None
+        if index is None:
+            return []
+        with span("search.lexical", dense_only=dense_only) as s:
+            hits = index.search(query, k=self.lexical_top_k, dense_only=dense_only)
+            s.set(hits=len(hits))
+        return [parent_id for _, parent_id, _ in hits]
+
+    def _rerank(self, query: str, passages: list) -> list:
+        """
+        Cascade: the fused dense+lexical rank prunes to `top_n`, then the cross-encoder
+        scores only those, skipping (query, passage) pairs already scored in an earlier call.
+        """
+        candidates = min(len(passages), self.rerank_top_n)
+        with span("search.rerank", candidates=candidates) as s:
+            reranked, scored = self._rerank_candidates(query, passages)
+            s.set(scored=scored, cached=candidates - scored)
+        return reranked
+
+    def _rerank_candidates(self, query: str, passages: list) -> tuple:
+        started = time.perf_counter()
+        candidates = sorted(passages, key=lambda p: p["fusion_score"], reverse=True)[: self.rerank_top_n]
+
+        query_hash = hashlib.sha256(query.encode("utf-8")).hexdigest()
+        keys = {
+            p["id"]: f"{self.rerank_model}|{query_hash}|{hashlib.sha256(p['text'].encode('utf-8')).hexdigest()}"
+            for p in candidates
+        }
+        scores = {}
+        if self.score_cache is not None:
+            cached = self.score_cache.get_many(keys.values())
+            scores = {pid: cached[key] for pid, key in keys.items() if key in cached}
+
+        to_score = [p for p in candidates if p["id"] not in scores]
+        if to_score:
+            report_progress("reranking", f"⚖️ Reranking {len(to_score)} passages")
+            from flashrank import RerankRequest
+            fresh = {r["id"]: float(r["score"]) for r in self.ranker.rerank(RerankRequest(query=query, passages=to_score))}
+            scores.update(fresh)
+            if self.score_cache is not None:
+                self.score_cache.set_many({keys[pid]: score for pid, score in fresh.items()})
 
-        # 3. Parent Retrieval & "Signal-to-Noise" Filtering
-        unique_parent_ids = list(set([m['parent_id'] for m in all_child_metas]))
-        parents = self.db.collection.get(ids=unique_parent_ids)
-        
+        reranked = sorted(({**p, "score": scores[p["id"]]} for p in candidates), key=lambda r: r["score"], reverse=True)
+        print(
+            f"⚖️ [Tool: Rerank] {len(to_score)} scored + {len(candidates) - len(to_score)} cached "
+            f"(of {len(passages)} candidates) in {(time.perf_counter() - started) * 1000:.0f} ms"
+        )
+        return reranked, len(to_score)
+
+    def search_10k(self, query: str, ticker: str = "", fiscal_year: int = 0) -> str:
+        """
+        Searches the indexed 10-K filings for passages and tables relevant to `query`.
+        Optional `ticker` (e.g. 'AAPL') and `fiscal_year` (e.g. 2025) restrict the search to those filings.
+        """
+        with span("search_10k", query_chars=len(query)) as s:
+            targets = self._targets(query, ticker, fiscal_year)
+            s.set(shards=len(targets))
+            if targets:
+                context = self._search(query, s, targets)
+            else:
+                context = f"NOT_FOUND: No indexed filing for ticker '{ticker}'. Search without a ticker to see what is indexed."
+            s.set(output_chars=len(context))
+            return context
+
+    def _targets(self, query: str, ticker: str = "", fiscal_year: int = 0) -> list:
+        """[(filing label, DatabaseManager)] to search (see `DatabaseManager.route`)."""
+        if not len(self.db.filings):
+            return [(None, self.db)]
+        with span("search.route", ticker=ticker or None, fiscal_year=fiscal_year or None) as s:
+            targets = self.db.route(query, ticker=ticker, fiscal_year=fiscal_year or None, max_shards=self.max_shards)
+            s.set(shards=[db.collection_name for _, db in targets])
+        if len(targets) > 1:
+            labels = ", ".join(label or "default collection" for label, _ in targets)
+            report_progress("routing", f"🗂️ Searching {len(targets)} filings: {labels}")
+        return targets
+
+    def _submit(self, fn, *args, pool: ThreadPoolExecutor = None):
+        # copy_context() keeps pool work inside the caller's trace (and progress sink)
+        return (pool or self.pool).submit(contextvars.copy_context().run, fn, *args)
+
+    def _fan_out(self, fn, arg_lists: list) -> list:
+        """fn(*args) for every shard; in parallel on the shard pool when there is more than one."""
+        if len(arg_lists) == 1:
+            return [fn(*arg_lists[0])]
+        jobs = [self._submit(fn, *args, pool=self.shard_pool) for args in arg_lists]
+        return [job.result() for job in jobs]
+
+    def _shard_candidates(self, db, query: str, extra_queries: list, extra_lists: list, dense_only: bool,
+                          ranked_parent_lists: list, lexical_parents: list) -> tuple:
+        """One shard's fused (parent_id, score) list; returns it with the density filter actually used."""
+        if dense_only and not any(ranked_parent_lists) and not lexical_parents:
+            # Fallback to all parents if the density filter is too strict
+            dense_only = False
+            ranked_parent_lists = self._search_children([query], False, db)
+            lexical_parents = self._search_lexical(query, False, db)
+            extra_lists = None
+        # Broad Retrieval (Children): live expansions were searched as they arrived; otherwise
+        # (cached, or redone without the density filter) they go out as ONE batched request
+        if extra_lists is None:
+            extra_lists = self._search_children(extra_queries, dense_only, db) if extra_queries else []
+        ranked_parent_lists = ranked_parent_lists + extra_lists
+        if lexical_parents:
+            ranked_parent_lists = ranked_parent_lists + [lexical_parents]
+        with span("search.fuse", lists=len(ranked_parent_lists)) as s:
+            fused = reciprocal_rank_fusion(ranked_parent_lists, k=self.rrf_k)
+            s.set(candidates=len(fused))
+        return fused, dense_only, len(ranked_parent_lists), bool(lexical_parents)
+
+    def _fetch_parents(self, db, parent_ids: list) -> dict:
+        with span("search.parent_fetch", ids=len(parent_ids)) as s:
+            parents = db.collection.get(ids=parent_ids, include=["documents", "metadatas"])
+            s.set(chars=sum(len(d) for d in parents['documents']))
+        return parents
+
+    def _search(self, query: str, trace, targets: list) -> str:
+        # 1. Raw-query retrieval starts immediately on every shard; BM25 runs on this thread while it is in flight
+        started = time.perf_counter()
+        dense_only = self.dense_parents_only
+        # (fan-outs use the shard pool so the expansion job never queues behind them)
+        pool = self.shard_pool if len(targets) > 1 else None
+        first_pass = [self._submit(self._search_children, [query], dense_only, db, pool=pool) for _, db in targets]
+        lexical_parents = [self._search_lexical(query, dense_only, db) for _, db in targets]
+
+        # Exact-token questions ("Note 16", "September 27, 2025") are already served by BM25
+        skip_expansion = self.skip_expansion_for_lexical and any(lexical_parents) and looks_lexical(query)
+        # Exact hits only (a local read); paraphrase matching needs an embedding and runs in the expansion job
+        cached = self.expansion_cache.get_exact(query) if self.expansion_cache and not skip_expansion else None
+
+        # Without live expansion (extra_jobs None) the queries are searched as one batch in _shard_candidates
+        extra_queries, extra_jobs = [], None
+        if skip_expansion:
+            trace.set(expansion="skipped_lexical")
+        elif cached is not None:
+            extra_queries = [q for q in dict.fromkeys(cached) if q != query][: self.max_queries - 1]
+            trace.set(expansion="cached")
+        else:
+            trace.set(expansion="live")
+            report_progress("expanding", "🧠 Expanding the query")
+            # 2. Expansion lines are searched on every shard while the rest of the stream is still generating
+            expansions = _ExpansionSearches(self, query, targets, dense_only, limit=self.max_queries - 1)
+            expansion_job = self._submit(self._expand_query, query, expansions.add, pool=self.expansion_pool)
+            expansion_job.add_done_callback(lambda job: expansions.ready.set())
+            if self.expansion_cache:
+                expansion_job.add_done_callback(lambda job: self._cache_expansion(query, expansions.lines, job))
+
+            # Wait until enough queries are searching (the rest of the stream only feeds the cache),
+            # the stream ends, or the deadline passes; then go with whatever lines have arrived
+            if not expansions.ready.wait(timeout=self.expansion_timeout):
+                expansion_job.cancel()  # Only succeeds while still queued behind other expansions
+                print(f"⏳ [Tool: Search] Expansion exceeded {self.expansion_timeout}s; using {len(expansions.lines)} partial queries.")
+            elif expansion_job.done() and not expansion_job.cancelled():
+                if expansion_job.exception() is not None:
+                    print(f"⚠️ [Tool: Search] Expansion failed ({expansion_job.exception()}); searching the raw query only.")
+                elif expansion_job.result() == "similar":
+                    trace.set(expansion="cached_similar")
+            extra_queries, extra_jobs = expansions.close()
+
+        # Each shard finishes its own candidate list in parallel, so latency does not grow with the corpus
+        shard_results = self._fan_out(self._shard_candidates, [
+            (db, query, extra_queries,
+             [ranked for job in extra_jobs[t] for ranked in job.result()] if extra_jobs is not None else None,
+             dense_only, job.result(), lexical)
+            for t, ((_, db), job, lexical) in enumerate(zip(targets, first_pass, lexical_parents))
+        ])
+        used_dense = [result[1] for result in shard_results]
+        trace.set(density_filter=all(used_dense), density_fallback=any(d != self.dense_parents_only for d in used_dense))
+        lists = sum(result[2] for result in shard_results)
+        lexical_lists = sum(result[3] for result in shard_results)
+        where = f" across {len(targets)} filings" if len(targets) > 1 else ""
+        print(f"🔎 [Tool: Search] {lists - lexical_lists} dense + {lexical_lists} lexical lists fused{where} in {time.perf_counter() - started:.2f}s")
+
+        # Merge before reranking: every shard fused the same queries with the same k, so scores compare directly
+        merged = sorted(
+            ((score, shard, parent_id) for shard, (fused, *_) in enumerate(shard_results) for parent_id, score in fused),
+            key=lambda item: item[0], reverse=True
+        )
+        report_progress("retrieved", f"📚 {len(merged)} candidate sections from {lists} ranked lists")
+
+        # 3. Parent Retrieval: only the cascade's first-stage survivors are fetched.
+        # The "Signal-to-Noise" (table density) filter already ran inside Chroma via `where`.
+        top = merged[: self.rerank_top_n]
+        by_shard = {}
+        for score, shard, parent_id in top:
+            by_shard.setdefault(shard, {})[parent_id] = score
+        shards = sorted(by_shard)
+        fetched = self._fan_out(self._fetch_parents, [(targets[shard][1], list(by_shard[shard])) for shard in shards])
         valid_passages = []
-        for i, doc in enumerate(parents['documents']):
-            # SENIOR HACK: The 'Table Density' check
-            # Real financial data nodes have multiple pipes (|). Headers do not.
-            pipe_count = doc.count("|")
-            
-            # If it's a financial question, prioritize tables. 
-            # If it's a risk question, prioritize long paragraphs.
-            if pipe_count > 5 or len(doc) > 1500:
-                valid_passages.append({
-                    "id": i, 
-                    "text": doc, 
-                    "meta": parents['metadatas'][i]
-                })
+        for shard, parents in zip(shards, fetched):
+            label = targets[shard][0]
+            for pid, d, m in zip(parents['ids'], parents['documents'], parents['metadatas']):
+                meta = {**m, "filing": label} if label else m
+                valid_passages.append({"id": len(valid_passages), "text": d, "meta": meta, "fusion_score": by_shard[shard].get(pid, 0.0)})
 
         # 4. Reranking (The Judge)
-        if not valid_passages:
-            # Fallback to raw parents if filter is too strict
-            valid_passages = [{"id": i, "text": d, "meta": m} for i, (d, m) in enumerate(zip(parents['documents'], parents['metadatas']))]
-
-        rerank_request = RerankRequest(query=query, passages=valid_passages)
-        reranked = self.ranker.rerank(rerank_request)
+        reranked = self._rerank(query, valid_passages)
 
-        # 5. Format Top 6 for Gemini
+        # 5. Format Top N for Gemini
         # We explicitly tell the Agent which chunk had the highest Precision Score
+        top = reranked[: self.context_chunks]
+        if self.packer is not None:
+            with span("search.pack", chunks=len(top)) as s:
+                context, stats = self.packer.pack(query, top)
+                s.set(**stats)
+            saved_usd, _ = CostTracker.log_context_savings("gemini-2.0-flash", stats["tokens_saved"])
+            print(
+                f"✂️ [Tool: Pack] {stats['original_tokens']} -> {stats['packed_tokens']} tokens "
+                f"(saved {stats['tokens_saved']}, ${saved_usd:.6f} per call)"
+            )
+            return context
+
         formatted = []
-        for i, r in enumerate(reranked[:6]):
+        for i, r in enumerate(top):
             meta = r.get('meta', {})
+            filing = f" | FILING: {meta['filing']}" if meta.get('filing') else ""
             formatted.append(
                 f"<DATA_CHUNK ID='{i}' RERANK_SCORE='{round(r['score'], 4)}'>\n"
-                f"SOURCE: Page {meta.get('page_label', 'NA')}\n"
+                f"SOURCE: Page {meta.get('page_label', 'NA')}{filing}\n"
                 f"CONTENT: {r['text'].strip()}\n"
                 f"</DATA_CHUNK>"
             )
 
-        return "\n\n".join(formatted)
\ No newline at end of file
+        return "\n\n".join(formatted)
@@ -0,0 +1,38 @@
+# src/tools/table_lookup.py
+from src.core.registry import ResourceRegistry
+from src.core.table_store import format_value
+
+class FinancialTableTool:
+    def __init__(self, config_path: str = "config/config.yaml", registry: ResourceRegistry = None):
+        self.registry = registry or ResourceRegistry.get(config_path)
+        self.db = self.registry.db_manager()
+        self.max_shards = self.db.config.get('filings', {}).get('max_shards_per_query', 4)
+
+    def _stores(self, line_item: str, period: str, ticker: str) -> list:
+        """[(filing label, table store)] for the routed filings (see `DatabaseManager.route`)."""
+        targets = self.db.route(f"{line_item} {period}", ticker=ticker, max_shards=self.max_shards)
+        return [(label, db.table_store()) for label, db in targets]
+
+    def lookup_financial_value(self, line_item: str, period: str = "", ticker: str = "") -> str:
+        """
+        Direct lookup of a line item in the financial tables extracted from the 10-K
+        (e.g. line_item='Net income', period='2025'). Returns every matching value with
+        its table, period header, scale and page. Use before 'search_10k' for headline figures.
+        Optional `ticker` (e.g. 'AAPL') restricts the lookup to that company's filings.
+        """
+        stores = [(label, store) for label, store in self._stores(line_item, period, ticker) if store is not None]
+        if not stores:
+            return "NO_TABLE_STORE: Run ingestion first, or use 'search_10k'."
+
+        matches = [
+            (label, m) for label, store in stores for m in store.lookup(line_item, period=period or None)
+        ]
+        print(f"🧮 [Tool: Tables] '{line_item}' ({period or 'all periods'}): {len(matches)} matches in {len(stores)} store(s)")
+        if not matches:
+            return f"NOT_FOUND: No table row matches '{line_item}'. Use 'search_10k' instead."
+
+        return "\n".join(
+            f"{m['line_item']} | {m['period']} | {format_value(m['value'])} {m['scale']} | "
+            f"TABLE: {m['title'] or m['table_name']} | SOURCE: Page {m['page']}" + (f" | FILING: {label}" if label else "")
+            for label, m in matches[:20]
+        )
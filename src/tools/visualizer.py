@@ -1,35 +1,135 @@
 # src/tools/visualizer.py
-import streamlit as st
-import pandas as pd
-import plotly.express as px
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
 from typing import List
 
+CHART_TYPES = ("bar", "line", "area", "pie")
+
 class VisualizerTool:
     def create_dynamic_chart(self, chart_type: str, labels: List[str], values: List[float], title: str):
         """
-        Dynamically creates charts with safety checks for None values.
+        Dynamically creates charts ('bar', 'line', 'area' or 'pie') with safety checks for None values.
+        The chart is displayed alongside the answer.
         """
         print(f"📊 [Tool: Visualizer] Generating {chart_type} chart: {title}")
-        
-        # FIX: Ensure no None values exist in the list before processing
-        cleaned_values = [v if v is not None else 0.0 for v in values]
-        
-        # Build DataFrame with cleaned data
-        data = pd.DataFrame({"Category": labels, "Value": cleaned_values})
-        
+
+        if len(labels) != len(values):
+            return f"Error: {len(labels)} labels but {len(values)} values."
+        try:
+            # FIX: Ensure no None values exist in the list before processing
+            cleaned_values = [float(v) if v is not None else 0.0 for v in values]
+        except (TypeError, ValueError) as e:
+            return f"Error: chart values must be numbers ({e})."
+
+        # Only the spec is built here; the UI, CLI or report renders it (see ChartRenderer)
+        chart_type = chart_type.lower() if chart_type and chart_type.lower() in CHART_TYPES else "bar"
+        spec = {"chart_type": chart_type, "title": title, "labels": [str(l) for l in labels], "values": cleaned_values}
+        return json.dumps(spec, separators=(",", ":"))
+
+    @staticmethod
+    def parse_spec(output: str):
+        """The chart spec returned by create_dynamic_chart, or None for an error message."""
+        try:
+            spec = json.loads(output)
+        except (TypeError, ValueError):
+            return None
+        return spec if isinstance(spec, dict) and "chart_type" in spec else None
+
+class ChartRenderer:
+    """
+    Turns chart specs into Plotly figures (Streamlit) or static HTML/SVG/PNG files (CLI, reports).
+    Both are keyed by a hash of the spec, so an identical chart is only ever built once.
+    """
+    FORMATS = ("html", "svg", "png")
+
+    def __init__(self, output_dir: str = "data/charts", max_figures: int = 64):
+        self.output_dir = output_dir
+        self.max_figures = max_figures
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def spec_key(spec: dict) -> str:
+        canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+    def figure(self, spec: dict):
+        """Plotly figure for `spec`, from the in-memory cache when the same chart was drawn before."""
+        key = self.spec_key(spec)
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                return self._figures[key]
+        fig = self._build_figure(spec)
+        with self._lock:
+            self._figures[key] = fig
+            while len(self._figures) > self.max_figures:
+                self._figures.popitem(last=False)
+        return fig
+
+    @staticmethod
+    def _build_figure(spec: dict):
+        # Plotting stack loads on the first rendered chart, not with the agent
+        import pandas as pd
+        import plotly.express as px
+
+        chart_type = spec.get('chart_type', 'bar').lower()
+        title = spec.get('title', 'Financial Data Visualization')
+        cleaned_values = [v if v is not None else 0.0 for v in spec.get('values', [])]
+        data = pd.DataFrame({"Category": spec.get('labels', []), "Value": cleaned_values})
+
         # Professional Chart selection logic
-        if chart_type.lower() == "line":
+        if chart_type == "line":
             fig = px.line(data, x="Category", y="Value", title=title, markers=True)
-        elif chart_type.lower() == "area":
+        elif chart_type == "area":
             fig = px.area(data, x="Category", y="Value", title=title)
-        elif chart_type.lower() == "pie":
+        elif chart_type == "pie":
             fig = px.pie(data, names="Category", values="Value", title=title, hole=0.4)
         else: # Default Bar
-            fig = px.bar(data, x="Category", y="Value", title=title, 
-                         text_auto='.2s', color="Value", 
+            fig = px.bar(data, x="Category", y="Value", title=title,
+                         text_auto='.2s', color="Value",
                          color_continuous_scale=px.colors.sequential.Blues)
 
         fig.update_layout(template="plotly_dark", paper_bgcolor="rgba(0,0,0,0)", plot_bgcolor="rgba(0,0,0,0)")
-        
-        st.plotly_chart(fig, use_container_width=True)
-        return f"SUCCESS: {chart_type.capitalize()} chart rendered."
\ No newline at end of file
+        return fig
+
+    def render(self, spec: dict, fmt: str = "html") -> str:
+        """Writes `spec` to `<output_dir>/<spec hash>.<fmt>` (skipped when that file exists) and returns the path."""
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unsupported chart format '{fmt}' (expected one of {', '.join(self.FORMATS)})")
+        path = os.path.join(self.output_dir, f"{self.spec_key(spec)}.{fmt}")
+        if os.path.exists(path):
+            return path
+
+        import plotly.graph_objects as go
+        # Static files are viewed outside the dark UI: give them an opaque background
+        fig = go.Figure(self.figure(spec))
+        fig.update_layout(paper_bgcolor="#111111", plot_bgcolor="#111111")
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if fmt == "html":
+                fig.write_html(tmp_path, include_plotlyjs="cdn", full_html=True)
+            else:
+                try:
+                    fig.write_image(tmp_path, format=fmt)
+                except (ImportError, ValueError) as e:
+                    raise RuntimeError(f"{fmt.upper()} export needs the 'kaleido' package: {e}") from e
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    def render_many(self, specs: list, fmt: str = "html") -> list:
+        """Paths of the rendered files; a chart that fails to render is reported and skipped."""
+        paths = []
+        for spec in specs:
+            try:
+                paths.append(self.render(spec, fmt))
+            except Exception as e:
+                print(f"⚠️ [Chart] Could not render '{spec.get('title', 'chart')}': {e}")
+        return paths
@@ -1,4 +1,5 @@
 # src/utils/cost_tracker.py
+import threading
 
 class CostTracker:
     # Pricing for Gemini 2.0 Flash
@@ -6,19 +7,40 @@ class CostTracker:
         "gemini-2.0-flash": {"input": 0.10 / 1_000_000, "output": 0.40 / 1_000_000},
     }
 
+    # Prompt tokens the context packer kept out of tool results (process-wide running total)
+    context_tokens_saved = 0
+    _savings_lock = threading.Lock()
+
     @staticmethod
     def calculate(model_id, usage):
-        rates = CostTracker.PRICING.get("gemini-2.0-flash")
-        
         if not usage:
             return 0.0, 0.0
 
         # Safe fetch using getattr with double null-safety
         p_tokens = getattr(usage, 'prompt_token_count', 0) or 0
         c_tokens = getattr(usage, 'candidates_token_count', 0) or 0
+        return CostTracker.calculate_tokens(model_id, p_tokens, c_tokens)
+
+    @staticmethod
+    def calculate_tokens(model_id, p_tokens, c_tokens):
+        """Same pricing as calculate(), for token counts summed over several turns."""
+        rates = CostTracker.PRICING.get("gemini-2.0-flash")
         
         in_cost = p_tokens * rates["input"]
         out_cost = c_tokens * rates["output"]
         
         total_usd = in_cost + out_cost
-        return total_usd, total_usd * 90.0  # Dec 2025 USD to INR rate
\ No newline at end of file
+        return total_usd, total_usd * 90.0  # Dec 2025 USD to INR rate
+
+    @staticmethod
+    def log_context_savings(model_id, tokens_saved):
+        """Adds packed-away prompt tokens to the running total; returns (usd, inr) saved by this call."""
+        with CostTracker._savings_lock:
+            CostTracker.context_tokens_saved += tokens_saved
+        return CostTracker.calculate_tokens(model_id, tokens_saved, 0)
+
+    @staticmethod
+    def context_savings(model_id="gemini-2.0-flash"):
+        """(tokens, usd, inr) saved by context packing since process start."""
+        tokens = CostTracker.context_tokens_saved
+        return (tokens, *CostTracker.calculate_tokens(model_id, tokens, 0))
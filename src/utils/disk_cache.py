@@ -0,0 +1,116 @@
+# src/utils/disk_cache.py
+import os
+import time
+import pickle
+import sqlite3
+import threading
+
+class DiskCache:
+    """
+    Small persistent key -> value store on SQLite with LRU eviction and optional TTL.
+    Values are pickled, so anything picklable can be cached. Safe to share across threads.
+    """
+    _CHUNK = 500  # Stay well under SQLite's bound-parameter limit
+
+    def __init__(self, path: str, max_entries: int = 100_000, ttl_seconds: float = None):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON cache(accessed)")
+        self._conn.commit()
+
+    def _is_expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def get_many(self, keys) -> dict:
+        """Bulk lookup. Returns {key: value} for hits only; expired rows count as misses."""
+        keys = list(dict.fromkeys(keys))
+        found, expired = {}, []
+        now = time.time()
+        with self._lock:
+            for k in range(0, len(keys), self._CHUNK):
+                chunk = keys[k : k + self._CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value, created FROM cache WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, value, created in rows:
+                    if self._is_expired(created, now):
+                        expired.append(key)
+                    else:
+                        found[key] = pickle.loads(value)
+            if found:
+                self._conn.executemany("UPDATE cache SET accessed = ? WHERE key = ?", [(now, k) for k in found])
+            if expired:
+                self._conn.executemany("DELETE FROM cache WHERE key = ?", [(k,) for k in expired])
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set_many(self, items: dict):
+        if not items:
+            return
+        now = time.time()
+        rows = [(k, pickle.dumps(v, protocol=pickle.HIGHEST_PROTOCOL), now, now) for k, v in items.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def set(self, key, value):
+        self.set_many({key: value})
+
+    def items(self):
+        """Snapshot of every live (key, value) pair; does not touch LRU order or counters."""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value, created FROM cache").fetchall()
+        return [(key, pickle.loads(value)) for key, value, created in rows if not self._is_expired(created, now)]
+
+    def delete_many(self, keys):
+        with self._lock:
+            self._conn.executemany("DELETE FROM cache WHERE key = ?", [(k,) for k in keys])
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def _evict(self):
+        # Least-recently-accessed rows go first once the size bound is exceeded
+        overflow = self._count() - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed ASC LIMIT ?)", (overflow,)
+            )
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._count()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
@@ -0,0 +1,21 @@
+# src/utils/progress.py
+import contextvars
+from contextlib import contextmanager
+
+# Where tool code reports live progress; set per agent turn, unset (no-op) otherwise
+_progress_sink = contextvars.ContextVar("progress_sink", default=None)
+
+def report_progress(stage: str, message: str):
+    """Emits a progress event (e.g. 'searching', 'reranking') to whoever is streaming the current answer."""
+    sink = _progress_sink.get()
+    if sink is not None:
+        sink(stage, message)
+
+@contextmanager
+def progress_to(callback):
+    """Routes report_progress() calls made in this context to `callback(stage, message)`."""
+    token = _progress_sink.set(callback)
+    try:
+        yield
+    finally:
+        _progress_sink.reset(token)
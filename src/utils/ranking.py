@@ -0,0 +1,18 @@
+# src/utils/ranking.py
+
+def reciprocal_rank_fusion(ranked_lists, k: int = 60):
+    """
+    Merges several best-first lists of IDs with Reciprocal Rank Fusion:
+    score(id) = sum over lists of 1 / (k + rank). Returns [(id, score)] best-first.
+    """
+    scores = {}
+    for ranked in ranked_lists:
+        seen = set()
+        rank = 0
+        for item_id in ranked:
+            if item_id in seen:
+                continue
+            seen.add(item_id)
+            rank += 1
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
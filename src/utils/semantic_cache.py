@@ -0,0 +1,148 @@
+# src/utils/semantic_cache.py
+import re
+import threading
+import numpy as np
+from src.utils.disk_cache import DiskCache
+
+def normalize_query(query: str) -> str:
+    """Case/whitespace/punctuation-insensitive form used as the exact-match key."""
+    query = re.sub(r"\s+", " ", query.lower()).strip()
+    return query.strip(" ?.!'\"")
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+_TICKER_RE = re.compile(r"\b[A-Z]{2,5}\b")
+
+def query_signature(query: str) -> str:
+    """The numbers (years, quarters, amounts) and ticker-like tokens in a query, order-insensitive."""
+    numbers = {number.replace(",", "") for number in _NUMBER_RE.findall(query)}
+    return "|".join(sorted(numbers | set(_TICKER_RE.findall(query))))
+
+class SemanticCache:
+    """
+    Persistent text -> value cache on top of DiskCache (TTL + LRU bound).
+    Lookups try the normalized text first; with `similarity_threshold` set, a miss
+    falls back to the most similar cached text (embedding cosine) in the same scope,
+    so paraphrases reuse earlier results. A paraphrase must mention the same numbers, years
+    and tickers (`query_signature`): "net income 2024" never reuses "net income 2025".
+    Scopes partition entries, e.g. per index version.
+
+    `get_exact` is a local SQLite read; `get_similar` embeds the text (a network call with
+    Gemini), so latency-sensitive callers run it off their critical path.
+    """
+    def __init__(self, store: DiskCache, embedding_function=None, similarity_threshold: float = None):
+        self.store = store
+        self.embed = embedding_function
+        self.similarity_threshold = similarity_threshold if embedding_function else None
+        self.semantic_hits = 0
+        self._lock = threading.Lock()
+        # In-memory copy of the stored embeddings: rows [0, _size) of _vectors are live,
+        # _rows maps each key to its row. Resynced with the store as it evicts (see put)
+        self._rows, self._keys, self._scopes, self._signatures = {}, [], [], []
+        self._vectors, self._size = None, 0
+        if self.similarity_threshold is not None:
+            self._load_vectors()
+
+    @staticmethod
+    def _key(text: str, scope: str) -> str:
+        return f"{scope}|{normalize_query(text)}"
+
+    def _load_vectors(self):
+        rows = [(key, entry) for key, entry in self.store.items() if entry.get("embedding") is not None]
+        with self._lock:
+            self._rows, self._keys, self._scopes, self._signatures = {}, [], [], []
+            self._vectors, self._size = None, 0
+            for key, entry in rows:
+                self._add_row(key, entry["scope"], entry.get("signature"), entry["embedding"])
+
+    def _add_row(self, key: str, scope: str, signature: str, embedding):
+        """Inserts or replaces `key`'s row; call with the lock held."""
+        row = self._rows.get(key)
+        if row is None:
+            if self._vectors is None:
+                self._vectors = np.empty((16, len(embedding)), dtype=np.float32)
+            elif self._size == len(self._vectors):
+                # Doubling keeps appends amortized O(1) instead of copying the matrix on every put
+                self._vectors = np.concatenate([self._vectors, np.empty_like(self._vectors)])
+            row, self._size = self._size, self._size + 1
+            self._rows[key] = row
+            self._keys.append(key)
+            self._scopes.append(scope)
+            self._signatures.append(signature)
+        else:
+            self._scopes[row], self._signatures[row] = scope, signature
+        self._vectors[row] = embedding
+
+    def _drop_row(self, key: str):
+        """Removes `key`'s row by moving the last row into its place; call with the lock held."""
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        last = self._size - 1
+        if row != last:
+            self._keys[row], self._scopes[row], self._signatures[row] = self._keys[last], self._scopes[last], self._signatures[last]
+            self._vectors[row] = self._vectors[last]
+            self._rows[self._keys[row]] = row
+        del self._keys[last], self._scopes[last], self._signatures[last]
+        self._size = last
+
+    def get(self, text: str, scope: str = ""):
+        value = self.get_exact(text, scope)
+        return value if value is not None else self.get_similar(text, scope)
+
+    def get_exact(self, text: str, scope: str = ""):
+        entry = self.store.get(self._key(text, scope))
+        return entry["value"] if entry is not None else None
+
+    def get_similar(self, text: str, scope: str = ""):
+        """Value of the most similar cached text with the same scope and signature (None below the threshold)."""
+        if self.similarity_threshold is None or not self._size:
+            return None
+        query_vec = np.asarray(self.embed([normalize_query(text)])[0], dtype=np.float32)
+        signature = query_signature(text)
+        with self._lock:
+            if not self._size:
+                return None
+            vectors = self._vectors[: self._size]
+            sims = (vectors @ query_vec) / np.maximum(np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vec), 1e-9)
+            eligible = (np.asarray(self._scopes) == scope) & (np.asarray(self._signatures, dtype=object) == signature)
+            sims[~eligible] = -1.0
+            best = int(np.argmax(sims))
+            if sims[best] < self.similarity_threshold:
+                return None
+            key = self._keys[best]
+        entry = self.store.get(key)
+        if entry is None:
+            # Expired or evicted from the store since it was indexed here
+            with self._lock:
+                self._drop_row(key)
+            return None
+        self.semantic_hits += 1
+        return entry["value"]
+
+    def put(self, text: str, value, scope: str = ""):
+        key = self._key(text, scope)
+        signature = query_signature(text)
+        embedding = None
+        if self.similarity_threshold is not None:
+            embedding = [float(x) for x in self.embed([normalize_query(text)])[0]]
+        self.store.set(key, {"text": text, "scope": scope, "signature": signature, "value": value, "embedding": embedding})
+        if embedding is None:
+            return
+        with self._lock:
+            self._add_row(key, scope, signature, embedding)
+            # The store evicts LRU rows once past max_entries; resync before this copy drifts far past it
+            resync = self._size > self.store.max_entries + max(16, self.store.max_entries // 10)
+        if resync:
+            self._load_vectors()
+
+    def drop_other_scopes(self, scope: str) -> int:
+        """Deletes every entry outside `scope` (e.g. answers from a previous index version)."""
+        stale = [key for key, entry in self.store.items() if entry.get("scope") != scope]
+        if stale:
+            self.store.delete_many(stale)
+            if self.similarity_threshold is not None:
+                self._load_vectors()
+        return len(stale)
+
+    def stats(self) -> dict:
+        return {**self.store.stats(), "semantic_hits": self.semantic_hits}
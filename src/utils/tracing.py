@@ -0,0 +1,183 @@
+# src/utils/tracing.py
+import os
+import json
+import atexit
+import time
+import uuid
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+# Innermost open span of the current context; children link to it automatically.
+# Pool threads only see it when the work is submitted via contextvars.copy_context().run
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    """One timed unit of work (a search stage, a Gemini turn, a tool call, ...) with free-form attributes."""
+    def __init__(self, name: str, parent: "Span" = None, attributes: dict = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start_time = time.time()
+        self.duration_ms = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        """Records token counts, payload sizes, cache hits, ... on this span."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+class _NoopSpan:
+    trace_id = span_id = None
+    def set(self, **attributes):
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+class JsonLinesExporter:
+    """
+    Writes finished spans as JSON lines. Lines are buffered and written when a trace's root
+    span ends, every `flush_spans` spans, and at exit; the file is rotated to `<path>.1`,
+    `<path>.2`, ... once it would grow past `max_bytes`, keeping `backups` old files.
+    """
+    def __init__(self, path: str, max_bytes: int = 50 * 2**20, backups: int = 3, flush_spans: int = 256):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_spans = flush_spans
+        self._buffer = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        atexit.register(self.flush)
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            if span.parent_id is None or len(self._buffer) >= self.flush_spans:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        data = "".join(self._buffer)
+        self._buffer = []
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if size and self.max_bytes and size + len(data) > self.max_bytes:
+            self._rotate()
+        with open(self.path, 'a') as f:
+            f.write(data)
+
+    def _rotate(self):
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+class InMemoryExporter:
+    """Keeps the most recent finished spans in memory (tests, the Streamlit latency panel)."""
+    def __init__(self, max_spans: int = 5000):
+        self.spans = deque(maxlen=max_spans)
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+    def trace(self, trace_id: str) -> list:
+        """All finished spans of one trace, in start order."""
+        return sorted((s for s in list(self.spans) if s.trace_id == trace_id), key=lambda s: s.start_time)
+
+    def clear(self):
+        self.spans.clear()
+
+class Tracer:
+    def __init__(self):
+        self.enabled = True
+        self.exporters = []
+        self._lock = threading.Lock()
+
+    def add_exporter(self, exporter):
+        with self._lock:
+            self.exporters = self.exporters + [exporter]
+        return exporter
+
+    def remove_exporter(self, exporter):
+        with self._lock:
+            self.exporters = [e for e in self.exporters if e is not exporter]
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        if not self.enabled or not self.exporters:
+            yield _NOOP_SPAN
+            return
+        span = Span(name, parent=_current_span.get(), attributes=attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - span._started) * 1000
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                pass  # a streaming generator was closed from another context
+            for exporter in self.exporters:
+                try:
+                    exporter.export(span)
+                except Exception as e:
+                    print(f"⚠️ [Tracing] {type(exporter).__name__} failed: {e}")
+
+_tracer = Tracer()
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+def span(name: str, **attributes):
+    """`with span("search.rerank", candidates=12) as s: ...; s.set(scored=3)` on the process tracer."""
+    return _tracer.span(name, **attributes)
+
+def current_trace_id() -> str:
+    current = _current_span.get()
+    return current.trace_id if current else None
+
+_configured_paths = set()
+
+def configure(tracing_cfg: dict):
+    """Applies the `tracing` section of config.yaml; the JSON-lines exporter is added once per path."""
+    _tracer.enabled = tracing_cfg.get('enabled', True)
+    path = tracing_cfg.get('jsonl_path')
+    if _tracer.enabled and path:
+        path = os.path.abspath(path)
+        with _tracer._lock:
+            if path in _configured_paths:
+                return
+            _configured_paths.add(path)
+        _tracer.add_exporter(JsonLinesExporter(
+            path,
+            max_bytes=int(tracing_cfg.get('jsonl_max_mb', 50) * 2**20),
+            backups=tracing_cfg.get('jsonl_backups', 3),
+            flush_spans=tracing_cfg.get('jsonl_flush_spans', 256)
+        ))
@@ -3,9 +3,11 @@ import yaml
 import os
 import json
 import re
+import uuid
 from dotenv import load_dotenv
 from src.agents.financial_auditor import FinancialAuditorAgent
 from src.core.parser import PDFParser
+from src.core.registry import ResourceRegistry
 from src.utils.cost_tracker import CostTracker
 
 load_dotenv()
@@ -60,6 +62,11 @@ class FinancialAnalystUI:
             st.session_state.total_cost_inr = 0.0
         if 'ingestion_complete' not in st.session_state:
             st.session_state.ingestion_complete = False
+        if 'last_trace_id' not in st.session_state:
+            st.session_state.last_trace_id = None
+        if 'session_id' not in st.session_state:
+            # Keys this browser session's conversation (chat + retrieved evidence) in the shared agent
+            st.session_state.session_id = uuid.uuid4().hex
     
     def load_config(self):
         try:
@@ -101,7 +108,11 @@ class FinancialAnalystUI:
                 st.metric("USD", f"${st.session_state.total_cost_usd:.4f}")
             with col2:
                 st.metric("INR", f"₹{st.session_state.total_cost_inr:.2f}")
-            
+            saved_tokens, saved_usd, _ = CostTracker.context_savings()
+            st.caption(f"✂️ Context packing saved {saved_tokens:,} prompt tokens (${saved_usd:.4f})")
+
+            self.render_latency_panel()
+
             st.divider()
             
             # Configuration Display
@@ -110,11 +121,47 @@ class FinancialAnalystUI:
             
             # Clear History Button
             if st.button("🗑️ Clear Chat History", use_container_width=True):
+                self.get_agent().sessions.drop(st.session_state.session_id)
+                st.session_state.session_id = uuid.uuid4().hex
                 st.session_state.chat_history = []
                 st.session_state.total_cost_usd = 0.0
                 st.session_state.total_cost_inr = 0.0
                 st.rerun()
     
+    def render_latency_panel(self):
+        """Per-stage latency, tokens and cost of the last answer, from the in-memory trace sink."""
+        st.subheader("⏱️ Last Answer Breakdown")
+        trace_id = st.session_state.last_trace_id
+        spans = ResourceRegistry.get(self.config_path).trace_memory().trace(trace_id) if trace_id else []
+        if not spans:
+            st.caption("Ask a question to see where the time goes.")
+            return
+        rows = []
+        for span in spans:
+            if span.name == "agent.turn":
+                continue
+            attrs = span.attributes
+            tokens = (attrs.get("prompt_tokens") or 0) + (attrs.get("completion_tokens") or 0)
+            rows.append({
+                "stage": span.name + (f" #{attrs['turn']}" if "turn" in attrs else ""),
+                "ms": round(span.duration_ms or 0, 1),
+                "tokens": tokens or None,
+            })
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+        turn = next((s for s in spans if s.name == "agent.turn"), None)
+        if turn:
+            cost = turn.attributes.get("cost_usd", 0.0)
+            cached = " (cached)" if turn.attributes.get("cached") else ""
+            st.caption(f"Total {turn.duration_ms / 1000:.2f}s | ${cost:.5f}{cached}")
+
+    def get_agent(self):
+        """One warm agent per process: Chroma, reranker and Gemini clients are loaded once, not per question."""
+        registry = ResourceRegistry.get(self.config_path)
+        registry.trace_memory()  # capture spans for the latency panel
+        return registry.get_or_create(
+            "financial_auditor_agent", lambda: FinancialAuditorAgent(self.config, registry=registry)
+        )
+
     def ingest_document(self):
         with st.spinner("🔄 Processing document... This may take a few minutes."):
             try:
@@ -138,40 +185,61 @@ class FinancialAnalystUI:
                 return None, response_text
         return None, response_text
     
-    def render_chat_message(self, role, content, chart_data=None):
-        """Render a chat message with optional chart"""
+    def render_chat_message(self, role, content, charts=None, key="live"):
+        """Render a chat message with its charts (specs are turned into figures here, cached by spec hash)"""
         with st.chat_message(role):
             st.markdown(content)
             
-            if chart_data:
-                try:
-                    from src.tools.visualizer import VisualizerTool
-                    visualizer = VisualizerTool()
-                    
-                    chart_type = chart_data.get('chart_type', 'bar')
-                    labels = chart_data.get('labels', [])
-                    values = chart_data.get('values', [])
-                    title = chart_data.get('title', 'Financial Data Visualization')
-                    
-                    visualizer.create_dynamic_chart(chart_type, labels, values, title)
-                except Exception as e:
-                    st.error(f"Chart rendering error: {str(e)}")
+            if charts:
+                renderer = ResourceRegistry.get(self.config_path).chart_renderer()
+                for idx, spec in enumerate(charts):
+                    try:
+                        st.plotly_chart(renderer.figure(spec), use_container_width=True, key=f"chart_{key}_{idx}")
+                    except Exception as e:
+                        st.error(f"Chart rendering error: {str(e)}")
     
     def process_query(self, query):
-        """Process user query and get response"""
+        """Process user query, streaming progress and answer tokens into the chat as they arrive"""
         try:
-            agent = FinancialAuditorAgent(self.config)
+            agent = self.get_agent()
             
-            with st.spinner("🤔 Analyzing your query..."):
-                response = agent.run(query)
+            result = None
+            with st.chat_message("assistant"):
+                status = st.status("🤔 Analyzing your query...", expanded=False)
+                placeholder = st.empty()
+                streamed = ""
+                for event in agent.run_stream(query, session_id=st.session_state.session_id):
+                    if event["type"] == "status":
+                        status.update(label=event["message"])
+                        status.write(event["message"])
+                    elif event["type"] == "token":
+                        streamed += event["text"]
+                        placeholder.markdown(streamed + "▌")
+                    elif event["type"] == "discard":
+                        streamed = ""
+                        placeholder.empty()
+                    elif event["type"] == "done":
+                        result = event["result"]
+                placeholder.markdown(result["answer"] if result else streamed)
+                status.update(
+                    label=f"✅ Answered in {result['latency_s']:.1f}s (first token after {result['ttft_s'] or 0:.1f}s)",
+                    state="complete"
+                )
                 
-                # Extract chart data if present
-                chart_data, text_response = self.extract_chart_data(response)
-                
-                # Track costs (if usage data is available)
-                # Note: You may need to modify FinancialAuditorAgent to return usage stats
-                
-                return text_response, chart_data
+            # Charts drawn by the tool arrive as specs; inline CHART_DATA blocks are still honoured
+            chart_data, text_response = self.extract_chart_data(result["answer"])
+            charts = list(result.get("charts") or [])
+            if chart_data:
+                charts.append(chart_data)
+            
+            st.session_state.last_trace_id = result.get("trace_id")
+
+            # Track costs (cached answers cost nothing)
+            if not result["cached"]:
+                st.session_state.total_cost_usd += result["cost_usd"]
+                st.session_state.total_cost_inr += result["cost_inr"]
+            
+            return text_response, charts
         
         except Exception as e:
             st.error(f"❌ Error processing query: {str(e)}")
@@ -206,11 +274,12 @@ class FinancialAnalystUI:
             st.divider()
         
         # Display chat history
-        for message in st.session_state.chat_history:
+        for idx, message in enumerate(st.session_state.chat_history):
             self.render_chat_message(
                 message['role'], 
                 message['content'],
-                message.get('chart_data')
+                message.get('charts'),
+                key=idx
             )
         
         # Chat input
@@ -232,19 +301,17 @@ class FinancialAnalystUI:
             self.render_chat_message('user', query)
             
             # Get AI response
-            response_text, chart_data = self.process_query(query)
+            response_text, charts = self.process_query(query)
             
             if response_text:
                 # Add assistant message to chat
                 st.session_state.chat_history.append({
                     'role': 'assistant',
                     'content': response_text,
-                    'chart_data': chart_data
+                    'charts': charts
                 })
                 
-                # Display assistant message
-                self.render_chat_message('assistant', response_text, chart_data)
-                
+                # Already streamed above; the rerun redraws it (with any chart) from history
                 st.rerun()
     
     def run(self):
@@ -0,0 +1,89 @@
+# tests/test_agent_streaming.py
+import io
+import time
+import contextlib
+from types import SimpleNamespace
+import pytest
+from app import AnswerPrinter
+from benchmarks.retrieval_benchmark import build_index
+from src.agents.financial_auditor import FinancialAuditorAgent
+
+def _chunk(text=None, call=None, prompt_tokens=0):
+    part = SimpleNamespace(text=text, function_call=call)
+    usage = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=1, total_token_count=prompt_tokens + 1)
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))], usage_metadata=usage)
+
+class ScriptedChat:
+    """Plays one list of chunks per turn; `delays[i]` seconds pass before turn i starts streaming."""
+    def __init__(self, turns, delays=None):
+        self.turns = list(turns)
+        self.delays = delays or {}
+        self.sent = []
+
+    def send_message_stream(self, message, config=None):
+        turn = len(self.sent)
+        self.sent.append(message)
+        time.sleep(self.delays.get(turn, 0.0))
+        yield from self.turns[turn]
+
+@pytest.fixture(scope="module")
+def registry(tmp_path_factory):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return build_index(str(tmp_path_factory.mktemp("agent")), 0.0, use_flashrank=False)
+
+@pytest.fixture
+def agent(registry):
+    agent = FinancialAuditorAgent(registry.config, registry=registry)
+    agent.answer_cache = None
+    return agent
+
+def _run(agent, chat):
+    agent._new_chat = lambda: chat
+    with contextlib.redirect_stdout(io.StringIO()):
+        return list(agent.run_stream("What is 2 + 2?"))
+
+def test_text_before_a_tool_call_is_discarded_and_not_timed(agent):
+    calculate = SimpleNamespace(name="calculate", args={"expression": "2 + 2"})
+    chat = ScriptedChat([
+        [_chunk("Let me calculate that."), _chunk(call=calculate, prompt_tokens=100)],
+        [_chunk("2 + 2 = 4", prompt_tokens=150)],
+    ], delays={1: 0.3})
+    events = _run(agent, chat)
+    kinds = [e["type"] for e in events if e["type"] != "status"]
+    assert kinds == ["token", "discard", "token", "done"]
+    result = events[-1]["result"]
+    assert result["answer"] == "2 + 2 = 4"
+    assert result["ttft_s"] >= 0.3  # First token of the answering turn, not of the discarded one
+    assert result["prompt_tokens"] == 250
+    assert chat.sent[1][0].function_response.response == {"result": "4"}
+
+def test_answer_without_tools_streams_straight_through(agent):
+    events = _run(agent, ScriptedChat([[_chunk("Net income "), _chunk("was $93,736 million.")]]))
+    assert [e["type"] for e in events] == ["token", "token", "done"]
+    assert events[-1]["result"]["answer"] == "Net income was $93,736 million."
+
+class FakeTerminal(io.StringIO):
+    def __init__(self, tty):
+        super().__init__()
+        self.tty = tty
+
+    def isatty(self):
+        return self.tty
+
+def test_printer_erases_discarded_text_on_a_terminal():
+    out = FakeTerminal(tty=True)
+    printer = AnswerPrinter(out)
+    printer.token("Let me\ncheck.")
+    printer.discard()
+    printer.token("Answer")
+    printer.finish("Answer")
+    assert out.getvalue() == "Let me\ncheck.\r\x1b[1A\x1b[JAnswer\n"
+
+def test_printer_prints_only_the_answer_when_piped():
+    out = FakeTerminal(tty=False)
+    printer = AnswerPrinter(out)
+    printer.token("Let me check.")
+    printer.discard()
+    printer.token("Answer")
+    printer.finish("Answer")
+    assert out.getvalue() == "Answer\n"
@@ -0,0 +1,66 @@
+# tests/test_batch.py
+import json
+import pytest
+from app import AgenticSystem
+
+def _write_lines(path, lines):
+    path.write_text("".join(line + "\n" for line in lines))
+
+def _read(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_load_questions_from_text_and_jsonl(tmp_path):
+    text = tmp_path / "questions.txt"
+    _write_lines(text, ["What was revenue?", "", "What was revenue?", "What was net income?"])
+    questions = AgenticSystem.load_questions(str(text))
+    assert [q for _, q in questions] == ["What was revenue?", "What was net income?"]
+    jsonl = tmp_path / "questions.jsonl"
+    _write_lines(jsonl, [json.dumps({"id": "q1", "question": "What was revenue?"}), json.dumps({"id": 2, "query": "EPS?"})])
+    assert AgenticSystem.load_questions(str(jsonl)) == [("q1", "What was revenue?"), ("2", "EPS?")]
+
+def test_resume_keeps_one_record_per_id(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    _write_lines(output, [
+        json.dumps({"id": "a", "answer": "first"}),
+        json.dumps({"id": "b", "error": "timeout"}),
+        json.dumps({"id": "a", "answer": "second"}),
+        json.dumps({"id": "a", "error": "later failure"}),
+        json.dumps({"id": "c", "error": "not in this batch"}),
+        '{"id": "d", "answ',
+    ])
+    done = AgenticSystem.resume_output(str(output), {"a", "b", "d"})
+    assert done == {"a"}
+    assert _read(output) == [{"id": "a", "answer": "second"}, {"id": "c", "error": "not in this batch"}]
+    assert AgenticSystem.resume_output(str(tmp_path / "missing.jsonl"), {"a"}) == set()
+
+class FakeAgent:
+    """answer() fails once for questions in `flaky`; answers of questions in `cached` come from the cache."""
+    def __init__(self, flaky=(), cached=()):
+        self.flaky, self.cached, self.asked = set(flaky), set(cached), []
+
+    def answer(self, question):
+        self.asked.append(question)
+        if question in self.flaky:
+            self.flaky.discard(question)
+            raise RuntimeError("503 from Gemini")
+        return {"answer": f"answer to {question}", "citations": [], "prompt_tokens": 10, "completion_tokens": 5,
+                "total_tokens": 15, "cost_usd": 0.001, "cost_inr": 0.08, "cached": question in self.cached}
+
+def test_resumed_batch_retries_failures_without_duplicate_ids(tmp_path, monkeypatch, capsys):
+    questions = tmp_path / "questions.txt"
+    _write_lines(questions, ["Q1", "Q2", "Q3"])
+    output = tmp_path / "answers.jsonl"
+    agent = FakeAgent(flaky={"Q2"}, cached={"Q3"})
+    monkeypatch.setattr(AgenticSystem, "_build_agent", lambda self: agent)
+    system = AgenticSystem()
+
+    system.run_batch(str(questions), output_path=str(output), workers=2)
+    assert "2 answered (1 from cache), 1 failed | $0.00100" in capsys.readouterr().out
+    assert sorted("error" in r for r in _read(output)) == [False, False, True]
+
+    system.run_batch(str(questions), output_path=str(output), workers=2)
+    assert agent.asked.count("Q2") == 2 and agent.asked.count("Q1") == 1
+    records = _read(output)
+    assert sorted(r["id"] for r in records) == sorted({r["id"] for r in records})
+    assert len(records) == 3 and not any("error" in r for r in records)
+    assert "1 answered (0 from cache), 0 failed | $0.00100" in capsys.readouterr().out
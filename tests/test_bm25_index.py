@@ -0,0 +1,51 @@
+# tests/test_bm25_index.py
+import pytest
+from src.core.bm25_index import BM25Index, looks_lexical, tokenize
+
+TEXTS = [
+    "Net sales were $391,035 million in 2024.",
+    "Research and development expense increased.",
+    "Net income was $93,736 million; net sales grew.",
+    "Note 7 describes income taxes.",
+]
+
+@pytest.fixture
+def index():
+    return BM25Index().build(
+        ids=["c0", "c1", "c2", "c3"], texts=TEXTS, parent_ids=["p0", "p0", "p1", "p2"], dense=[True, True, False, True]
+    )
+
+def test_tokenize_folds_thousands_separators():
+    assert tokenize("Net sales: $391,035.5 in FY2024") == ["net", "sales", "391035.5", "in", "fy", "2024"]
+
+@pytest.mark.parametrize("query, expected", [
+    ('What does "deferred revenue" include?', True),
+    ("Summarize Note 7", True),
+    ("Balance as of September 28, 2024", True),
+    ("Which line item is 391,035?", True),
+    ("What was revenue in 2024?", False),
+    ("How did margins change?", False),
+])
+def test_looks_lexical(query, expected):
+    assert looks_lexical(query) is expected
+
+def test_search_ranks_exact_figures_first(index):
+    results = index.search("391,035")
+    assert results == [("c0", "p0", pytest.approx(results[0][2]))]
+    assert results[0][2] > 0
+
+def test_search_prefers_more_matching_terms(index):
+    ids = [chunk_id for chunk_id, _, _ in index.search("sales 2024")]
+    assert ids == ["c0", "c2"]
+
+def test_dense_only_and_k(index):
+    assert [c for c, _, _ in index.search("net income", dense_only=True)] == ["c3", "c0"]
+    assert len(index.search("net income", k=1)) == 1
+    assert index.search("goodwill") == []
+
+def test_save_and_load_round_trip(index, tmp_path):
+    path = str(tmp_path / "bm25.json")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.search("net income") == index.search("net income")
+    assert loaded.search("net income", dense_only=True) == index.search("net income", dense_only=True)
@@ -0,0 +1,49 @@
+# tests/test_budget.py
+import pytest
+from src.agents import budget
+from src.agents.budget import QueryBudget
+
+@pytest.fixture(autouse=True)
+def fake_time(clock, monkeypatch):
+    monkeypatch.setattr(budget, "time", clock)
+
+def test_within_budget():
+    b = QueryBudget(max_tool_rounds=2, max_prompt_tokens=1000, max_wall_clock_s=10)
+    b.record_turn(100)
+    b.record_tool_round()
+    assert b.exhausted() is None
+
+def test_tool_rounds():
+    b = QueryBudget(max_tool_rounds=2)
+    b.record_tool_round()
+    b.record_tool_round()
+    assert b.exhausted() == "2 tool rounds"
+
+def test_prompt_tokens_anticipate_the_next_turn():
+    b = QueryBudget(max_prompt_tokens=1000)
+    b.record_turn(300)
+    b.record_turn(350)
+    assert b.exhausted() is None  # 650 spent + at least 350 for the next turn = 1,000
+    b.record_turn(10)
+    assert b.exhausted() is None
+    b.record_turn(200)
+    assert b.exhausted() == "860 of 1,000 prompt tokens"
+
+def test_wall_clock(clock):
+    b = QueryBudget(max_wall_clock_s=5)
+    clock.advance(4.9)
+    assert b.exhausted() is None
+    clock.advance(0.1)
+    assert b.exhausted() == "5.0s wall-clock"
+
+def test_reason_is_sticky_and_reported(clock):
+    b = QueryBudget(max_tool_rounds=None, max_prompt_tokens=None, max_wall_clock_s=1)
+    clock.advance(2)
+    reason = b.exhausted()
+    clock.advance(-2)
+    assert b.exhausted() == reason
+    assert b.summary() == {"tool_rounds": 0, "prompt_tokens": 0, "elapsed_s": 0.0, "exhausted": reason}
+
+def test_from_config():
+    b = QueryBudget.from_config({"budget": {"max_tool_rounds": 3}})
+    assert (b.max_tool_rounds, b.max_prompt_tokens, b.max_wall_clock_s) == (3, 60_000, 60.0)
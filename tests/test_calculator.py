@@ -0,0 +1,50 @@
+# tests/test_calculator.py
+import pytest
+from src.tools.calculator import MathTool
+
+@pytest.fixture
+def math_tool():
+    return MathTool()
+
+@pytest.mark.parametrize("expression, expected", [
+    ("(112010 / 93736 - 1) * 100", "19.4951779466"),
+    ("0.1 + 0.2", "0.3"),
+    ("112,010 - 93,736", "18274"),
+    ("$1,602 * 2", "3204"),
+    ("round(1234.5678, 2)", "1234.57"),
+    ("max(1, 234)", "234"),
+    ("2 ** 10", "1024"),
+])
+def test_calculate(math_tool, expression, expected):
+    assert math_tool.calculate(expression) == expected
+
+@pytest.mark.parametrize("expression, expected", [
+    ("-7 // 2", "-4"), ("7 // -2", "-4"), ("-7 % 2", "1"), ("7 % -2", "-1"), ("-7.5 % 2", "0.5"), ("10 % 3", "1"),
+])
+def test_floor_division_and_modulo_follow_python(math_tool, expression, expected):
+    assert math_tool.calculate(expression) == expected
+
+@pytest.mark.parametrize("expression", ["5 / 0", "5 // 0", "5 % 0"])
+def test_division_by_zero(math_tool, expression):
+    assert math_tool.calculate(expression) == "Error: division by zero"
+
+def test_thousands_separator_inside_call_is_rejected(math_tool):
+    result = math_tool.calculate("max(1,234)")
+    assert result.startswith("Error: ambiguous ','")
+
+@pytest.mark.parametrize("expression", ["__import__('os')", "(1).real", "x + 1", "2 ** 1000"])
+def test_rejects_unsafe_or_unknown_input(math_tool, expression):
+    assert math_tool.calculate(expression).startswith("Error:")
+
+def test_calculate_many_resolves_dependencies_in_any_order(math_tool):
+    result = math_tool.calculate_many(["g = (n25 / n24 - 1) * 100", "n25 = 112,010", "n24 = 93736", "3 * 3"])
+    assert result.splitlines() == ["g = 19.4951779466", "n25 = 112010", "n24 = 93736", "result_4 = 9"]
+
+def test_calculate_many_reports_cycles_and_undefined_names(math_tool):
+    result = math_tool.calculate_many(["a = b + 1", "b = a + 1", "c = d * 2", "e = c + 1"])
+    assert result.splitlines() == [
+        "a = Error: depends on 'b', which failed",
+        "b = Error: circular reference: a -> b -> a",
+        "c = Error: 'd' is not defined",
+        "e = Error: depends on 'c', which failed",
+    ]
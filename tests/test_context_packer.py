@@ -0,0 +1,41 @@
+# tests/test_context_packer.py
+from src.tools.context_packer import ContextPacker
+
+def _passage(rank: int, text: str) -> dict:
+    return {"text": text, "meta": {"page_label": str(rank + 1)}, "score": 1.0 - rank / 10}
+
+FILLER = " ".join(f"Sentence {j} describes unrelated lorem ipsum material." for j in range(40))
+
+def test_keeps_relevant_units_and_table_header():
+    text = (
+        "# Income Statement\n"
+        "The company discusses many topics. Net income rose on higher services revenue.\n\n"
+        "| Line item | 2025 | 2024 |\n|---|---|---|\n| Net income | 112,010 | 93,736 |\n| Other | 1 | 2 |"
+    )
+    context, stats = ContextPacker(token_budget=500).pack("net income 2025", [_passage(0, text)])
+    assert "| Net income | 112,010 | 93,736 |" in context
+    assert "| Line item | 2025 | 2024 |" in context
+    assert "| Other | 1 | 2 |" not in context
+    assert "SOURCE: Page 1" in context
+    assert stats["packed_tokens"] <= 500
+
+def test_duplicate_units_across_passages_are_dropped():
+    text = "Net income was 112,010 million."
+    context, _ = ContextPacker(token_budget=500).pack("net income", [_passage(0, text), _passage(1, text)])
+    assert context.count("Net income was 112,010 million.") == 1
+
+def test_no_match_fallback_respects_budget():
+    packer = ContextPacker(token_budget=300)
+    passages = [_passage(rank, f"# Section {rank}\n{FILLER}") for rank in range(5)]
+    context, stats = packer.pack("zzz", passages)
+    assert context
+    assert packer.count_tokens(context) <= 300
+    assert stats["packed_tokens"] <= 300
+    assert "SOURCE: Page 1" in context  # best-ranked passage first
+
+def test_no_match_fallback_takes_whole_passages_in_rank_order():
+    packer = ContextPacker(token_budget=100_000)
+    passages = [_passage(rank, f"# Section {rank}\n{FILLER}") for rank in range(3)]
+    context, _ = packer.pack("zzz", passages)
+    assert [f"SOURCE: Page {rank + 1}" in context for rank in range(3)] == [True, True, True]
+    assert context.index("Page 1") < context.index("Page 2") < context.index("Page 3")
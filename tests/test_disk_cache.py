@@ -0,0 +1,52 @@
+# tests/test_disk_cache.py
+import pytest
+from src.utils import disk_cache
+from src.utils.disk_cache import DiskCache
+
+@pytest.fixture
+def cache_at(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(disk_cache, "time", clock)
+    return lambda **kwargs: DiskCache(str(tmp_path / "cache.sqlite"), **kwargs)
+
+def test_round_trip_and_counters(cache_at):
+    cache = cache_at()
+    cache.set_many({"a": {"value": [1, 2]}, "b": 2.5})
+    assert cache.get_many(["a", "b", "c", "a"]) == {"a": {"value": [1, 2]}, "b": 2.5}
+    assert cache.get("c", "default") == "default"
+    assert cache.stats() == {"hits": 2, "misses": 2, "hit_rate": 0.5, "entries": 2}
+
+def test_evicts_least_recently_accessed(cache_at, clock):
+    cache = cache_at(max_entries=2)
+    cache.set("a", 1)
+    clock.advance(1)
+    cache.set("b", 2)
+    clock.advance(1)
+    cache.get("a")  # "b" is now the least recently used
+    clock.advance(1)
+    cache.set("c", 3)
+    assert sorted(key for key, _ in cache.items()) == ["a", "c"]
+
+def test_ttl_expires_entries(cache_at, clock):
+    cache = cache_at(ttl_seconds=60)
+    cache.set("a", 1)
+    clock.advance(30)
+    cache.set("b", 2)
+    clock.advance(31)
+    assert cache.items() == [("b", 2)]
+    assert cache.get_many(["a", "b"]) == {"b": 2}
+    assert len(cache) == 1  # The expired row was deleted on lookup
+
+def test_reading_does_not_refresh_ttl(cache_at, clock):
+    cache = cache_at(ttl_seconds=60)
+    cache.set("a", 1)
+    clock.advance(50)
+    assert cache.get("a") == 1
+    clock.advance(20)
+    assert cache.get("a") is None
+
+def test_persists_across_instances(cache_at):
+    cache_at().set("a", 1)
+    reopened = cache_at()
+    assert reopened.get("a") == 1
+    reopened.delete_many(["a"])
+    assert len(cache_at()) == 0
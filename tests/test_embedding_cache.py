@@ -0,0 +1,35 @@
+# tests/test_embedding_cache.py
+from types import SimpleNamespace
+from src.core.database import GeminiEmbeddingFunction
+from src.utils.disk_cache import DiskCache
+
+class FakeModels:
+    """Records every embed_content call; the vector of a text is [len(text), 1.0]."""
+    def __init__(self):
+        self.calls = []
+
+    def embed_content(self, model, contents, config):
+        self.calls.append(list(contents))
+        return SimpleNamespace(embeddings=[SimpleNamespace(values=[float(len(t)), 1.0]) for t in contents])
+
+def _embedder(tmp_path, task_type="RETRIEVAL_DOCUMENT"):
+    models = FakeModels()
+    cache = DiskCache(str(tmp_path / "embeddings.sqlite"))
+    return GeminiEmbeddingFunction(api_key=None, task_type=task_type, cache=cache,
+                                   client=SimpleNamespace(models=models)), models
+
+def test_only_misses_are_embedded(tmp_path):
+    embed, models = _embedder(tmp_path)
+    assert embed(["ab", "abc"]) == [[2.0, 1.0], [3.0, 1.0]]
+    assert embed(["abc", "abcd", "ab"]) == [[3.0, 1.0], [4.0, 1.0], [2.0, 1.0]]
+    assert models.calls == [["ab", "abc"], ["abcd"]]
+
+def test_cache_is_shared_across_processes_but_not_task_types(tmp_path):
+    embed, _ = _embedder(tmp_path)
+    embed(["ab"])
+    reopened, models = _embedder(tmp_path)
+    assert reopened(["ab"]) == [[2.0, 1.0]]
+    assert models.calls == []
+    query_embed, models = _embedder(tmp_path, task_type="RETRIEVAL_QUERY")
+    query_embed(["ab"])
+    assert models.calls == [["ab"]]
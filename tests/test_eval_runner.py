@@ -0,0 +1,55 @@
+# tests/test_eval_runner.py
+import asyncio
+import pytest
+
+pytest.importorskip("deepeval")
+from deepeval.test_case import LLMTestCase
+from eval_pipeline import AgentEvalRunner
+from src.utils.disk_cache import DiskCache
+
+class CountingMetric:
+    """Judge stand-in: scores 1.0 and counts how often it was asked."""
+    calls = 0
+
+    async def a_measure(self, test_case):
+        CountingMetric.calls += 1
+        self.score, self.reason = 1.0, "ok"
+
+    def is_successful(self):
+        return True
+
+class FailingAgent:
+    def answer(self, question):
+        raise RuntimeError("429 Resource exhausted")
+
+@pytest.fixture
+def runner(tmp_path):
+    # Only the attributes the cached steps read; __init__ would build the live agent and registry
+    runner = object.__new__(AgentEvalRunner)
+    runner.fingerprint, runner.judge_model_name, runner.threshold = "test", "judge", 0.7
+    runner.cache = DiskCache(str(tmp_path / "eval.sqlite"))
+    CountingMetric.calls = 0
+    return runner
+
+def _verdict(runner, **fields):
+    case = {"input": "Q", "actual_output": "A", "expected_output": "E", "retrieval_context": ["c1"], **fields}
+    return asyncio.run(runner._verdict(CountingMetric(), LLMTestCase(**case), asyncio.Semaphore(1)))
+
+def test_verdicts_are_cached_per_test_case(runner):
+    assert _verdict(runner)["score"] == 1.0
+    _verdict(runner)
+    assert CountingMetric.calls == 1
+
+@pytest.mark.parametrize("change", [
+    {"actual_output": "A2"}, {"expected_output": "E2"}, {"retrieval_context": ["c1", "c2"]}, {"retrieval_context": ["c1c2"]},
+])
+def test_any_judged_field_change_gets_a_fresh_verdict(runner, change):
+    _verdict(runner)
+    _verdict(runner, **change)
+    assert CountingMetric.calls == 2
+
+def test_agent_failures_are_recorded_and_not_cached(runner):
+    runner.agent = FailingAgent()
+    output = asyncio.run(runner._agent_output({"input": "Q"}, asyncio.Semaphore(1)))
+    assert output["error"] == "429 Resource exhausted"
+    assert len(runner.cache) == 0
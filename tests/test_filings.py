@@ -0,0 +1,92 @@
+# tests/test_filings.py
+import io
+import os
+import contextlib
+import pytest
+from benchmarks.retrieval_benchmark import build_index
+from src.core.database import DatabaseManager
+from src.core.filings import FilingRegistry, collection_name
+from src.tools.retriever import RetrievalTool
+from src.tools.table_lookup import FinancialTableTool
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = FilingRegistry(str(tmp_path / "filings.json"))
+    registry.register("AAPL", 2025, "aapl25.pdf", company="Apple Inc.")
+    registry.register("AAPL", 2024, "aapl24.pdf", company="Apple Inc.")
+    registry.register("MSFT", 2025, "msft25.pdf", company="Microsoft Corporation")
+    return registry
+
+def _labels(filings):
+    return [FilingRegistry.label(f) for f in filings]
+
+def test_collection_name():
+    assert collection_name("AAPL", 2025) == "aapl_10k_fy2025"
+    assert collection_name("brk.b", "2024", form="10-Q") == "brk-b_10q_fy2024"
+
+def test_register_persists_and_replaces(registry, tmp_path):
+    registry.register("AAPL", 2025, "aapl25-v2.pdf", company="Apple Inc.")
+    reloaded = FilingRegistry(str(tmp_path / "filings.json"))
+    assert len(reloaded) == 3
+    assert reloaded.get("aapl_10k_fy2025")["pdf_path"] == "aapl25-v2.pdf"
+    assert _labels(reloaded.all()) == ["AAPL FY2025", "MSFT FY2025", "AAPL FY2024"]
+
+def test_route_by_explicit_ticker_and_year(registry):
+    assert _labels(registry.route("net income", ticker="aapl")) == ["AAPL FY2025", "AAPL FY2024"]
+    assert _labels(registry.route("net income", ticker="AAPL", fiscal_year=2024)) == ["AAPL FY2024"]
+    assert registry.route("net income", ticker="GOOG") == []
+
+def test_route_by_ticker_or_company_mentioned_in_query(registry):
+    assert _labels(registry.route("What was MSFT revenue?")) == ["MSFT FY2025"]
+    assert _labels(registry.route("How did Microsoft grow?")) == ["MSFT FY2025"]
+    assert _labels(registry.route("Apple net income in 2024")) == ["AAPL FY2024"]
+
+def test_route_year_falls_back_to_later_filings_with_comparatives(registry):
+    # No FY2023 filing: the FY2024 and FY2025 10-Ks report 2023 as a comparative year
+    assert _labels(registry.route("Apple revenue 2023")) == ["AAPL FY2025", "AAPL FY2024"]
+
+def test_route_without_hints_searches_everything_up_to_cap(registry):
+    assert _labels(registry.route("gross margin")) == ["AAPL FY2025", "MSFT FY2025", "AAPL FY2024"]
+    assert len(registry.route("gross margin", max_shards=2)) == 2
+
+@pytest.fixture
+def indexed(tmp_path):
+    """Registry whose default collection holds the fixture 10-K (ingested without --filing)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return build_index(str(tmp_path), 0.0, use_flashrank=False)
+
+def _targets(db, query, **kwargs):
+    return [(label, target.collection_name) for label, target in db.route(query, **kwargs)]
+
+def test_shard_shares_the_default_managers_resources(indexed):
+    db = indexed.db_manager()
+    shard = db.shard("aapl_10k_fy2025")
+    assert isinstance(shard, DatabaseManager) and shard.collection_name == "aapl_10k_fy2025"
+    assert (shard.config, shard.gemini_ef, shard.filings) == (db.config, db.gemini_ef, db.filings)
+    assert db.shard("aapl_10k_fy2025") is shard
+    assert db.shard(db.collection_name) is db
+
+def test_default_collection_is_searched_unless_a_registered_company_is_named(indexed):
+    db = indexed.db_manager()
+    assert _targets(db, "gross margin") == [(None, "retrieval_benchmark")]
+    db.filings.register("MSFT", 2025, "msft25.pdf", company="Microsoft Corporation")
+    assert _targets(db, "gross margin") == [("MSFT FY2025", "msft_10k_fy2025"), (None, "retrieval_benchmark")]
+    assert _targets(db, "unknown ticker", ticker="GOOG") == [(None, "retrieval_benchmark")]
+    assert _targets(db, "Microsoft gross margin") == [("MSFT FY2025", "msft_10k_fy2025")]
+    assert _targets(db, "gross margin", ticker="MSFT") == [("MSFT FY2025", "msft_10k_fy2025")]
+
+def test_corpus_version_covers_the_default_collection(indexed):
+    db = indexed.db_manager()
+    db.filings.register("MSFT", 2025, "msft25.pdf")
+    with_default = db.corpus_version()
+    os.remove(db.index_path("manifest.json"))
+    assert not db.has_default_index()
+    assert db.corpus_version() != with_default
+
+def test_tools_still_reach_the_default_filing_once_a_corpus_exists(indexed):
+    indexed.db_manager().filings.register("MSFT", 2025, "msft25.pdf", company="Microsoft Corporation")
+    with contextlib.redirect_stdout(io.StringIO()):
+        passages = RetrievalTool(indexed.config_path, registry=indexed).search_10k("What was net income?")
+        values = FinancialTableTool(indexed.config_path, registry=indexed).lookup_financial_value("Net income")
+    assert "SOURCE: Page" in passages
+    assert "93,736" in values or "93736" in values
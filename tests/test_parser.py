@@ -0,0 +1,53 @@
+# tests/test_parser.py
+from types import SimpleNamespace
+import pytest
+from src.core.parser import INDEX_SCHEMA_VERSION, PDFParser, passage_features
+
+TABLE = "| Net sales | 391,035 | 383,285 |\n" * 4 + "Total net sales increased 2% year over year."
+
+class FakeDatabaseManager:
+    """The only attribute PDFParser.__init__ reads without a filing."""
+    collection_name = "test"
+
+def _parser(child_size=500):
+    parser = PDFParser("config/config.yaml", db_manager=FakeDatabaseManager())
+    parser.child_size = child_size
+    parser.chunking = {"child_size": child_size}
+    return parser
+
+def _nodes(*texts):
+    return [SimpleNamespace(text=text, metadata={"page_label": str(page)}) for page, text in enumerate(texts, start=1)]
+
+def test_passage_features():
+    assert passage_features(TABLE)["is_dense"] is True
+    assert passage_features("Item 1A. Risk Factors")["is_dense"] is False
+
+def test_records_are_parents_followed_by_their_children():
+    nodes = _nodes(TABLE, "Risk factors apply.")
+    ids, documents, metadatas = _parser(child_size=50).build_records(nodes + nodes[:1])
+    parents = [k for k, m in enumerate(metadatas) if m["type"] == "parent"]
+    assert len(parents) == 2  # The repeated node (same page, same text) is indexed once
+    children = [k for k, m in enumerate(metadatas) if m["type"] == "child" and m["parent_id"] == ids[0]]
+    assert "".join(documents[k] for k in children) == TABLE
+    assert all(metadatas[k]["parent_dense"] for k in children)
+
+def test_ids_are_stable_for_unchanged_content():
+    first = _parser().build_records(_nodes(TABLE, "Risk factors apply."))[0]
+    second = _parser().build_records(_nodes(TABLE, "Risk factors changed."))[0]
+    assert first[:2] == second[:2]
+    assert len(set(first) - set(second)) == 2
+
+def test_new_child_size_gives_new_child_ids():
+    small = _parser(child_size=40).build_records(_nodes(TABLE))[0]
+    large = _parser(child_size=50).build_records(_nodes(TABLE))[0]
+    assert small[0] == large[0]
+    assert not set(small[1:]) & set(large[1:])
+
+def test_manifest_is_current_only_for_same_bytes_layout_and_chunking():
+    parser = _parser(child_size=500)
+    manifest = {"source_sha256": "abc", "schema_version": INDEX_SCHEMA_VERSION, "chunking": {"child_size": 500}}
+    assert parser._is_up_to_date(manifest, "abc")
+    assert not parser._is_up_to_date(manifest, "def")
+    assert not parser._is_up_to_date({**manifest, "schema_version": INDEX_SCHEMA_VERSION - 1}, "abc")
+    assert not parser._is_up_to_date({**manifest, "chunking": {"child_size": 400}}, "abc")
+    assert not parser._is_up_to_date(None, "abc")
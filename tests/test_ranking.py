@@ -0,0 +1,21 @@
+# tests/test_ranking.py
+import pytest
+from src.utils.ranking import reciprocal_rank_fusion
+
+def test_scores_sum_over_lists():
+    fused = dict(reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=60))
+    assert fused["a"] == pytest.approx(1 / 61)
+    assert fused["b"] == pytest.approx(1 / 62 + 1 / 61)
+    assert fused["c"] == pytest.approx(1 / 62)
+
+def test_best_first_with_stable_ties():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "b", "a"]], k=1)
+    assert [item_id for item_id, _ in fused] == ["a", "c", "b"]
+
+def test_duplicates_within_a_list_count_once_and_do_not_take_a_rank():
+    fused = dict(reciprocal_rank_fusion([["a", "a", "b"]], k=60))
+    assert fused == {"a": pytest.approx(1 / 61), "b": pytest.approx(1 / 62)}
+
+def test_empty_input():
+    assert reciprocal_rank_fusion([]) == []
+    assert reciprocal_rank_fusion([[], []]) == []
@@ -0,0 +1,128 @@
+# tests/test_retriever.py
+import io
+import time
+import contextlib
+import threading
+import pytest
+from benchmarks.retrieval_benchmark import build_index
+from src.tools.retriever import RetrievalTool
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+class ScriptedClient:
+    """Streams each of `lines` as one chunk of expansion output, blocking before chunk i until `gates[i]` is set."""
+    def __init__(self, lines, gates=None):
+        self.models = self
+        self.lines = lines
+        self.gates = gates or {}
+
+    def generate_content_stream(self, model, contents, **kwargs):
+        for i, line in enumerate(self.lines):
+            if i in self.gates:
+                self.gates[i].wait(timeout=10)
+            yield _Chunk(line + "\n")
+
+@pytest.fixture(scope="module")
+def registry(tmp_path_factory):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return build_index(str(tmp_path_factory.mktemp("retrieval")), 0.0, use_flashrank=False)
+
+@pytest.fixture
+def tool(registry):
+    tool = RetrievalTool(registry.config_path, registry=registry)
+    tool.expansion_cache = None
+    tool.skip_expansion_for_lexical = False
+    tool.searched = []
+    search_children = tool._search_children
+    def recording(queries, *args):
+        tool.searched.append(list(queries))
+        return search_children(queries, *args)
+    tool._search_children = recording
+    return tool
+
+def _search(tool, query):
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        output = tool.search_10k(query)
+    return output, time.perf_counter() - started
+
+def test_expansions_arriving_together_are_searched_in_one_request(tool):
+    tool.client = ScriptedClient(["net sales table\nnet sales in millions"])
+    output, _ = _search(tool, "What were total net sales?")
+    assert "<DATA_CHUNK" in output
+    assert tool.searched == [["What were total net sales?"], ["net sales table", "net sales in millions"]]
+
+def test_deadline_searches_the_lines_that_arrived(tool):
+    release = threading.Event()
+    tool.client = ScriptedClient(["net sales table", "late line"], gates={1: release})
+    tool.expansion_timeout = 0.3
+    try:
+        output, elapsed = _search(tool, "What were total net sales?")
+    finally:
+        release.set()
+    assert "<DATA_CHUNK" in output
+    assert 0.3 <= elapsed < 2.0
+    assert ["late line"] not in tool.searched
+    assert ["net sales table"] in tool.searched
+
+def test_search_stops_waiting_once_enough_expansions_arrived(tool):
+    release = threading.Event()
+    tool.client = ScriptedClient(["one", "two", "three"], gates={2: release})
+    tool.expansion_timeout = 5.0
+    try:
+        _, elapsed = _search(tool, "What were total net sales?")
+    finally:
+        release.set()
+    assert elapsed < 2.0  # max_queries = 3: the raw query plus the first two lines
+    assert sorted(q for queries in tool.searched[1:] for q in queries) == ["one", "two"]
+
+def test_abandoned_expansions_do_not_delay_later_searches(tool):
+    release = threading.Event()
+    tool.client = ScriptedClient(["never arrives"], gates={0: release})
+    tool.expansion_timeout = 0.2
+    try:
+        # More abandoned expansions than expansion threads: searches must still never queue behind them
+        timings = [_search(tool, f"What was revenue in quarter {i}?")[1] for i in range(6)]
+    finally:
+        release.set()
+    assert max(timings) < 1.5
+
+class SlowEmbedding:
+    """Bag-of-words embedding that sleeps `delay` seconds per call, standing in for a Gemini round trip."""
+    def __init__(self):
+        self.delay = 0.0
+
+    def __call__(self, texts):
+        time.sleep(self.delay)
+        return [[float(text.lower().count(word)) + 0.01 for word in ("net", "sales", "revenue", "total")] for text in texts]
+
+@pytest.fixture
+def cached_tool(tool, tmp_path):
+    from src.utils.disk_cache import DiskCache
+    from src.utils.semantic_cache import SemanticCache
+    embed = SlowEmbedding()
+    tool.expansion_cache = SemanticCache(DiskCache(str(tmp_path / "expansions.sqlite")), embed, similarity_threshold=0.95)
+    tool.expansion_cache.put("What were total net sales?", ["net sales table"])
+    embed.delay = 1.0
+    return tool
+
+def test_paraphrase_lookup_does_not_delay_search(cached_tool):
+    release = threading.Event()
+    cached_tool.client = ScriptedClient(["never arrives"], gates={0: release})
+    cached_tool.expansion_timeout = 0.2
+    try:
+        _, elapsed = _search(cached_tool, "How did revenue change?")
+    finally:
+        release.set()
+    assert elapsed < 0.8  # The embedding call (1 s) runs in the expansion job, past the deadline
+
+def test_exact_and_paraphrase_hits_are_searched(cached_tool):
+    cached_tool.client = ScriptedClient(["live line"])
+    cached_tool.expansion_timeout = 5.0
+    _search(cached_tool, "what were total net sales")
+    assert cached_tool.searched[-1] == ["net sales table"]
+    _search(cached_tool, "Total net sales were what?")
+    assert cached_tool.searched[-1] == ["net sales table"]
+    assert cached_tool.expansion_cache.stats()["semantic_hits"] == 1
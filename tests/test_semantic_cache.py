@@ -0,0 +1,80 @@
+# tests/test_semantic_cache.py
+import pytest
+from src.utils import disk_cache
+from src.utils.disk_cache import DiskCache
+from src.utils.semantic_cache import SemanticCache, normalize_query, query_signature
+
+VOCAB = ["apple", "net", "income", "revenue", "msft"]
+
+def bag_of_words(texts):
+    """Deterministic stand-in embedding: word counts over a tiny vocabulary, so paraphrases are near-identical."""
+    return [[float(text.lower().count(word)) + 0.01 for word in VOCAB] for text in texts]
+
+@pytest.fixture
+def make_cache(tmp_path):
+    def make(threshold=None, **store_kwargs):
+        store = DiskCache(str(tmp_path / "answers.sqlite"), **store_kwargs)
+        return SemanticCache(store, embedding_function=bag_of_words, similarity_threshold=threshold)
+    return make
+
+def test_normalize_query():
+    assert normalize_query("  What was Net Income?  ") == "what was net income"
+
+def test_query_signature():
+    assert query_signature("AAPL net income in FY2024 vs 2,023") == "2023|2024|AAPL"
+    assert query_signature("net income in 2023 and 2024") == query_signature("net income, 2024 and 2023")
+    assert query_signature("What was net income?") == ""
+
+def test_exact_match_only_by_default(make_cache):
+    cache = make_cache()
+    cache.put("What was Apple net income in 2024?", "93,736")
+    assert cache.get("what was apple net income in 2024") == "93,736"
+    assert cache.get("Apple net income for 2024?") is None
+
+def test_paraphrase_reused_above_threshold(make_cache):
+    cache = make_cache(threshold=0.9)
+    cache.put("What was Apple net income in 2024?", "93,736")
+    assert cache.get_exact("Apple net income for 2024?") is None
+    assert cache.get("Apple net income for 2024?") == "93,736"
+    assert cache.get("Apple revenue for 2024?") is None
+    assert cache.stats()["semantic_hits"] == 1
+
+def test_paraphrase_needs_the_same_numbers_and_tickers(make_cache):
+    cache = make_cache(threshold=0.9)
+    cache.put("What was Apple net income in 2024?", "93,736")
+    assert cache.get("Apple net income for 2025?") is None
+    assert cache.get("MSFT net income for 2024?") is None
+    assert cache.get("Apple net income in fiscal 2024?") == "93,736"
+
+def test_scopes_are_isolated_and_persist(make_cache):
+    cache = make_cache(threshold=0.9)
+    cache.put("Apple revenue 2024", "391,035", scope="v1")
+    assert cache.get("Apple revenue 2024", scope="v2") is None
+    assert cache.get("Revenue of Apple 2024", scope="v2") is None
+    reopened = make_cache(threshold=0.9)
+    assert reopened.get("Revenue of Apple 2024", scope="v1") == "391,035"
+    assert reopened.drop_other_scopes("v2") == 1
+    assert reopened.get("Revenue of Apple 2024", scope="v1") is None
+
+def test_rewriting_a_key_replaces_its_row(make_cache):
+    cache = make_cache(threshold=0.9)
+    cache.put("Apple revenue", "old")
+    cache.put("apple revenue?", "new")
+    assert cache._size == 1
+    assert cache.get("Revenue of Apple") == "new"
+
+def test_in_memory_index_follows_store_evictions(make_cache):
+    cache = make_cache(threshold=0.9, max_entries=20)
+    for i in range(200):
+        cache.put(f"question {i}", i)
+    assert len(cache.store) == 20
+    assert cache._size <= 20 + 16
+    assert set(cache._keys) >= {key for key, _ in cache.store.items()}
+
+def test_expired_match_is_dropped(make_cache, clock, monkeypatch):
+    monkeypatch.setattr(disk_cache, "time", clock)
+    cache = make_cache(threshold=0.9, ttl_seconds=60)
+    cache.put("Apple net income", "stale")
+    clock.advance(61)
+    assert cache.get("Net income of Apple") is None
+    assert cache._size == 0
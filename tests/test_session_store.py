@@ -0,0 +1,47 @@
+# tests/test_session_store.py
+import pytest
+from src.agents import session_store
+from src.agents.session_store import AgentSession, SessionStore
+
+@pytest.fixture(autouse=True)
+def fake_time(clock, monkeypatch):
+    monkeypatch.setattr(session_store, "time", clock)
+
+def _factory(sid):
+    return lambda: AgentSession(sid, chat=object())
+
+def test_returns_the_same_session_until_dropped():
+    store = SessionStore()
+    first = store.get_or_create("u1", _factory("u1"))
+    assert store.get_or_create("u1", _factory("u1")) is first
+    store.drop("u1")
+    assert store.get_or_create("u1", _factory("u1")) is not first
+
+def test_evicts_least_recently_used(clock):
+    store = SessionStore(max_sessions=2)
+    a = store.get_or_create("a", _factory("a"))
+    store.get_or_create("b", _factory("b"))
+    assert store.get_or_create("a", _factory("a")) is a  # "b" is now the LRU session
+    store.get_or_create("c", _factory("c"))
+    assert len(store) == 2
+    assert store.get_or_create("a", _factory("a")) is a
+    assert store.get_or_create("b", _factory("b")) is not None and len(store) == 2
+
+def test_idle_sessions_expire(clock):
+    store = SessionStore(ttl_seconds=60)
+    a = store.get_or_create("a", _factory("a"))
+    clock.advance(45)
+    assert store.get_or_create("a", _factory("a")) is a  # Use refreshes the idle timer
+    store.get_or_create("b", _factory("b"))
+    clock.advance(61)
+    fresh = store.get_or_create("a", _factory("a"))
+    assert fresh is not a
+    assert len(store) == 1
+
+def test_evidence_is_bounded_lru():
+    session = AgentSession("s", chat=None, max_evidence=2)
+    session.remember("q1", "one")
+    session.remember("q2", "two")
+    session.remember("q1", "one again")
+    session.remember("q3", "three")
+    assert list(session.evidence.items()) == [("q1", "one again"), ("q3", "three")]
@@ -0,0 +1,49 @@
+# tests/test_table_store.py
+from src.core.table_store import FinancialTableStore, format_value, parse_number
+
+def _store():
+    rows = [
+        ("ops", "CONSOLIDATED STATEMENTS OF OPERATIONS", "Net income", "September 27, 2025", 112010.0),
+        ("ops", "CONSOLIDATED STATEMENTS OF OPERATIONS", "Net income", "September 28, 2024", 93736.0),
+        ("ops", "CONSOLIDATED STATEMENTS OF OPERATIONS", "Total net sales", "September 27, 2025", 416161.0),
+        ("bs", "CONSOLIDATED BALANCE SHEETS", "Total current assets", "September 27, 2025", 152987.5),
+    ]
+    return FinancialTableStore({
+        "table_name": [r[0] for r in rows], "title": [r[1] for r in rows], "line_item": [r[2] for r in rows],
+        "period": [r[3] for r in rows], "value": [r[4] for r in rows],
+        "scale": ["In Millions"] * len(rows), "page": ["28"] * len(rows),
+    })
+
+def test_format_value_keeps_every_digit():
+    assert format_value(15116786.0) == "15116786"
+    assert format_value(-1234567.5) == "-1234567.5"
+    assert format_value(0.1) == "0.1"
+    assert format_value(-0.0) == "0"
+
+def test_parse_number_handles_filing_notation():
+    assert parse_number("$ (5,000)") == -5000.0
+    assert parse_number("12.5%") == 12.5
+    assert parse_number("—") == 0.0
+    assert parse_number("n/a") is None
+
+def test_lookup_exact_and_period_filter():
+    store = _store()
+    assert [m["value"] for m in store.lookup("Net income")] == [112010.0, 93736.0]
+    assert [m["value"] for m in store.lookup("net income", period="2024")] == [93736.0]
+
+def test_lookup_alias_and_token_fallback():
+    store = _store()
+    assert [m["line_item"] for m in store.lookup("net sales")] == ["Total net sales"]
+    assert [m["line_item"] for m in store.lookup("current assets")] == ["Total current assets"]
+
+def test_lookup_without_usable_tokens_matches_nothing():
+    store = _store()
+    assert store.lookup("") == []
+    assert store.lookup("???") == []
+
+def test_save_load_round_trip(tmp_path):
+    path = str(tmp_path / "tables.npz")
+    _store().save(path)
+    loaded = FinancialTableStore.load(path)
+    assert len(loaded) == 4
+    assert loaded.lookup("Total current assets")[0]["value"] == 152987.5
@@ -0,0 +1,59 @@
+# tests/test_tracing.py
+import json
+import pytest
+from src.utils.tracing import InMemoryExporter, JsonLinesExporter, Tracer
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer()
+    tracer.memory = tracer.add_exporter(InMemoryExporter())
+    return tracer
+
+def _read(path):
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f]
+
+def test_children_link_to_parent_and_errors_are_recorded(tracer):
+    with pytest.raises(ValueError):
+        with tracer.span("agent", question="q") as root:
+            with tracer.span("search") as child:
+                child.set(hits=3)
+            raise ValueError("boom")
+    search, agent = tracer.memory.spans
+    assert (search.parent_id, search.trace_id) == (root.span_id, root.trace_id)
+    assert search.attributes == {"hits": 3}
+    assert agent.error == "ValueError: boom"
+    assert tracer.memory.trace(root.trace_id) == [agent, search]
+
+def test_disabled_tracer_exports_nothing(tracer):
+    tracer.enabled = False
+    with tracer.span("agent") as s:
+        s.set(ignored=True)
+    assert len(tracer.memory.spans) == 0
+
+def test_jsonl_buffers_until_the_root_span_ends(tracer, tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracer.add_exporter(JsonLinesExporter(str(path)))
+    with tracer.span("agent"):
+        with tracer.span("search"):
+            pass
+        assert not path.exists()
+    assert [span["name"] for span in _read(path)] == ["search", "agent"]
+
+def test_jsonl_flushes_every_n_spans(tmp_path, tracer):
+    path = tmp_path / "spans.jsonl"
+    tracer.add_exporter(JsonLinesExporter(str(path), flush_spans=2))
+    with tracer.span("agent"):
+        for name in ("a", "b", "c"):
+            with tracer.span(name):
+                pass
+        assert [span["name"] for span in _read(path)] == ["a", "b"]
+
+def test_jsonl_rotates_and_keeps_backups(tmp_path, tracer):
+    path = tmp_path / "spans.jsonl"
+    tracer.add_exporter(JsonLinesExporter(str(path), max_bytes=1, backups=2))
+    for name in ("first", "second", "third", "fourth"):
+        with tracer.span(name):
+            pass
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["spans.jsonl", "spans.jsonl.1", "spans.jsonl.2"]
+    assert [_read(f"{path}{suffix}")[0]["name"] for suffix in ("", ".1", ".2")] == ["fourth", "third", "second"]
@@ -0,0 +1,135 @@
+# tests/test_vector_store.py
+import os
+import numpy as np
+import pytest
+from src.core.vector_store import NumpyVectorStore, VectorStore
+
+DIM = 32
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, DIM)).astype(np.float32)
+    ids = [f"id{i}" for i in range(300)]
+    metadatas = [{"type": "child" if i % 3 else "parent", "dense": bool(i % 2), "n": i, "page": str(i // 10)} for i in range(300)]
+    documents = [f"doc {i} é" for i in range(300)]
+    return ids, documents, metadatas, vectors
+
+def _store(path, corpus, quantization="float16", batch=50):
+    ids, documents, metadatas, vectors = corpus
+    store = NumpyVectorStore(str(path), "test", embedding_function=lambda texts: [vectors[int(t.split()[1])] for t in texts],
+                             quantization=quantization)
+    for start in range(0, len(ids), batch):
+        end = start + batch
+        store.upsert(ids[start:end], documents[start:end], metadatas[start:end], vectors[start:end])
+    return store
+
+def _exact_top(corpus, query, k, keep):
+    _, _, metadatas, vectors = corpus
+    rows = np.array([i for i, m in enumerate(metadatas) if keep(m)])
+    unit = vectors[rows] / np.linalg.norm(vectors[rows], axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    return [f"id{rows[j]}" for j in np.argsort(-scores, kind="stable")[:k]]
+
+def test_interface_is_abstract():
+    with pytest.raises(TypeError):
+        VectorStore()
+
+@pytest.mark.parametrize("quantization", ["float32", "float16", "int8"])
+def test_filtered_query_matches_exact_search(tmp_path, corpus, quantization):
+    store = _store(tmp_path, corpus, quantization)
+    query = corpus[3][7]
+    where = {"$and": [{"type": "child"}, {"dense": True}]}
+    result = store.query(query_embeddings=[query.tolist()], n_results=10, where=where)
+    expected = _exact_top(corpus, query, 10, lambda m: m["type"] == "child" and m["dense"])
+    assert len(set(result["ids"][0]) & set(expected)) >= (10 if quantization != "int8" else 9)
+    assert result["ids"][0][0] == "id7"
+    assert result["documents"][0][0] == "doc 7 é"
+    assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-2)
+    assert all(m["type"] == "child" and m["dense"] for m in result["metadatas"][0])
+
+def test_where_operators(tmp_path, corpus):
+    store = _store(tmp_path, corpus)
+    count = lambda where: len(store.get(where=where, include=())["ids"])
+    assert count({"type": "parent"}) == 100
+    assert count({"type": {"$ne": "parent"}}) == 200
+    assert count({"n": {"$in": [1, 2, 3, 999]}}) == 3
+    assert count({"n": {"$nin": [1, 2, 3]}}) == 297
+    assert count({"n": {"$gte": 290}}) == 10
+    assert count({"n": {"$lt": 10}}) == 10
+    assert count({"$or": [{"n": 1}, {"n": 2}]}) == 2
+    assert count({"dense": 1}) == 0  # type-strict: True is not 1
+    with pytest.raises(ValueError):
+        count({"n": {"$regex": "1"}})
+
+def test_get_keeps_request_order_and_skips_unknown_ids(tmp_path, corpus):
+    store = _store(tmp_path, corpus)
+    result = store.get(ids=["id9", "missing", "id2"], include=["documents", "embeddings"])
+    assert result["ids"] == ["id9", "id2"]
+    assert result["documents"] == ["doc 9 é", "doc 2 é"]
+    assert len(result["embeddings"][0]) == DIM
+
+def test_upsert_replaces_and_delete_removes(tmp_path, corpus):
+    store = _store(tmp_path, corpus)
+    vectors = corpus[3]
+    store.upsert(["id1", "id1"], ["first", "second"], [{"n": -1}, {"n": -2}], [vectors[1], vectors[1]])
+    store.delete(ids=["id2", "id3"])
+    store.delete(where={"n": {"$gte": 200}})
+    assert store.count() == 198
+    assert store.get(ids=["id1"])["documents"] == ["second"]
+    assert store.get(where={"n": -2}, include=())["ids"] == ["id1"]
+    assert store.get(ids=["id2", "id250"])["ids"] == []
+
+def test_another_reader_sees_committed_writes(tmp_path, corpus):
+    writer = _store(tmp_path, corpus)
+    reader = NumpyVectorStore(str(tmp_path), "test")
+    assert reader.count() == 300
+    writer.upsert(["extra"], ["doc 5 extra"], [{"n": 1000}], [corpus[3][5]])
+    writer.delete(ids=["id0"])
+    assert reader.count() == 300
+    assert reader.get(ids=["extra", "id0"])["ids"] == ["extra"]
+
+def test_uncommitted_appends_are_ignored_and_overwritten(tmp_path, corpus):
+    store = _store(tmp_path, corpus)
+    with open(tmp_path / "records.1.jsonl", "ab") as f:
+        f.write(b'["ghost",{}]\n')
+    with open(tmp_path / "vectors.1.bin", "ab") as f:
+        f.write(b"\xff" * 64)
+    assert NumpyVectorStore(str(tmp_path), "test").get(ids=["ghost"])["ids"] == []
+    store.upsert(["after"], ["doc 4 after"], [{}], [corpus[3][4]])
+    reopened = NumpyVectorStore(str(tmp_path), "test")
+    assert reopened.count() == 301
+    assert reopened.get(ids=["ghost", "after"])["ids"] == ["after"]
+    assert reopened.query(query_embeddings=[corpus[3][4].tolist()], n_results=2)["ids"][0] == ["id4", "after"]
+
+def test_writes_append_and_compaction_drops_dead_rows(tmp_path, corpus, monkeypatch):
+    monkeypatch.setattr(NumpyVectorStore, "COMPACT_MIN_DEAD", 10)
+    store = _store(tmp_path, corpus)
+    assert sorted(os.listdir(tmp_path)) == ["docs.1.bin", "ends.1.bin", "index.json", "records.1.jsonl", "vectors.1.bin"]
+    store.delete(where={"n": {"$lt": 100}})
+    assert store._current().generation == 1  # 100 dead < 200 live: tombstoned, not rewritten
+    store.delete(where={"n": {"$lt": 250}})
+    assert store._current().generation == 2
+    assert len(store._current()) == 50
+    assert sorted(os.listdir(tmp_path)) == ["docs.2.bin", "ends.2.bin", "index.json", "records.2.jsonl", "vectors.2.bin"]
+    assert store.get(ids=["id260"])["documents"] == ["doc 260 é"]
+
+def test_quantization_change_requantizes_existing_rows(tmp_path, corpus):
+    _store(tmp_path, corpus, "float16")
+    store = NumpyVectorStore(str(tmp_path), "test", quantization="int8")
+    store.upsert(["new"], ["doc 0 new"], [{}], [corpus[3][0]])
+    assert store.count() == 301
+    assert "scales.2.bin" in os.listdir(tmp_path)
+    assert store.query(query_embeddings=[corpus[3][11].tolist()], n_results=1)["ids"] == [["id11"]]
+
+def test_results_are_deterministic_with_ties(tmp_path):
+    store = NumpyVectorStore(str(tmp_path), "ties")
+    store.upsert(["b", "a", "c"], ["x", "y", "z"], [{}, {}, {}], [[1.0, 0.0]] * 3)
+    assert store.query(query_embeddings=[[1.0, 0.0]], n_results=3)["ids"] == [["b", "a", "c"]]
+
+def test_empty_store(tmp_path):
+    store = NumpyVectorStore(str(tmp_path / "empty"), "empty")
+    assert store.count() == 0
+    assert store.query(query_embeddings=[[1.0, 0.0]], n_results=3)["ids"] == [[]]
+    assert store.get(include=())["ids"] == []
+    store.delete(ids=["x"])